@@ -1,16 +1,54 @@
+from collections.abc import AsyncGenerator
 from typing import Annotated
 
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.core.db import get_session
+from app.api.read_routing import reads_from_primary
+from app.core.config import settings
+from app.core.db import AsyncSessionFactory, ReadSessionFactory, get_session
 from app.services.achievements import AchievementService
+from app.services.leaderboard import LeaderboardService
+from app.services.ownership import OwnershipService
+from app.services.rules import RulesService
 from app.services.stats import StatsService
 from app.services.users import UserService
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
 
+def get_read_session_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """
+    Выбор фабрики сессий для читающего запроса: реплика (READ_DATABASE_URL)
+    или основная база, если клиент запросил read-your-writes.
+
+    :param request: Входящий HTTP-запрос.
+    :return: Фабрика асинхронных сессий.
+    """
+    return AsyncSessionFactory if reads_from_primary(request) else ReadSessionFactory
+
+
+ReadSessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_read_session_factory)
+]
+
+
+async def get_read_session(
+    session_factory: ReadSessionFactoryDep,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Зависимость FastAPI, которая предоставляет сессию для читающих запросов.
+
+    :param session_factory: Фабрика сессий, выбранная для запроса.
+    :yield: Асинхронная сессия SQLAlchemy.
+    """
+    async with session_factory() as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
 def get_user_service(session: SessionDep) -> UserService:
     """
     Создаёт экземпляр сервиса работы с пользователями на основе переданной
@@ -22,6 +60,16 @@ def get_user_service(session: SessionDep) -> UserService:
     return UserService(session)
 
 
+def get_user_read_service(session: ReadSessionDep) -> UserService:
+    """
+    Создаёт экземпляр сервиса работы с пользователями для читающих запросов.
+
+    :param session: Асинхронная сессия SQLAlchemy для чтения.
+    :return: Экземпляр UserService.
+    """
+    return UserService(session)
+
+
 def get_achievement_service(session: SessionDep) -> AchievementService:
     """
     Создаёт экземпляр сервиса работы с достижениями.
@@ -32,16 +80,79 @@ def get_achievement_service(session: SessionDep) -> AchievementService:
     return AchievementService(session)
 
 
-def get_stats_service(session: SessionDep) -> StatsService:
+def get_ownership_service(session: ReadSessionDep) -> OwnershipService:
+    """
+    Создаёт экземпляр сервиса проверок и запросов по выданным достижениям
+    для читающих запросов.
+
+    :param session: Асинхронная сессия SQLAlchemy для чтения.
+    :return: Экземпляр OwnershipService.
+    """
+    return OwnershipService(session)
+
+
+def get_rules_service(session: SessionDep) -> RulesService:
+    """
+    Создаёт экземпляр сервиса правил выдачи достижений по событиям.
+
+    :param session: Асинхронная сессия SQLAlchemy.
+    :return: Экземпляр RulesService.
+    """
+    return RulesService(session)
+
+
+def get_stats_service(
+    session: ReadSessionDep,
+    session_factory: ReadSessionFactoryDep,
+) -> StatsService:
     """
     Создаёт экземпляр сервиса статистики по пользователям и достижениям.
+    Статистика читается из реплики, если она настроена.
+
+    :param session: Асинхронная сессия SQLAlchemy для чтения.
+    :param session_factory: Фабрика сессий, выбранная для запроса.
+    :return: Экземпляр StatsService.
+    """
+    return stats_service(session, session_factory)
+
+
+def stats_service(
+    session: AsyncSession,
+    session_factory: async_sessionmaker[AsyncSession],
+) -> StatsService:
+    """
+    Создаёт экземпляр сервиса статистики над переданной сессией. В режиме
+    параллельной статистики сервис получает фабрику сессий, чтобы
+    выполнять подзапросы на отдельных соединениях из того же пула.
 
     :param session: Асинхронная сессия SQLAlchemy.
+    :param session_factory: Фабрика сессий той же базы, что и session.
     :return: Экземпляр StatsService.
     """
-    return StatsService(session)
+    return StatsService(
+        session, session_factory=session_factory if settings.stats_parallel else None
+    )
+
+
+def get_leaderboard_service(
+    session: ReadSessionDep,
+    session_factory: ReadSessionFactoryDep,
+) -> LeaderboardService:
+    """
+    Создаёт экземпляр сервиса лидерборда для читающих запросов. Фабрика
+    сессий нужна для вычисления кэшируемых страниц за окно.
+
+    :param session: Асинхронная сессия SQLAlchemy для чтения.
+    :param session_factory: Фабрика сессий, выбранная для запроса.
+    :return: Экземпляр LeaderboardService.
+    """
+    return LeaderboardService(session, session_factory=session_factory)
 
 
 UserServiceDep = Annotated[UserService, Depends(get_user_service)]
+UserReadServiceDep = Annotated[UserService, Depends(get_user_read_service)]
 AchievementServiceDep = Annotated[AchievementService, Depends(get_achievement_service)]
+OwnershipServiceDep = Annotated[OwnershipService, Depends(get_ownership_service)]
+RulesServiceDep = Annotated[RulesService, Depends(get_rules_service)]
 StatsServiceDep = Annotated[StatsService, Depends(get_stats_service)]
+LeaderboardServiceDep = Annotated[LeaderboardService, Depends(get_leaderboard_service)]
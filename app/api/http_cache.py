@@ -0,0 +1,79 @@
+from collections.abc import Iterable
+
+from fastapi import Request, Response, status
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Проверка заголовка If-None-Match на совпадение с текущим ETag ресурса.
+    Поддерживаются списки значений, слабые валидаторы (W/) и `*`.
+
+    :param request: Входящий HTTP-запрос.
+    :param etag: Текущий ETag ресурса в кавычках.
+    :return: True, если клиент уже имеет актуальную версию ресурса.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def preferred_encoding(request: Request, available: Iterable[str]) -> str:
+    """
+    Выбор Content-Encoding по заголовку Accept-Encoding среди доступных
+    вариантов. Варианты перечисляются в порядке предпочтения сервера,
+    кодировки с q=0 исключаются.
+
+    :param request: Входящий HTTP-запрос.
+    :param available: Доступные кодировки, например ("br", "gzip").
+    :return: Выбранная кодировка или "identity".
+    """
+    accepted: dict[str, float] = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.lower()] = quality
+
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    headers: dict[str, str] | None = None,
+    content_encoding: str | None = None,
+) -> Response:
+    """
+    Формирование ответа с готовым JSON-телом и ETag. Если клиент прислал
+    совпадающий If-None-Match, возвращается 304 без тела.
+
+    :param request: Входящий HTTP-запрос.
+    :param body: Сериализованное JSON-тело ответа.
+    :param etag: ETag тела в кавычках.
+    :param headers: Дополнительные заголовки ответа.
+    :param content_encoding: Кодировка уже сжатого тела (gzip, br) или None.
+    :return: Ответ 200 с телом или 304 без тела.
+    """
+    response_headers = {"ETag": etag, **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+
+    if content_encoding is not None:
+        response_headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,71 @@
+from http.cookies import SimpleCookie
+from math import ceil
+from time import time
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+PRIMARY_HEADER = "X-Read-Primary"
+PRIMARY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    Проверка, должен ли читающий запрос идти в основную базу вместо реплики:
+    клиент явно запросил это заголовком X-Read-Primary или недавно выполнил
+    пишущий запрос и ещё находится в окне привязки (cookie read_primary_until).
+
+    :param request: Входящий HTTP-запрос.
+    :return: True, если запрос нужно выполнить на основной базе.
+    """
+    if request.headers.get(PRIMARY_HEADER, "").lower() in {"1", "true", "yes"}:
+        return True
+
+    pinned_until = request.cookies.get(PRIMARY_COOKIE)
+    if pinned_until is None:
+        return False
+    try:
+        return float(pinned_until) > time()
+    except ValueError:
+        return False
+
+
+class PinPrimaryAfterWritesMiddleware:
+    """
+    ASGI-middleware read-your-writes: после успешного пишущего запроса
+    клиенту выставляется cookie, по которой его чтения в течение
+    READ_PRIMARY_PIN_SECONDS направляются в основную базу, пока реплика
+    догоняет изменения. Подключается, только если задан READ_DATABASE_URL.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        window = settings.read_primary_pin_seconds
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", _pin_cookie(window))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _pin_cookie(window: float) -> str:
+    cookie: SimpleCookie = SimpleCookie()
+    cookie[PRIMARY_COOKIE] = f"{time() + window:.3f}"
+    morsel = cookie[PRIMARY_COOKIE]
+    morsel["max-age"] = ceil(window)
+    morsel["path"] = "/"
+    morsel["httponly"] = True
+    morsel["samesite"] = "lax"
+    return morsel.OutputString()
@@ -1,24 +1,63 @@
-from fastapi import APIRouter, HTTPException, status
+from collections import Counter
 
-from app.api.deps import AchievementServiceDep
-from app.schemas.achievements import AchievementCreate, AchievementRead
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.deps import AchievementServiceDep, OwnershipServiceDep, RulesServiceDep
+from app.api.http_cache import NDJSON_MEDIA_TYPE, cached_json_response, preferred_encoding
+from app.core.config import settings
+from app.schemas.achievements import (
+    AchievementCreate,
+    AchievementQuery,
+    AchievementQueryResult,
+    AchievementRead,
+    AchievementRuleCreate,
+    AchievementRuleRead,
+    AchievementStats,
+    GrantBatchItem,
+    GrantBatchResult,
+    GrantStatus,
+    QueuedGrant,
+)
+from app.services.grant_queue import GrantQueueClosedError, GrantQueueFullError, grant_queue
+from app.services.ownership import UnknownAchievementCodeError
 
 router = APIRouter(prefix="/achievements", tags=["achievements"])
 
 
 @router.get("", response_model=list[AchievementRead])
 async def list_achievements(
+    request: Request,
     service: AchievementServiceDep,
-) -> list[AchievementRead]:
+) -> Response:
     """
-    Возвращает список всех доступных достижений.
+    Возвращает список всех доступных достижений. Тело ответа заранее
+    сериализовано (и сжато) при смене версии каталога и отдаётся как есть,
+    со строгим ETag и Cache-Control. При совпадении If-None-Match
+    возвращается 304 без тела.
 
+    :param request: Входящий HTTP-запрос.
     :param service: Сервис работы с достижениями.
     :return: Список достижений.
     """
 
-    achievements = await service.list_achievements()
-    return [AchievementRead.model_validate(a) for a in achievements]
+    listing = await service.catalog_listing()
+    encoding = preferred_encoding(
+        request, [name for name in ("br", "gzip") if name in listing.variants]
+    )
+    body = listing.variants[encoding]
+    return cached_json_response(
+        request,
+        body.content,
+        body.etag,
+        headers={
+            "Cache-Control": f"public, max-age={settings.catalog_cache_max_age}",
+            "Vary": "Accept-Encoding",
+        },
+        content_encoding=body.encoding,
+    )
 
 
 @router.post("", response_model=AchievementRead, status_code=status.HTTP_201_CREATED)
@@ -38,7 +77,102 @@ async def create_achievement(
     return AchievementRead.model_validate(achievement)
 
 
-@router.post("/grant/{user_id}/{code}", status_code=status.HTTP_201_CREATED)
+@router.post("/query", response_model=AchievementQueryResult)
+async def query_achievement_owners(
+    query: AchievementQuery,
+    service: OwnershipServiceDep,
+) -> AchievementQueryResult:
+    """
+    Ищет пользователей по булеву выражению над выданными достижениями,
+    например «есть A и B, но нет C»:
+    `{"all": [{"has": "A"}, {"has": "B"}, {"not": {"has": "C"}}]}`.
+    Выражение вычисляется над битовыми множествами владельцев достижений в
+    памяти процесса. Возвращает количество и долю подходящих пользователей и
+    страницу их идентификаторов. Если какой-то код не найден, возвращается 404.
+
+    :param query: Выражение и параметры страницы.
+    :param service: Сервис проверок по выданным достижениям.
+    :return: Количество, доля и страница идентификаторов пользователей.
+    """
+
+    try:
+        return await service.query(query)
+    except UnknownAchievementCodeError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("/{code}/stats", response_model=AchievementStats)
+async def get_achievement_stats(
+    code: str,
+    service: AchievementServiceDep,
+) -> AchievementStats:
+    """
+    Возвращает количество пользователей, получивших достижение, общее
+    количество пользователей и долю получивших в процентах. Значения
+    читаются из полос счётчиков, обновляемых в транзакциях выдачи и
+    создания пользователей.
+
+    :param code: Код достижения.
+    :param service: Сервис работы с достижениями.
+    :return: Статистика достижения.
+    """
+
+    stats = await service.get_achievement_stats(code)
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Achievement not found")
+    return stats
+
+
+@router.get("/{code}/rules", response_model=list[AchievementRuleRead])
+async def list_achievement_rules(
+    code: str,
+    service: RulesServiceDep,
+) -> list[AchievementRuleRead]:
+    """
+    Возвращает правила выдачи достижения по событиям.
+
+    :param code: Код достижения.
+    :param service: Сервис правил выдачи достижений.
+    :return: Правила достижения.
+    """
+
+    rules = await service.list_rules(code)
+    if rules is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Achievement not found")
+    return rules
+
+
+@router.post(
+    "/{code}/rules",
+    response_model=list[AchievementRuleRead],
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_achievement_rules(
+    code: str,
+    rules: list[AchievementRuleCreate],
+    service: RulesServiceDep,
+) -> list[AchievementRuleRead]:
+    """
+    Добавляет правила выдачи к существующему достижению. Правила начинают
+    обрабатывать события сразу после перезагрузки каталога.
+
+    :param code: Код достижения.
+    :param rules: Создаваемые правила.
+    :param service: Сервис правил выдачи достижений.
+    :return: Все правила достижения.
+    """
+
+    result = await service.add_rules(code, rules)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Achievement not found")
+    return result
+
+
+@router.post(
+    "/grant/{user_id}/{code}",
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": QueuedGrant}},
+)
 async def grant_achievement(
     user_id: int,
     code: str,
@@ -49,12 +183,21 @@ async def grant_achievement(
     возвращается уже существующая запись. Если пользователь или достижение
     не найдены, возвращается ошибка 404.
 
+    При GRANT_QUEUE_ENABLED выдача принимается в очередь отложенной записи:
+    код проверяется по каталогу, ответ 202 содержит токен, состояние
+    выдачи доступно по адресу из заголовка Location. Существование
+    пользователя проверяется при записи. Если очередь заполнена,
+    возвращается 503 с Retry-After.
+
     :param user_id: Идентификатор пользователя.
     :param code: Код достижения.
     :param service: Сервис работы с достижениями.
     :return: Статус операции и идентификаторы пользователя и достижения.
     """
 
+    if settings.grant_queue_enabled:
+        return await _enqueue_grant(user_id, code, service)
+
     user_achievement = await service.grant_achievement_to_user(user_id, code)
     if user_achievement is None:
         raise HTTPException(
@@ -65,3 +208,151 @@ async def grant_achievement(
         "user_id": user_achievement.user_id,
         "achievement_id": user_achievement.achievement_id,
     }
+
+
+@router.get("/grant/tokens/{token}", response_model=QueuedGrant)
+async def get_queued_grant(token: str) -> QueuedGrant:
+    """
+    Возвращает состояние выдачи, принятой в очередь отложенной записи:
+    pending, granted, already_granted, unknown_user, unknown_code или
+    failed. Состояния хранятся в памяти воркера, принявшего выдачу.
+
+    :param token: Токен выдачи из ответа 202.
+    :return: Выдача и её состояние.
+    """
+
+    queued = grant_queue.status(token)
+    if queued is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown grant token")
+    return queued
+
+
+async def _enqueue_grant(user_id: int, code: str, service: AchievementServiceDep) -> Response:
+    try:
+        queued = await grant_queue.submit(service.session, user_id, code)
+    except (GrantQueueFullError, GrantQueueClosedError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
+
+    if queued is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Achievement not found")
+    return JSONResponse(
+        queued.model_dump(mode="json"),
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/api/v1{router.prefix}/grant/tokens/{queued.token}"},
+    )
+
+
+@router.post(
+    "/grant:batch",
+    response_model=GrantBatchResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": TypeAdapter(GrantBatchItem).json_schema(),
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def grant_achievements_batch(
+    request: Request,
+    service: AchievementServiceDep,
+) -> GrantBatchResult:
+    """
+    Пакетная выдача достижений. Принимает JSON-массив элементов
+    `{user_id, code}` или поток NDJSON (Content-Type: application/x-ndjson),
+    по одному элементу на строку. Количество элементов ограничено настройкой
+    GRANT_BATCH_MAX_ITEMS. Для каждого элемента возвращается статус:
+    granted, already_granted, unknown_user или unknown_code.
+
+    :param request: Входящий HTTP-запрос с телом пакета.
+    :param service: Сервис работы с достижениями.
+    :return: Результаты выдачи по каждому элементу и сводные счётчики.
+    """
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        items = await _read_ndjson_items(request, settings.grant_batch_max_items)
+    else:
+        items = await _read_json_items(request, settings.grant_batch_max_items)
+
+    results = await service.grant_achievements_batch(items)
+    counts = Counter(result.status for result in results)
+
+    return GrantBatchResult(
+        items=results,
+        granted=counts[GrantStatus.GRANTED],
+        already_granted=counts[GrantStatus.ALREADY_GRANTED],
+        unknown_user=counts[GrantStatus.UNKNOWN_USER],
+        unknown_code=counts[GrantStatus.UNKNOWN_CODE],
+    )
+
+
+_batch_adapter = TypeAdapter(list[GrantBatchItem])
+
+
+def _too_many_items(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Batch is limited to {limit} items",
+    )
+
+
+async def _read_json_items(request: Request, limit: int) -> list[GrantBatchItem]:
+    """
+    Разбор тела запроса в формате JSON-массива.
+
+    :param request: Входящий HTTP-запрос.
+    :param limit: Максимальное количество элементов.
+    :return: Список элементов пакета.
+    """
+    try:
+        items = _batch_adapter.validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False)) from exc
+
+    if len(items) > limit:
+        raise _too_many_items(limit)
+    return items
+
+
+async def _read_ndjson_items(request: Request, limit: int) -> list[GrantBatchItem]:
+    """
+    Потоковый разбор тела запроса в формате NDJSON. Чтение прекращается,
+    как только количество элементов превышает лимит.
+
+    :param request: Входящий HTTP-запрос.
+    :param limit: Максимальное количество элементов.
+    :return: Список элементов пакета.
+    """
+    items: list[GrantBatchItem] = []
+    buffer = b""
+
+    def parse(line: bytes) -> None:
+        if not line.strip():
+            return
+        if len(items) >= limit:
+            raise _too_many_items(limit)
+        try:
+            items.append(GrantBatchItem.model_validate_json(line))
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors(include_url=False)) from exc
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse(line)
+
+    parse(buffer)
+    return items
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.deps import RulesServiceDep
+from app.core.config import settings
+from app.schemas.events import EventBatchResult, EventCreate
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.post("", response_model=EventBatchResult)
+async def ingest_events(
+    events: list[EventCreate],
+    service: RulesServiceDep,
+) -> EventBatchResult:
+    """
+    Принимает JSON-массив событий `{type, user_id, value, occurred_at}` и
+    обрабатывает их движком правил: каждое событие проверяется только
+    правилами своего типа, сработавшие правила выдают достижения.
+    Количество событий ограничено настройкой EVENTS_MAX_ITEMS.
+
+    :param events: События пользователей.
+    :param service: Сервис правил выдачи достижений.
+    :return: Сводка обработки и выданные достижения.
+    """
+
+    if len(events) > settings.events_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch is limited to {settings.events_max_items} events",
+        )
+    return await service.process_events(events)
@@ -0,0 +1,52 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+
+from app.api.deps import LeaderboardServiceDep
+from app.models.enums import Language, TimeWindow
+from app.schemas.leaderboard import LeaderboardEntry
+from app.services.pagination import InvalidCursorError
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+
+@router.get("", response_model=list[LeaderboardEntry])
+async def get_leaderboard(
+    response: Response,
+    service: LeaderboardServiceDep,
+    limit: Annotated[int, Query(ge=1, le=1000, description="Размер страницы.")] = 50,
+    cursor: Annotated[
+        str | None, Query(description="Курсор следующей страницы из заголовка X-Next-Cursor.")
+    ] = None,
+    language: Annotated[
+        Language | None, Query(description="Язык пользователей; без параметра - все языки.")
+    ] = None,
+    window: Annotated[
+        TimeWindow | None,
+        Query(description="Скользящее окно (today, 7d, 30d); без параметра - всё время."),
+    ] = None,
+) -> list[LeaderboardEntry]:
+    """
+    Возвращает страницу лидерборда: пользователей по убыванию суммы очков
+    с их местами. Лидерборд строится за всё время или за скользящее окно
+    (сегодня, 7 или 30 дней), по всем пользователям или по одному языку.
+    Лидерборды за окно кэшируются на WINDOW_CACHE_TTL секунд. Курсор
+    следующей страницы передаётся в заголовке X-Next-Cursor.
+
+    :param response: Исходящий HTTP-ответ для установки заголовков.
+    :param service: Сервис лидерборда.
+    :param limit: Размер страницы.
+    :param cursor: Курсор следующей страницы.
+    :param language: Язык пользователей.
+    :param window: Скользящее окно.
+    :return: Список позиций лидерборда.
+    """
+
+    try:
+        entries, next_cursor = await service.top(limit, cursor, language=language, window=window)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
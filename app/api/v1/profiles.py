@@ -0,0 +1,72 @@
+from dataclasses import asdict
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_HEADER, Profile, profile_store, verify_profile_token
+
+
+def require_profile_token(request: Request) -> None:
+    """
+    Доступ к профилям только с X-Profile-Token, подписанным PROFILING_SECRET
+    для пути запроса.
+
+    :param request: Входящий HTTP-запрос.
+    :return: None.
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if not verify_profile_token(settings.profiling_secret, request.url.path, token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profile token")
+
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["admin"],
+    dependencies=[Depends(require_profile_token)],
+)
+
+
+@router.get("")
+async def list_profiles() -> list[dict[str, Any]]:
+    """
+    Возвращает краткие сведения о профилях в кольцевом буфере, от новых к старым.
+
+    :return: Список профилей без стеков и SQL.
+    """
+
+    return [profile.summary() for profile in profile_store.recent()]
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str) -> dict[str, Any]:
+    """
+    Возвращает профиль запроса целиком: сведения о запросе, свёрнутые стеки
+    и SQL-операторы с временем выполнения.
+
+    :param profile_id: Идентификатор профиля.
+    :return: Профиль запроса.
+    """
+
+    return asdict(_get_or_404(profile_id))
+
+
+@router.get("/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def get_profile_collapsed(profile_id: str) -> str:
+    """
+    Возвращает стеки профиля в формате collapsed stacks, который принимают
+    flamegraph.pl и speedscope.
+
+    :param profile_id: Идентификатор профиля.
+    :return: Текст в формате collapsed stacks.
+    """
+
+    return _get_or_404(profile_id).collapsed()
+
+
+def _get_or_404(profile_id: str) -> Profile:
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
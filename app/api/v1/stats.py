@@ -1,15 +1,22 @@
-from fastapi import APIRouter
+from typing import Annotated
 
-from app.api.deps import StatsServiceDep
-from app.schemas.stats import StatsSummary
+from fastapi import APIRouter, Query, Request, Response
+
+from app.api.deps import ReadSessionFactoryDep, StatsServiceDep, stats_service
+from app.api.http_cache import cached_json_response
+from app.api.read_routing import reads_from_primary
+from app.core.db import AsyncSessionFactory
+from app.models.enums import Language, TimeWindow
+from app.schemas.stats import StatsSummary, UserWithStreak, WindowStatsSummary
+from app.services.stats import StatsService
+from app.services.stats_cache import stats_cache
+from app.services.window_cache import window_cache
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 
 @router.get("", response_model=StatsSummary)
-async def get_stats_summary(
-    service: StatsServiceDep,
-) -> StatsSummary:
+async def get_stats_summary(request: Request) -> Response:
     """
     Возвращает в одном ответе:
       * пользователя с максимальным количеством достижений;
@@ -17,17 +24,78 @@ async def get_stats_summary(
       * пару пользователей с максимальной разностью очков;
       * пару пользователей с минимальной ненулевой разностью очков;
       * пользователей, получавших достижения 7 дней подряд.
+
+    Сводка кэшируется и инвалидируется при выдаче достижений и создании
+    пользователей. Инвалидация следует за коммитами в основной базе, поэтому
+    сводка вычисляется в основной базе, а не на реплике; клиенты с
+    привязкой к основной базе (read-your-writes) обходят кэш. Ответ
+    содержит ETag; при совпадении If-None-Match возвращается 304 без тела.
+    Время выполнения каждого подзапроса передаётся в заголовке Server-Timing.
+    """
+
+    cached, hit = await stats_cache.get_or_compute(
+        AsyncSessionFactory,
+        lambda session: stats_service(session, AsyncSessionFactory).summary(streak_min_days=7),
+        bypass=reads_from_primary(request),
+    )
+    server_timing = 'cache;desc="hit"' if hit else format_server_timing(cached.timings)
+    return cached_json_response(
+        request,
+        cached.body,
+        cached.etag,
+        headers={"Cache-Control": "no-cache", "Server-Timing": server_timing},
+    )
+
+
+@router.get("/streaks", response_model=list[UserWithStreak])
+async def get_streak_users(
+    service: StatsServiceDep,
+    min_days: Annotated[int, Query(ge=1, description="Минимальная длина стрика в днях.")] = 7,
+) -> list[UserWithStreak]:
+    """
+    Возвращает пользователей, у которых максимальный стрик получения
+    достижений не короче min_days дней подряд.
+
+    :param service: Сервис статистики.
+    :param min_days: Минимальная длина стрика в днях.
+    :return: Список пользователей с длиной максимального стрика.
+    """
+
+    return await service.users_with_7day_streak(min_days=min_days)
+
+
+@router.get("/window", response_model=WindowStatsSummary)
+async def get_window_stats(
+    session_factory: ReadSessionFactoryDep,
+    window: Annotated[TimeWindow, Query(description="Скользящее окно (today, 7d, 30d).")],
+    language: Annotated[
+        Language | None, Query(description="Язык пользователей; без параметра - все языки.")
+    ] = None,
+) -> WindowStatsSummary:
     """
+    Возвращает сводную статистику по очкам за скользящее окно: количество
+    активных пользователей, сумму очков, лидера окна и пары пользователей
+    с максимальной и минимальной ненулевой разностью очков за окно.
+    Сводка кэшируется на WINDOW_CACHE_TTL секунд.
 
-    max_achievements = await service.user_with_max_achievements()
-    max_points = await service.user_with_max_points()
-    max_diff, min_diff = await service.max_min_points_diff()
-    streak_users = await service.users_with_7day_streak(min_days=7)
+    :param session_factory: Фабрика сессий, выбранная для запроса.
+    :param window: Скользящее окно.
+    :param language: Язык пользователей.
+    :return: Сводная статистика за окно.
+    """
 
-    return StatsSummary(
-        max_achievements=max_achievements,
-        max_points=max_points,
-        max_points_diff=max_diff,
-        min_points_diff=min_diff,
-        streak_users=streak_users,
+    return await window_cache.get_or_compute(
+        ("stats", window, language),
+        session_factory,
+        lambda session: StatsService(session).window_summary(window, language),
     )
+
+
+def format_server_timing(timings: dict[str, float]) -> str:
+    """
+    Форматирование замеров времени в значение заголовка Server-Timing.
+
+    :param timings: Словарь имя метрики → длительность в миллисекундах.
+    :return: Значение заголовка, например `streaks;dur=1.25, total;dur=3.40`.
+    """
+    return ", ".join(f"{name};dur={duration:.2f}" for name, duration in timings.items())
@@ -1,8 +1,21 @@
-from fastapi import APIRouter, HTTPException, status
+from collections.abc import AsyncIterator
+from typing import Annotated
 
-from app.api.deps import UserServiceDep
-from app.schemas.achievements import UserAchievementRead
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import (
+    LeaderboardServiceDep,
+    OwnershipServiceDep,
+    UserReadServiceDep,
+    UserServiceDep,
+)
+from app.api.http_cache import NDJSON_MEDIA_TYPE
+from app.schemas.achievements import AchievementOwnership, UserAchievementRead
+from app.schemas.leaderboard import UserRank
 from app.schemas.users import UserCreate, UserRead
+from app.services.ownership import UnknownAchievementCodeError
+from app.services.pagination import InvalidCursorError
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -27,7 +40,7 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user(
     user_id: int,
-    user_service: UserServiceDep,
+    user_service: UserReadServiceDep,
 ) -> UserRead:
     """
     Возвращает данные пользователя по его идентификатору. Если пользователь
@@ -47,17 +60,107 @@ async def get_user(
 @router.get("/{user_id}/achievements", response_model=list[UserAchievementRead])
 async def get_user_achievements(
     user_id: int,
-    user_service: UserServiceDep,
-) -> list[UserAchievementRead]:
+    request: Request,
+    response: Response,
+    user_service: UserReadServiceDep,
+    limit: Annotated[
+        int | None,
+        Query(ge=1, le=1000, description="Размер страницы. Без него возвращаются все достижения."),
+    ] = None,
+    cursor: Annotated[
+        str | None, Query(description="Курсор следующей страницы из заголовка X-Next-Cursor.")
+    ] = None,
+) -> list[UserAchievementRead] | Response:
     """
-    Возвращает список выданных пользователю достижений с учётом выбранного им языка.
+    Возвращает список выданных пользователю достижений с учётом выбранного им языка,
+    от новых к старым. При указании limit возвращается одна страница, а курсор
+    следующей страницы передаётся в заголовке X-Next-Cursor. Если клиент
+    принимает application/x-ndjson, достижения отдаются потоком, по одному
+    JSON-объекту на строку.
 
     :param user_id: Идентификатор пользователя.
+    :param request: Входящий HTTP-запрос.
+    :param response: Исходящий HTTP-ответ для установки заголовков.
     :param user_service: Сервис работы с пользователями.
+    :param limit: Размер страницы.
+    :param cursor: Курсор следующей страницы.
     :return: Список достижений пользователя.
     """
 
-    user, achievements = await user_service.get_user_achievements(user_id)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            rows = await user_service.stream_user_achievements(user_id, cursor)
+            if rows is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            return StreamingResponse(_ndjson_lines(rows), media_type=NDJSON_MEDIA_TYPE)
+
+        page = await user_service.get_user_achievements(user_id, limit=limit, cursor=cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    achievements, next_cursor = page
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return achievements
+
+
+@router.get("/{user_id}/achievements/has", response_model=AchievementOwnership)
+async def has_achievements(
+    user_id: int,
+    ownership_service: OwnershipServiceDep,
+    codes: Annotated[
+        list[str],
+        Query(
+            min_length=1,
+            description="Коды достижений: повторяющийся параметр или список через запятую.",
+        ),
+    ],
+) -> AchievementOwnership:
+    """
+    Проверяет, выданы ли пользователю указанные достижения. Ответ строится
+    по битовой строке выданных достижений пользователя одним чтением строки
+    users. Если пользователь не найден, возвращается ошибка 404, если
+    какой-то код не найден - тоже 404.
+
+    :param user_id: Идентификатор пользователя.
+    :param ownership_service: Сервис проверок по выданным достижениям.
+    :param codes: Коды достижений.
+    :return: Наличие каждого достижения.
+    """
+
+    codes = list(dict.fromkeys(code for value in codes for code in value.split(",") if code))
+    try:
+        ownership = await ownership_service.has_achievements(user_id, codes)
+    except UnknownAchievementCodeError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    if ownership is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return ownership
+
+
+@router.get("/{user_id}/rank", response_model=UserRank)
+async def get_user_rank(
+    user_id: int,
+    leaderboard_service: LeaderboardServiceDep,
+) -> UserRank:
+    """
+    Возвращает место пользователя в глобальном лидерборде по сумме очков.
+    Если пользователь не найден, возвращается ошибка 404.
+
+    :param user_id: Идентификатор пользователя.
+    :param leaderboard_service: Сервис лидерборда.
+    :return: Место пользователя и количество пользователей в лидерборде.
+    """
+
+    rank = await leaderboard_service.user_rank(user_id)
+    if rank is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return rank
+
+
+async def _ndjson_lines(rows: AsyncIterator[UserAchievementRead]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield row.model_dump_json().encode() + b"\n"
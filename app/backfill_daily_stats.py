@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from app.core.db import AsyncSessionFactory
+from app.services.daily_stats import DailyStatsService
+
+
+async def main(chunk_size: int) -> None:
+    """
+    Точка входа скрипта пересчёта дневной статистики: перестраивает таблицу
+    user_daily_stats по журналу user_achievements чанками по пользователям.
+
+    :param chunk_size: Количество идентификаторов пользователей в одном чанке.
+    :return: None.
+    """
+    async with AsyncSessionFactory() as session:
+        print(f"Rebuilding user_daily_stats (chunk size {chunk_size})...")
+        rows = await DailyStatsService(session).rebuild(chunk_size=chunk_size)
+        print(f"Done. {rows} daily stat rows written.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild user_daily_stats from user_achievements.")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="Количество идентификаторов пользователей в одном чанке.",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size))
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import sys
+
+from app.core.db import AsyncSessionFactory
+from app.services.consistency import ConsistencyService
+from app.services.stats_cache import stats_cache
+
+
+async def main(args: argparse.Namespace) -> int:
+    """
+    Точка входа скрипта проверки: сверяет users.total_points,
+    users.achievements_count и users.achievement_bits с журналом выдач,
+    полосы счётчиков редкости - с журналом выдач и таблицей users и, если
+    указан --repair, исправляет расхождения.
+
+    :param args: Аргументы командной строки.
+    :return: Код выхода: 1, если найдены неисправленные расхождения, иначе 0.
+    """
+    async with AsyncSessionFactory() as session:
+        report = await ConsistencyService(session).check_user_totals(
+            chunk_size=args.chunk_size,
+            repair=args.repair,
+            max_samples=args.samples,
+        )
+        counter_drifts = await ConsistencyService(session).reconcile_counters(repair=args.repair)
+
+    for drift in report.samples:
+        print(
+            f"user_id={drift.user_id}: "
+            f"total_points {drift.total_points} (expected {drift.expected_points}), "
+            f"achievements_count {drift.achievements_count} (expected {drift.expected_count})"
+            + ("" if drift.achievement_bits_ok else ", achievement_bits stale")
+        )
+    print(f"Checked {report.checked} users: {report.drifted} drifted, {report.repaired} repaired.")
+
+    for drift in counter_drifts:
+        name = "users" if drift.achievement_id is None else f"achievement_id={drift.achievement_id}"
+        print(f"{name}: counter {drift.current} (expected {drift.expected})")
+    print(
+        f"Rarity counters: {len(counter_drifts)} drifted"
+        + (", repaired." if args.repair and counter_drifts else ".")
+    )
+
+    if report.repaired:
+        await stats_cache.invalidate()
+    unrepaired_counters = 0 if args.repair else len(counter_drifts)
+    return 1 if report.drifted > report.repaired or unrepaired_counters else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Verify denormalized user counters, achievement bits and rarity counters "
+            "against grants."
+        )
+    )
+    parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="Исправить найденные расхождения.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="Количество идентификаторов пользователей в одном чанке проверки.",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20,
+        help="Сколько первых расхождений вывести.",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
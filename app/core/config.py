@@ -1,8 +1,13 @@
 from os import getenv
+from pathlib import Path
+from tempfile import gettempdir
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.models.enums import Language
+
 
 class Settings(BaseSettings):
     """
@@ -11,7 +16,268 @@ class Settings(BaseSettings):
     """
 
     database_url: str = Field(alias="DATABASE_URL", description="Строка подключения к базе данных.")
+    read_database_url: str | None = Field(
+        default=None,
+        alias="READ_DATABASE_URL",
+        description=(
+            "Строка подключения к реплике для читающих запросов; "
+            "если не задана, чтение идёт в основную базу."
+        ),
+    )
+    read_primary_pin_seconds: float = Field(
+        default=5.0,
+        description=(
+            "Сколько секунд после пишущего запроса клиент читает из основной базы "
+            "(read-your-writes); 0 отключает привязку."
+        ),
+    )
     debug: bool = Field(default=False, description="Флаг включения режима отладки.")
+    db_pool_size: int = Field(
+        default=10,
+        description="Количество постоянных соединений в пуле одного процесса.",
+    )
+    db_max_overflow: int = Field(
+        default=10,
+        description="Сколько соединений сверх db_pool_size может быть открыто при пиковой нагрузке.",
+    )
+    db_pool_timeout: float = Field(
+        default=30.0,
+        description="Сколько секунд ждать свободного соединения, прежде чем вернуть ошибку.",
+    )
+    db_pool_recycle: int = Field(
+        default=1800,
+        description="Через сколько секунд пересоздавать соединение; -1 отключает пересоздание.",
+    )
+    db_pool_pre_ping: bool = Field(
+        default=True,
+        description="Проверять соединение перед выдачей из пула.",
+    )
+    db_statement_cache_size: int = Field(
+        default=100,
+        description=(
+            "Размер кэша подготовленных выражений asyncpg на соединение; "
+            "0 отключает кэш (нужно для PgBouncer в режиме transaction)."
+        ),
+    )
+    db_statement_timeout_ms: int = Field(
+        default=30_000,
+        description="Серверный statement_timeout в миллисекундах; 0 отключает ограничение.",
+    )
+    db_idle_in_transaction_timeout_ms: int = Field(
+        default=60_000,
+        description=(
+            "Серверный idle_in_transaction_session_timeout в миллисекундах; "
+            "0 отключает ограничение."
+        ),
+    )
+    request_query_warn_threshold: int = Field(
+        default=20,
+        description=(
+            "Количество SQL-операторов за один HTTP-запрос, после которого пишется "
+            "предупреждение о вероятном N+1; 0 отключает проверку."
+        ),
+    )
+    profiling_enabled: bool = Field(
+        default=False,
+        description=(
+            "Включить профилирование запросов по X-Profile-Token или доле запросов; "
+            "в выключенном состоянии middleware профилирования не подключается."
+        ),
+    )
+    profiling_secret: str | None = Field(
+        default=None,
+        description="Секрет HMAC для X-Profile-Token и доступа к /admin/profiles.",
+    )
+    profiling_sample_rate: float = Field(
+        default=0.0,
+        ge=0.0,
+        le=1.0,
+        description="Доля случайно профилируемых запросов от 0 до 1.",
+    )
+    profiling_interval_ms: float = Field(
+        default=5.0,
+        gt=0,
+        description="Интервал снятия стека профайлером в миллисекундах.",
+    )
+    profiling_dir: str = Field(
+        default=str(Path(gettempdir()) / "achievements-api-profiles"),
+        description="Каталог кольцевого буфера профилей.",
+    )
+    profiling_max_profiles: int = Field(
+        default=50,
+        description="Сколько последних профилей хранить на диске.",
+    )
+    stats_parallel: bool = Field(
+        default=False,
+        description=(
+            "Выполнять подзапросы /stats параллельно на отдельных соединениях "
+            "из пула в общем снимке данных."
+        ),
+    )
+    stats_cache_ttl: float = Field(
+        default=30.0,
+        description="Время жизни закэшированной сводки /stats в секундах; 0 отключает кэш.",
+    )
+    stats_cache_backend: Literal["memory", "redis"] = Field(
+        default="memory",
+        description="Бэкенд кэша сводки /stats: LRU в памяти процесса или Redis.",
+    )
+    stats_cache_max_entries: int = Field(
+        default=128,
+        description="Максимальное количество записей в LRU-кэше в памяти процесса.",
+    )
+    grant_batch_max_items: int = Field(
+        default=1000,
+        description="Максимальное количество элементов в одном запросе пакетной выдачи.",
+    )
+    events_max_items: int = Field(
+        default=5000,
+        description="Максимальное количество событий в одном запросе POST /events.",
+    )
+    rules_micro_batch_size: int = Field(
+        default=1000,
+        description=(
+            "Количество событий в одной микропачке движка правил; каждая микропачка "
+            "вычисляется и фиксируется отдельной транзакцией."
+        ),
+    )
+    grant_queue_enabled: bool = Field(
+        default=False,
+        description=(
+            "Принимать одиночные выдачи в очередь отложенной записи и отвечать 202 "
+            "с токеном вместо синхронного коммита."
+        ),
+    )
+    grant_queue_max_size: int = Field(
+        default=10_000,
+        description="Ёмкость очереди отложенной записи выдач в одном процессе.",
+    )
+    grant_queue_put_timeout: float = Field(
+        default=0.1,
+        description=(
+            "Сколько секунд ждать места в заполненной очереди выдач, прежде чем ответить 503."
+        ),
+    )
+    grant_queue_batch_size: int = Field(
+        default=500,
+        description="Максимальное количество выдач в одной пачке записи.",
+    )
+    grant_queue_flush_interval: float = Field(
+        default=0.05,
+        description="Сколько секунд пачка набирается после первой выдачи, прежде чем записаться.",
+    )
+    grant_queue_log_path: str | None = Field(
+        default=None,
+        description=(
+            "Путь к локальному журналу принятых выдач (append-only); незаписанные "
+            "выдачи из журнала применяются при следующем старте. Если не задан, "
+            "очередь хранится только в памяти."
+        ),
+    )
+    grant_queue_max_tracked: int = Field(
+        default=100_000,
+        description="Сколько последних токенов выдач хранить для проверки состояния.",
+    )
+    grant_queue_shutdown_timeout: float = Field(
+        default=10.0,
+        description="Сколько секунд при остановке ждать записи оставшихся в очереди выдач.",
+    )
+    catalog_listen_notify: bool = Field(
+        default=False,
+        description=(
+            "Перезагружать каталог достижений по уведомлениям Postgres LISTEN/NOTIFY "
+            "об изменениях в других воркерах."
+        ),
+    )
+    catalog_listen_check_interval: float = Field(
+        default=5.0,
+        gt=0,
+        description=(
+            "Интервал в секундах проверки соединения LISTEN/NOTIFY каталога; "
+            "потерянное соединение переподключается."
+        ),
+    )
+    catalog_miss_reload_interval: float = Field(
+        default=1.0,
+        description=(
+            "Минимальный интервал в секундах между перезагрузками каталога "
+            "при обращении к неизвестному коду достижения."
+        ),
+    )
+    catalog_cache_max_age: int = Field(
+        default=60,
+        description="Значение max-age в Cache-Control для GET /achievements, в секундах.",
+    )
+    leaderboard_refresh_interval: float = Field(
+        default=30.0,
+        description=(
+            "Интервал в секундах, после которого индекс рангов в памяти процесса "
+            "перезагружается из БД, чтобы учесть выдачи в других воркерах; "
+            "0 отключает перезагрузку."
+        ),
+    )
+    ownership_refresh_interval: float = Field(
+        default=30.0,
+        description=(
+            "Интервал в секундах, после которого индекс выдач в памяти процесса "
+            "(POST /achievements/query) перезагружается из БД, чтобы учесть выдачи "
+            "в других воркерах; 0 отключает перезагрузку."
+        ),
+    )
+    counter_stripes: int = Field(
+        default=16,
+        ge=1,
+        description=(
+            "Количество полос счётчиков выдач достижений и пользователей; выдачи разных "
+            "пользователей увеличивают разные строки, а не одну горячую."
+        ),
+    )
+    rarity_refresh_interval: float = Field(
+        default=5.0,
+        description=(
+            "Интервал в секундах, после которого счётчики редкости в списке достижений "
+            "перечитываются из полос счётчиков; 0 - читать при каждом запросе."
+        ),
+    )
+    user_points_stripes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Количество полос user_points_deltas на пользователя: выдачи копят очки, "
+            "счётчик и биты достижений в полосах вместо строки users, а фоновая задача "
+            "переносит их в users; 0 отключает режим."
+        ),
+    )
+    user_points_fold_interval: float = Field(
+        default=1.0,
+        gt=0,
+        description="Интервал в секундах между переносами полос user_points_deltas в users.",
+    )
+    user_points_fold_batch_size: int = Field(
+        default=10_000,
+        description="Максимальное количество полос, переносимых одной транзакцией.",
+    )
+    window_cache_ttl: float = Field(
+        default=5.0,
+        description=(
+            "Время жизни закэшированных лидербордов и сводок за скользящее окно "
+            "в секундах; 0 отключает кэш."
+        ),
+    )
+    window_cache_max_entries: int = Field(
+        default=256,
+        description="Максимальное количество закэшированных результатов по скользящим окнам.",
+    )
+    default_language: Language = Field(
+        default=Language.EN,
+        description=(
+            "Язык перевода достижения, который отдаётся, если перевода на языке пользователя нет."
+        ),
+    )
+    redis_url: str | None = Field(
+        default=None,
+        description="URL Redis для бэкенда кэша redis.",
+    )
 
     model_config = SettingsConfigDict(
         env_file=getenv("ENV_FILE", ".env"),
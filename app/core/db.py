@@ -1,23 +1,65 @@
 from collections.abc import AsyncGenerator
+from typing import Any
 
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
+from app.core.metrics import InstrumentedAsyncPool
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-)
+
+def build_engine(url: str) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок с настройками пула, кэша подготовленных
+    выражений и серверных таймаутов из конфигурации приложения и
+    подключает к нему учёт времени SQL-операторов по HTTP-запросам.
+
+    :param url: Строка подключения к базе данных.
+    :return: Асинхронный движок SQLAlchemy.
+    """
+    connect_args: dict[str, Any] = {
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "server_settings": {
+            "statement_timeout": str(settings.db_statement_timeout_ms),
+            "idle_in_transaction_session_timeout": str(settings.db_idle_in_transaction_timeout_ms),
+        },
+    }
+
+    engine = create_async_engine(
+        url,
+        echo=settings.debug,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+engine = build_engine(settings.database_url)
 
 AsyncSessionFactory = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
 )
 
+read_engine = build_engine(settings.read_database_url) if settings.read_database_url else engine
+
+ReadSessionFactory = async_sessionmaker(
+    bind=read_engine,
+    expire_on_commit=False,
+)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
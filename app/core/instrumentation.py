@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+QUERY_STARTED_AT = "query_started_at"
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL statements per HTTP request.",
+    ("method", "route"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+
+REQUEST_METRICS = (REQUEST_DURATION, REQUEST_DB_DURATION, REQUEST_DB_QUERIES)
+
+
+@dataclass
+class RequestDbStats:
+    """
+    Накопленная статистика обращений к БД в рамках одного HTTP-запроса.
+
+    Поля:
+        queries: Количество выполненных SQL-операторов.
+        seconds: Суммарное время их выполнения в секундах.
+        statements: Тексты операторов и время каждого; собираются только
+            для профилируемых запросов, иначе None.
+    """
+
+    queries: int = 0
+    seconds: float = 0.0
+    statements: list[tuple[str, float]] | None = None
+
+
+_request_db_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Подключение обработчиков before/after_cursor_execute, которые относят
+    время выполнения каждого SQL-оператора к текущему HTTP-запросу, и
+    handle_error, который сбрасывает время начала упавшего оператора.
+    Операторы вне HTTP-запроса (CLI, фоновые задачи) не учитываются.
+
+    :param engine: Синхронный движок (AsyncEngine.sync_engine).
+    :return: None.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, *_: Any) -> None:
+        conn.info[QUERY_STARTED_AT] = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Any, cursor: Any, statement: str, *_: Any) -> None:
+        started = conn.info.pop(QUERY_STARTED_AT, None)
+        if started is None:
+            return
+        elapsed = perf_counter() - started
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context: Any) -> None:
+        # Упавший оператор не доходит до after_cursor_execute, поэтому время
+        # начала оператора снимается здесь и не остаётся на соединении в пуле.
+        if context.connection is not None:
+            context.connection.info.pop(QUERY_STARTED_AT, None)
+
+
+def current_request_db_stats() -> RequestDbStats | None:
+    """
+    Статистика обращений к БД текущего HTTP-запроса.
+
+    :return: Накопитель текущего запроса или None вне HTTP-запроса.
+    """
+    return _request_db_stats.get()
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI-middleware, записывающее задержку каждого HTTP-запроса, время и
+    количество SQL-операторов в гистограммы по шаблону маршрута. Время
+    считается до отправки последней части тела, поэтому потоковые ответы
+    учитываются целиком. Если запрос выполнил больше
+    REQUEST_QUERY_WARN_THRESHOLD операторов, пишется предупреждение
+    о вероятном N+1.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+        started = perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db_stats.reset(token)
+            self._record(scope, status_code, perf_counter() - started, stats)
+
+    @staticmethod
+    def _record(scope: Scope, status_code: int, elapsed: float, stats: RequestDbStats) -> None:
+        path = _route_template(scope)
+        method = scope["method"]
+
+        REQUEST_DURATION.observe(elapsed, method, path, str(status_code))
+        REQUEST_DB_DURATION.observe(stats.seconds, method, path)
+        REQUEST_DB_QUERIES.observe(stats.queries, method, path)
+
+        threshold = settings.request_query_warn_threshold
+        if threshold > 0 and stats.queries > threshold:
+            logger.warning(
+                "Possible N+1: %s %s executed %d SQL statements (%.1f ms in DB)",
+                method,
+                path,
+                stats.queries,
+                stats.seconds * 1000,
+            )
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута запроса для меток метрик, например /api/v1/users/{user_id}.
+    В зависимости от версии FastAPI маршрут из подключённого роутера может
+    хранить путь без префикса include_router, поэтому префикс берётся из
+    фактического пути запроса.
+
+    :param scope: ASGI scope обработанного запроса.
+    :return: Шаблон маршрута или "unmatched", если маршрут не найден.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    if ":path}" in template:
+        return template
+
+    segments = scope["path"].strip("/").split("/")
+    tail = template.strip("/").split("/")
+    prefix = segments[: max(len(segments) - len(tail), 0)]
+    return "/" + "/".join([*prefix, *tail]).strip("/")
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Literal, Protocol
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Exposable(Protocol):
+    """Метрика, которая умеет выводить себя в текстовом формате Prometheus."""
+
+    def render(self) -> list[str]: ...
+
+
+@dataclass(frozen=True)
+class Metric:
+    """
+    Значение метрики для экспозиции в текстовом формате Prometheus.
+
+    Поля:
+        name: Имя метрики.
+        kind: Тип метрики: gauge или counter.
+        help: Описание метрики.
+        value: Текущее значение.
+    """
+
+    name: str
+    kind: Literal["gauge", "counter"]
+    help: str
+    value: float
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name} {self.value:g}",
+        ]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин и метками. Значения
+    накапливаются в памяти процесса; каждая комбинация значений меток
+    образует отдельный ряд.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Добавление наблюдения.
+
+        :param value: Наблюдаемое значение.
+        :param labels: Значения меток в порядке labelnames.
+        :return: None.
+        """
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries([0] * len(self.buckets))
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.counts[index] += 1
+        series.count += 1
+        series.total += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, labels, strict=True)
+            ]
+            for bound, count in zip(self.buckets, series.counts, strict=True):
+                le = f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels([*pairs, le])} {count}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels([*pairs, inf])} {series.count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {series.total:g}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {series.count}")
+        return lines
+
+
+@dataclass
+class _HistogramSeries:
+    counts: list[int]
+    count: int = 0
+    total: float = 0.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: list[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_metrics(metrics: Iterable[Exposable]) -> str:
+    """
+    Сериализация метрик в текстовый формат Prometheus.
+
+    :param metrics: Метрики для вывода.
+    :return: Текст для ответа /metrics.
+    """
+    lines: list[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class PoolWaitStats:
+    """
+    Накопленная статистика ожидания соединения из пула.
+
+    Поля:
+        count: Количество выдач соединения.
+        total_seconds: Суммарное время ожидания в секундах.
+        max_seconds: Максимальное время ожидания в секундах.
+        timeouts: Количество отказов по pool_timeout.
+    """
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    timeouts: int = 0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время получения соединения: ожидание
+    свободного слота, создание нового соединения и pre-ping.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self) -> Any:
+        started = perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.observe(perf_counter() - started)
+        return connection
+
+
+def pool_metrics(pool: Pool, prefix: str = "db_pool") -> list[Metric]:
+    """
+    Снимок состояния пула соединений процесса. Каждый воркер uvicorn имеет
+    собственный пул, поэтому значения относятся к отвечающему воркеру.
+
+    :param pool: Пул соединений движка.
+    :param prefix: Префикс имён метрик.
+    :return: Список метрик пула.
+    """
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return []
+
+    size = pool.size()
+    overflow = pool.overflow()
+    metrics = [
+        Metric(f"{prefix}_size", "gauge", "Configured pool size.", size),
+        Metric(
+            f"{prefix}_max_overflow", "gauge", "Configured maximum overflow.", pool._max_overflow
+        ),
+        Metric(f"{prefix}_connections", "gauge", "Open connections.", size + overflow),
+        Metric(f"{prefix}_checked_out", "gauge", "Connections in use.", pool.checkedout()),
+        Metric(f"{prefix}_checked_in", "gauge", "Idle connections in the pool.", pool.checkedin()),
+        Metric(
+            f"{prefix}_overflow", "gauge", "Connections open beyond pool size.", max(overflow, 0)
+        ),
+    ]
+
+    if isinstance(pool, InstrumentedAsyncPool):
+        stats = pool.wait_stats
+        metrics += [
+            Metric(f"{prefix}_checkouts_total", "counter", "Connection checkouts.", stats.count),
+            Metric(
+                f"{prefix}_wait_seconds_total",
+                "counter",
+                "Total time spent acquiring a connection.",
+                stats.total_seconds,
+            ),
+            Metric(
+                f"{prefix}_wait_seconds_max",
+                "gauge",
+                "Longest time spent acquiring a connection.",
+                stats.max_seconds,
+            ),
+            Metric(
+                f"{prefix}_timeouts_total",
+                "counter",
+                "Checkouts that failed after pool_timeout.",
+                stats.timeouts,
+            ),
+        ]
+
+    return metrics
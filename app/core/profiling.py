@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter, time, time_ns
+from types import CodeType, FrameType
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.instrumentation import current_request_db_stats
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-token"
+AWAITING_FRAME = "[awaiting]"
+TOKEN_MAX_AGE = 300
+
+_PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{8}$")
+_LIBRARY_PATH = re.compile(r"/(?:site-packages|lib/python\d+\.\d+)/")
+
+
+def sign_profile_token(secret: str, path: str, timestamp: int | None = None) -> str:
+    """
+    Формирование токена для заголовка X-Profile-Token. Токен привязан к пути
+    запроса и действует TOKEN_MAX_AGE секунд.
+
+    :param secret: Секрет PROFILING_SECRET.
+    :param path: Путь запроса, например /api/v1/stats.
+    :param timestamp: Время формирования (unix time) или None для текущего.
+    :return: Токен вида "<timestamp>.<hmac-sha256>".
+    """
+    timestamp = int(time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}:{path}".encode(), hashlib.sha256)
+    return f"{timestamp}.{digest.hexdigest()}"
+
+
+def verify_profile_token(secret: str | None, path: str, token: str | None) -> bool:
+    """
+    Проверка токена из заголовка X-Profile-Token.
+
+    :param secret: Секрет PROFILING_SECRET; без него токены не принимаются.
+    :param path: Путь запроса.
+    :param token: Значение заголовка.
+    :return: True, если токен подписан секретом для этого пути и не устарел.
+    """
+    if not secret or not token:
+        return False
+
+    timestamp, _, _ = token.partition(".")
+    if not timestamp.isdigit() or abs(time() - int(timestamp)) > TOKEN_MAX_AGE:
+        return False
+    return hmac.compare_digest(token, sign_profile_token(secret, path, int(timestamp)))
+
+
+@dataclass
+class Profile:
+    """
+    Профиль одного HTTP-запроса.
+
+    Поля:
+        id: Идентификатор профиля, упорядоченный по времени создания.
+        method: HTTP-метод.
+        path: Путь запроса.
+        status: Код ответа.
+        started_at: Время начала запроса (unix time).
+        duration_ms: Длительность запроса в миллисекундах.
+        interval_ms: Интервал между снимками стека в миллисекундах.
+        samples: Количество снятых снимков стека.
+        stacks: Свёрнутые стеки (collapsed stacks) и количество их снимков.
+        sql: SQL-операторы запроса и время их выполнения в миллисекундах.
+    """
+
+    id: str
+    method: str
+    path: str
+    status: int
+    started_at: float
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    stacks: dict[str, int] = field(default_factory=dict)
+    sql: list[dict[str, Any]] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        data = asdict(self)
+        data.pop("stacks")
+        data.pop("sql")
+        data["sql_statements"] = len(self.sql)
+        return data
+
+    def collapsed(self) -> str:
+        """
+        Свёрнутые стеки в формате flamegraph.pl / speedscope: одна строка
+        на уникальный стек, кадры от корня к вершине через ";" и количество
+        снимков через пробел.
+
+        :return: Текст в формате collapsed stacks.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfileStore:
+    """
+    Кольцевой буфер профилей на диске: каждый профиль хранится в отдельном
+    JSON-файле, при превышении max_profiles самые старые файлы удаляются.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], max_profiles: int) -> None:
+        self.directory = Path(directory)
+        self.max_profiles = max(max_profiles, 1)
+
+    def save(self, profile: Profile) -> None:
+        """
+        Запись профиля и удаление вышедших за пределы буфера.
+
+        :param profile: Профиль запроса.
+        :return: None.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{profile.id}.tmp"
+        tmp.write_text(json.dumps(asdict(profile)))
+        tmp.replace(self.directory / f"{profile.id}.json")
+
+        for stale in self._files()[: -self.max_profiles]:
+            stale.unlink(missing_ok=True)
+
+    def recent(self) -> list[Profile]:
+        """
+        Профили в буфере, от новых к старым.
+
+        :return: Список профилей.
+        """
+        profiles = [self._read(path) for path in reversed(self._files())]
+        return [profile for profile in profiles if profile is not None]
+
+    def get(self, profile_id: str) -> Profile | None:
+        """
+        Получение профиля по идентификатору.
+
+        :param profile_id: Идентификатор профиля.
+        :return: Профиль или None, если он не найден или уже вытеснен.
+        """
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        return self._read(self.directory / f"{profile_id}.json")
+
+    def _files(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            self.directory.glob("*.json"), key=lambda path: int(path.stem.split("-", 1)[0])
+        )
+
+    @staticmethod
+    def _read(path: Path) -> Profile | None:
+        try:
+            return Profile(**json.loads(path.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+class StackSampler:
+    """
+    Сэмплирующий профайлер одной asyncio-задачи. Фоновый поток с заданным
+    интервалом снимает стек потока event loop, если задача выполняется, или
+    цепочку ожидающих корутин задачи, если она приостановлена на await.
+    Поэтому профиль отражает полное (wall-clock) время запроса, включая
+    ожидание БД, а кадры других одновременных запросов в него не попадают.
+    """
+
+    def __init__(self, task: asyncio.Task[Any], interval: float) -> None:
+        self.task = task
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._thread_id = threading.get_ident()
+        self._loop = task.get_loop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+
+    def _sample(self) -> list[str]:
+        root = _coroutine_frame(self.task.get_coro())
+        if root is None:
+            return []
+
+        if asyncio.tasks._current_tasks.get(self._loop) is self.task:
+            frame = sys._current_frames().get(self._thread_id)
+            frames = _thread_stack(frame, root.f_code)
+            return [_label(code) for code in frames]
+
+        frames = _awaiting_stack(self.task.get_coro())
+        return [*(_label(code) for code in frames), AWAITING_FRAME]
+
+
+def _coroutine_frame(coro: Any) -> FrameType | None:
+    return getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+
+
+def _thread_stack(frame: FrameType | None, root: CodeType) -> list[CodeType]:
+    codes: list[CodeType] = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        if frame.f_code is root:
+            break
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+def _awaiting_stack(coro: Any) -> list[CodeType]:
+    codes: list[CodeType] = []
+    while coro is not None:
+        frame = _coroutine_frame(coro)
+        if frame is None:
+            break
+        codes.append(frame.f_code)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return codes
+
+
+def _label(code: CodeType) -> str:
+    filename = _LIBRARY_PATH.split(code.co_filename)[-1]
+    if filename.startswith("/"):
+        filename = os.path.relpath(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware, профилирующее выбранные запросы: с действительным
+    X-Profile-Token или случайную долю PROFILING_SAMPLE_RATE. Подключается
+    только при PROFILING_ENABLED=true, поэтому в выключенном состоянии не
+    добавляет накладных расходов. Должно быть внутренним по отношению к
+    RequestMetricsMiddleware, чтобы получить доступ к учёту SQL-операторов.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        exclude_prefixes: tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(self.exclude_prefixes)
+            or not self._should_profile(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        assert task is not None
+        sampler = StackSampler(task, settings.profiling_interval_ms / 1000)
+
+        db_stats = current_request_db_stats()
+        if db_stats is not None:
+            db_stats.statements = []
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time()
+        started = perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = perf_counter() - started
+            sampler.stop()
+            profile = Profile(
+                id=f"{time_ns()}-{random.getrandbits(32):08x}",
+                method=scope["method"],
+                path=scope["path"],
+                status=status_code,
+                started_at=started_at,
+                duration_ms=round(duration * 1000, 3),
+                interval_ms=settings.profiling_interval_ms,
+                samples=sampler.samples,
+                stacks=dict(sampler.stacks.most_common()),
+                sql=[
+                    {"statement": statement, "ms": round(seconds * 1000, 3)}
+                    for statement, seconds in (db_stats.statements if db_stats else None) or []
+                ],
+            )
+            try:
+                await asyncio.to_thread(self.store.save, profile)
+            except OSError:
+                logger.exception("Failed to store request profile")
+            else:
+                logger.info(
+                    "Profiled %s %s: %.1f ms, %d samples, profile id=%s",
+                    profile.method,
+                    profile.path,
+                    profile.duration_ms,
+                    profile.samples,
+                    profile.id,
+                )
+
+    @staticmethod
+    def _should_profile(scope: Scope) -> bool:
+        token = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                token = value.decode("latin-1")
+                break
+
+        if token is not None:
+            return verify_profile_token(settings.profiling_secret, scope["path"], token)
+        rate = settings.profiling_sample_rate
+        return rate > 0 and random.random() < rate  # noqa: S311
+
+
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import csv
+import json
+import time
+from collections.abc import Awaitable, Iterator
+from pathlib import Path
+from typing import Any
+
+from app.core.db import AsyncSessionFactory
+from app.services.bulk_import import DEFAULT_BATCH_SIZE, BulkImportService, ImportResult
+from app.services.catalog import achievement_catalog
+from app.services.daily_stats import DailyStatsService
+from app.services.stats_cache import stats_cache
+
+
+def read_records(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Потоковое чтение записей из CSV (с заголовком) или NDJSON-файла.
+    Формат определяется по расширению: .csv, .ndjson или .jsonl.
+
+    :param path: Путь к файлу.
+    :return: Итератор записей.
+    """
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            yield from csv.DictReader(f)
+        elif suffix in {".ndjson", ".jsonl"}:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported file format: {path} (expected .csv, .ndjson or .jsonl)")
+
+
+async def timed(name: str, awaitable: Awaitable[Any]) -> Any:
+    """
+    Выполнение этапа импорта с выводом количества строк и скорости.
+
+    :param name: Название этапа.
+    :param awaitable: Этап импорта.
+    :return: Результат этапа.
+    """
+    started = time.perf_counter()
+    result = await awaitable
+    seconds = time.perf_counter() - started
+
+    if isinstance(result, ImportResult):
+        rows, details = result.read, f"{result.read} read, {result.written} written"
+    else:
+        rows, details = result, f"{result} rows"
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"{name}: {details} in {seconds:.1f}s ({rate:.0f} rows/s)")
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Точка входа скрипта импорта: загружает достижения, пользователей и
+    выданные достижения из файлов через COPY, затем пересчитывает
+    users.total_points, users.achievements_count, счётчики редкости и
+    user_daily_stats.
+
+    :param args: Аргументы командной строки.
+    :return: None.
+    """
+    async with AsyncSessionFactory() as session:
+        importer = BulkImportService(session, batch_size=args.batch_size)
+
+        if args.achievements:
+            await timed(
+                "achievements", importer.import_achievements(read_records(args.achievements))
+            )
+            await achievement_catalog.notify(session)
+            await session.commit()
+        if args.users:
+            await timed("users", importer.import_users(read_records(args.users)))
+        if args.grants:
+            await timed("grants", importer.import_grants(read_records(args.grants)))
+
+        if not args.skip_recompute:
+            await timed("user_totals", importer.recompute_user_totals(args.chunk_size))
+            await timed("counters", importer.recompute_counters())
+            await timed(
+                "user_daily_stats", DailyStatsService(session).rebuild(chunk_size=args.chunk_size)
+            )
+        await stats_cache.invalidate()
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bulk-import achievements, users and grants from CSV/NDJSON files."
+    )
+    parser.add_argument("--achievements", type=Path, help="Файл достижений.")
+    parser.add_argument("--users", type=Path, help="Файл пользователей.")
+    parser.add_argument("--grants", type=Path, help="Файл выданных достижений.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Количество записей в одной пачке COPY.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="Количество идентификаторов пользователей в одном чанке пересчёта.",
+    )
+    parser.add_argument(
+        "--skip-recompute",
+        action="store_true",
+        help=(
+            "Не пересчитывать total_points, achievements_count, счётчики редкости "
+            "и user_daily_stats."
+        ),
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args))
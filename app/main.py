@@ -1,9 +1,86 @@
-from fastapi import FastAPI
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Response
+
+from app.api.read_routing import PinPrimaryAfterWritesMiddleware
 from app.api.v1 import achievements as achievements_router
+from app.api.v1 import events as events_router
+from app.api.v1 import leaderboard as leaderboard_router
+from app.api.v1 import profiles as profiles_router
 from app.api.v1 import stats as stats_router
 from app.api.v1 import users as users_router
+from app.core.config import settings
+from app.core.db import AsyncSessionFactory, engine, read_engine
+from app.core.instrumentation import REQUEST_METRICS, RequestMetricsMiddleware
 from app.core.logging import setup_logging
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, Metric, pool_metrics, render_metrics
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.services.catalog import achievement_catalog
+from app.services.grant_queue import grant_queue
+from app.services.leaderboard import leaderboard
+from app.services.ownership import ownership_index
+from app.services.points_folder import points_folder
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Жизненный цикл приложения: при старте загружает каталог достижений,
+    индекс рангов лидерборда и индекс выдач и, если включено, подписывается
+    на уведомления об изменениях каталога и запускает очередь отложенной
+    записи выдач и перенос полос user_points_deltas; при остановке дописывает
+    оставшиеся в очереди выдачи, переносит оставшиеся полосы и закрывает
+    подписку. Если режим полосатых счётчиков выключен, полосы, оставшиеся
+    после прошлого запуска в этом режиме, переносятся один раз при старте.
+
+    :param app: Экземпляр FastAPI.
+    :yield: None.
+    """
+    try:
+        async with AsyncSessionFactory() as session:
+            await achievement_catalog.reload(session)
+        if settings.catalog_listen_notify:
+            await achievement_catalog.listen(engine, AsyncSessionFactory)
+    except Exception:
+        logger.exception("Failed to preload achievement catalog, it will be loaded on demand")
+
+    try:
+        async with AsyncSessionFactory() as session:
+            await leaderboard.reload(session)
+            await ownership_index.reload(session)
+    except Exception:
+        logger.exception("Failed to preload in-memory indexes, they will be loaded on demand")
+
+    if settings.user_points_stripes > 0:
+        await points_folder.start(AsyncSessionFactory)
+    else:
+        try:
+            async with AsyncSessionFactory() as session:
+                await points_folder.fold(session)
+        except Exception:
+            logger.exception("Failed to fold leftover user points deltas")
+
+    if settings.grant_queue_enabled:
+        await grant_queue.start(AsyncSessionFactory)
+
+    yield
+
+    if settings.grant_queue_enabled:
+        await grant_queue.stop(settings.grant_queue_shutdown_timeout)
+    if settings.user_points_stripes > 0:
+        await points_folder.stop()
+    await achievement_catalog.close()
+
+
+def _pool_metrics() -> list[Metric]:
+    metrics = pool_metrics(engine.pool)
+    if read_engine is not engine:
+        metrics += pool_metrics(read_engine.pool, prefix="db_read_pool")
+    return metrics
 
 
 def create_app() -> FastAPI:
@@ -15,16 +92,42 @@ def create_app() -> FastAPI:
 
     setup_logging()
 
-    app = FastAPI(title="Achievements API", version="1.0.0")
+    app = FastAPI(title="Achievements API", version="1.0.0", lifespan=lifespan)
+    if settings.profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            exclude_prefixes=("/api/v1" + profiles_router.router.prefix,),
+        )
+    if settings.read_database_url:
+        app.add_middleware(PinPrimaryAfterWritesMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
 
     app.include_router(users_router.router, prefix="/api/v1")
     app.include_router(achievements_router.router, prefix="/api/v1")
     app.include_router(stats_router.router, prefix="/api/v1")
+    app.include_router(leaderboard_router.router, prefix="/api/v1")
+    app.include_router(events_router.router, prefix="/api/v1")
+    if settings.profiling_enabled:
+        app.include_router(profiles_router.router, prefix="/api/v1")
 
     @app.get("/health")
     async def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        return Response(
+            content=render_metrics(
+                [
+                    *_pool_metrics(),
+                    *REQUEST_METRICS,
+                    *(grant_queue.metrics() if settings.grant_queue_enabled else []),
+                ]
+            ),
+            media_type=PROMETHEUS_CONTENT_TYPE,
+        )
+
     return app
 
 
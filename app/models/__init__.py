@@ -1,15 +1,26 @@
 from .achievement import Achievement
+from .achievement_rule import AchievementRule
 from .achievement_translation import AchievementTranslation
-from .enums import Language
+from .achievement_unlock_stripe import AchievementUnlockStripe
+from .enums import Language, RuleKind
+from .rule_progress import RuleProgress
 from .user import User
 from .user_achievement import UserAchievement
+from .user_count_stripe import UserCountStripe
 from .user_daily_stat import UserDailyStat
+from .user_points_delta import UserPointsDelta
 
 __all__ = [
     "Achievement",
+    "AchievementRule",
     "AchievementTranslation",
+    "AchievementUnlockStripe",
     "Language",
+    "RuleKind",
+    "RuleProgress",
     "User",
     "UserAchievement",
+    "UserCountStripe",
     "UserDailyStat",
+    "UserPointsDelta",
 ]
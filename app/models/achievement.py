@@ -8,6 +8,7 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 if TYPE_CHECKING:
+    from app.models.achievement_rule import AchievementRule
     from app.models.achievement_translation import AchievementTranslation
     from app.models.user_achievement import UserAchievement
 
@@ -24,6 +25,7 @@ class Achievement(Base):
         points: Количество очков за достижение.
         translations: Переводы названия и описания на разные языки.
         user_achievements: Связанные выдачи достижения пользователям.
+        rules: Правила выдачи достижения по событиям.
     """
 
     __tablename__ = "achievements"
@@ -51,3 +53,8 @@ class Achievement(Base):
         back_populates="achievement",
         cascade="all, delete-orphan",
     )
+
+    rules: Mapped[list[AchievementRule]] = relationship(
+        back_populates="achievement",
+        cascade="all, delete-orphan",
+    )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+from app.models.enums import RuleKind
+
+if TYPE_CHECKING:
+    from app.models.achievement import Achievement
+
+
+class AchievementRule(Base):
+    """
+    Декларативное правило выдачи достижения по событиям. Правило слушает
+    события одного типа и выдаёт достижение, когда выполнено условие
+    своего вида (порог, сумма значений или серия дней).
+
+    Поля:
+        id: Первичный ключ правила.
+        achievement_id: Идентификатор выдаваемого достижения.
+        event_type: Тип событий, которые обрабатывает правило.
+        kind: Вид правила.
+        target: Целевое значение условия.
+        achievement: Объект достижения.
+    """
+
+    __tablename__ = "achievement_rules"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    achievement_id: Mapped[int] = mapped_column(
+        ForeignKey("achievements.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+
+    event_type: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+    )
+
+    kind: Mapped[RuleKind] = mapped_column(
+        PG_ENUM(RuleKind, name="rule_kind_enum"),
+        nullable=False,
+    )
+
+    target: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+
+    achievement: Mapped[Achievement] = relationship(back_populates="rules")
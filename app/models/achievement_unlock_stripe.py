@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, ForeignKey, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AchievementUnlockStripe(Base):
+    """
+    Полоса счётчика выдач достижения. Счётчик разбит на несколько строк
+    (полос), выдача увеличивает полосу с номером user_id % COUNTER_STRIPES,
+    поэтому одновременные выдачи одного достижения не ждут блокировку
+    одной строки. Количество выдач достижения - сумма его полос.
+
+    Поля:
+        achievement_id: Идентификатор достижения.
+        stripe: Номер полосы.
+        count: Количество выдач, учтённых в полосе.
+    """
+
+    __tablename__ = "achievement_unlock_stripes"
+
+    achievement_id: Mapped[int] = mapped_column(
+        ForeignKey("achievements.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    stripe: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
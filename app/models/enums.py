@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 
 class Language(str, Enum):
@@ -9,3 +9,37 @@ class Language(str, Enum):
 
     RU = "ru"
     EN = "en"
+
+
+class TimeWindow(StrEnum):
+    """
+    Перечисление скользящих окон для лидербордов и сводок статистики.
+    Окно включает текущий день и предыдущие дни до своей длины.
+    """
+
+    TODAY = "today"
+    WEEK = "7d"
+    MONTH = "30d"
+
+    @property
+    def days(self) -> int:
+        """
+        Длина окна в днях, включая текущий день.
+
+        :return: Количество дней.
+        """
+        return {TimeWindow.TODAY: 1, TimeWindow.WEEK: 7, TimeWindow.MONTH: 30}[self]
+
+
+class RuleKind(StrEnum):
+    """
+    Перечисление видов правил выдачи достижений по событиям.
+
+    THRESHOLD срабатывает, когда значение одного события достигает цели,
+    COUNT - когда сумма значений событий достигает цели, STREAK - когда
+    события приходят столько дней подряд, сколько указано в цели.
+    """
+
+    THRESHOLD = "threshold"
+    COUNT = "count"
+    STREAK = "streak"
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RuleProgress(Base):
+    """
+    Прогресс пользователя по правилу выдачи достижения. Строка существует
+    только пока правило не сработало: после выдачи достижения она удаляется,
+    поэтому таблица хранит лишь незавершённые счётчики.
+
+    Поля:
+        user_id: Идентификатор пользователя.
+        rule_id: Идентификатор правила.
+        value: Накопленная сумма значений или длина текущей серии дней.
+        last_day: Последний день серии (только для правил STREAK).
+    """
+
+    __tablename__ = "rule_progress"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    rule_id: Mapped[int] = mapped_column(
+        ForeignKey("achievement_rules.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    last_day: Mapped[date | None] = mapped_column(Date, nullable=True)
@@ -3,7 +3,8 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Integer, String, func
+from sqlalchemy import Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import BIT
 from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -26,12 +27,20 @@ class User(Base):
         username: Уникальный логин пользователя.
         language: Предпочитаемый язык интерфейса (ru/en).
         total_points: Суммарное количество очков за все достижения.
+        achievements_count: Количество выданных пользователю достижений.
+        achievement_bits: Битовая строка выданных достижений: бит с номером
+            Achievement.id установлен, если достижение выдано. Длина строки -
+            наибольший выданный идентификатор плюс один.
         created_at: Дата и время создания пользователя.
         achievements: Список выданных достижений (связанные UserAchievement).
         daily_stats: Ежедневная статистика по очкам пользователя.
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_total_points_id", text("total_points DESC"), "id"),
+        Index("ix_users_achievements_count_id", text("achievements_count DESC"), "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -54,6 +63,20 @@ class User(Base):
         server_default="0",
     )
 
+    achievements_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
+    achievement_bits: Mapped[str] = mapped_column(
+        BIT(varying=True),
+        nullable=False,
+        server_default=text("''::bit varying"),
+        deferred=True,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         server_default=func.now(),
         nullable=False,
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UserCountStripe(Base):
+    """
+    Полоса счётчика пользователей. Создание пользователя увеличивает
+    полосу с номером user_id % COUNTER_STRIPES; количество пользователей -
+    сумма всех полос.
+
+    Поля:
+        stripe: Номер полосы.
+        count: Количество пользователей, учтённых в полосе.
+    """
+
+    __tablename__ = "user_count_stripes"
+
+    stripe: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
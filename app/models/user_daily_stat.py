@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Date, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -26,13 +26,15 @@ class UserDailyStat(Base):
     """
 
     __tablename__ = "user_daily_stats"
-    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_user_day"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_user_day"),
+        Index("ix_user_daily_stats_day_user_id_points", "day", "user_id", "points"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"),
-        index=True,
         nullable=False,
     )
     day: Mapped[date] = mapped_column(Date, nullable=False)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, ForeignKey, Integer, SmallInteger, text
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UserPointsDelta(Base):
+    """
+    Полоса ещё не перенесённых в users изменений счётчиков пользователя в
+    режиме полосатых счётчиков (USER_POINTS_STRIPES > 0). Выдача увеличивает
+    строку (user_id, day, stripe) вместо строки users, поэтому одновременные
+    выдачи одному пользователю не ждут блокировку одной строки. Фоновая
+    задача периодически переносит полосы в users и user_daily_stats и
+    удаляет их.
+
+    Поля:
+        user_id: Идентификатор пользователя.
+        day: День выдачи (для переноса в user_daily_stats).
+        stripe: Номер полосы.
+        points: Начисленные очки.
+        achievements_count: Количество выдач.
+        achievement_bits: Биты выданных достижений, как в users.achievement_bits.
+    """
+
+    __tablename__ = "user_points_deltas"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    stripe: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    points: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    achievements_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    achievement_bits: Mapped[str] = mapped_column(
+        BIT(varying=True),
+        nullable=False,
+        server_default=text("''::bit varying"),
+    )
@@ -1,7 +1,9 @@
 from datetime import datetime
+from enum import StrEnum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
+from app.models.enums import RuleKind
 from app.schemas.users import Language
 
 
@@ -33,12 +35,46 @@ class AchievementBase(BaseModel):
     points: int = Field(..., ge=0, description="Количество очков за достижения.")
 
 
+class AchievementRuleBase(BaseModel):
+    """Базовые поля правила выдачи достижения по событиям."""
+
+    event_type: str = Field(
+        ..., min_length=1, max_length=64, description="Тип событий, которые обрабатывает правило."
+    )
+    kind: RuleKind = Field(
+        ...,
+        description=(
+            "Вид правила: threshold - значение одного события не меньше цели, "
+            "count - сумма значений событий не меньше цели, streak - события "
+            "приходят указанное в цели количество дней подряд."
+        ),
+    )
+    target: int = Field(..., ge=1, description="Целевое значение условия.")
+
+
+class AchievementRuleCreate(AchievementRuleBase):
+    """Модель для создания правила выдачи достижения."""
+
+
+class AchievementRuleRead(AchievementRuleBase):
+    """Модель для возврата правила выдачи достижения."""
+
+    id: int = Field(..., description="Идентификатор правила.")
+    code: str = Field(..., description="Код выдаваемого достижения.")
+
+    class Config:
+        from_attributes = True
+
+
 class AchievementCreate(AchievementBase):
     """Модель для создания достижения с локализацией."""
 
     translations: list[AchievementTranslationCreate] = Field(
         ..., description="Список переводов названия и описания достижения."
     )
+    rules: list[AchievementRuleCreate] = Field(
+        default_factory=list, description="Правила выдачи достижения по событиям."
+    )
 
 
 class AchievementRead(AchievementBase):
@@ -48,11 +84,27 @@ class AchievementRead(AchievementBase):
     translations: list[AchievementTranslationRead] = Field(
         ..., description="Переводы названия и описания достижения."
     )
+    unlock_count: int = Field(default=0, description="Сколько пользователей получили достижение.")
+    unlock_percentage: float = Field(
+        default=0.0, description="Доля пользователей, получивших достижение, в процентах."
+    )
 
     class Config:
         from_attributes = True
 
 
+class AchievementStats(BaseModel):
+    """Статистика получения достижения пользователями."""
+
+    achievement_id: int = Field(..., description="Идентификатор достижения.")
+    code: str = Field(..., description="Код достижения.")
+    unlock_count: int = Field(..., description="Сколько пользователей получили достижение.")
+    total_users: int = Field(..., description="Общее количество пользователей.")
+    unlock_percentage: float = Field(
+        ..., description="Доля пользователей, получивших достижение, в процентах."
+    )
+
+
 class UserAchievementRead(BaseModel):
     """Информация о выданном пользователю достижении."""
 
@@ -65,3 +117,135 @@ class UserAchievementRead(BaseModel):
 
     class Config:
         from_attributes = False
+
+
+class GrantStatus(StrEnum):
+    """Итог выдачи одного достижения в пакетной выдаче."""
+
+    GRANTED = "granted"
+    ALREADY_GRANTED = "already_granted"
+    UNKNOWN_USER = "unknown_user"
+    UNKNOWN_CODE = "unknown_code"
+
+
+class GrantBatchItem(BaseModel):
+    """Элемент пакетной выдачи достижений."""
+
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    code: str = Field(..., max_length=64, description="Код достижения.")
+
+
+class GrantBatchItemResult(GrantBatchItem):
+    """Результат выдачи одного элемента пакета."""
+
+    status: GrantStatus = Field(..., description="Итог выдачи.")
+    achievement_id: int | None = Field(
+        None, description="Идентификатор достижения, если код найден."
+    )
+
+
+class GrantBatchResult(BaseModel):
+    """Результат пакетной выдачи достижений."""
+
+    items: list[GrantBatchItemResult] = Field(
+        ..., description="Результаты по каждому элементу в порядке запроса."
+    )
+    granted: int = Field(..., description="Количество выданных достижений.")
+    already_granted: int = Field(..., description="Количество уже выданных ранее достижений.")
+    unknown_user: int = Field(..., description="Количество элементов с неизвестным пользователем.")
+    unknown_code: int = Field(..., description="Количество элементов с неизвестным кодом.")
+
+
+class QueuedGrantStatus(StrEnum):
+    """Состояние выдачи, принятой в очередь отложенной записи."""
+
+    PENDING = "pending"
+    GRANTED = "granted"
+    ALREADY_GRANTED = "already_granted"
+    UNKNOWN_USER = "unknown_user"
+    UNKNOWN_CODE = "unknown_code"
+    FAILED = "failed"
+
+
+class QueuedGrant(BaseModel):
+    """Выдача достижения, принятая в очередь отложенной записи."""
+
+    token: str = Field(..., description="Токен для проверки состояния выдачи.")
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    code: str = Field(..., description="Код достижения.")
+    achievement_id: int = Field(..., description="Идентификатор достижения.")
+    status: QueuedGrantStatus = Field(..., description="Текущее состояние выдачи.")
+
+
+class AchievementExpr(BaseModel):
+    """
+    Булево выражение над выданными достижениями. Задаётся ровно одно поле:
+    has - пользователи с достижением, all - пересечение, any - объединение,
+    not - дополнение до всех пользователей.
+    """
+
+    has: str | None = Field(None, max_length=64, description="Код достижения.")
+    all: list["AchievementExpr"] | None = Field(
+        None, min_length=1, description="Выражения, которые должны выполняться все."
+    )
+    any: list["AchievementExpr"] | None = Field(
+        None, min_length=1, description="Выражения, из которых должно выполняться хотя бы одно."
+    )
+    not_: "AchievementExpr | None" = Field(
+        None, alias="not", description="Выражение, которое не должно выполняться."
+    )
+
+    class Config:
+        populate_by_name = True
+
+    @model_validator(mode="after")
+    def _single_operator(self) -> "AchievementExpr":
+        operators = [self.has, self.all, self.any, self.not_]
+        if sum(operator is not None for operator in operators) != 1:
+            raise ValueError("Exactly one of has, all, any, not must be set")
+        return self
+
+    def codes(self) -> set[str]:
+        """
+        Коды достижений, упомянутые в выражении.
+
+        :return: Множество кодов.
+        """
+        if self.has is not None:
+            return {self.has}
+        if self.not_ is not None:
+            return self.not_.codes()
+        return set().union(*(operand.codes() for operand in self.all or self.any))
+
+
+class AchievementQuery(BaseModel):
+    """Запрос пользователей по булеву выражению над выданными достижениями."""
+
+    expr: AchievementExpr = Field(..., description="Булево выражение.")
+    limit: int = Field(100, ge=1, le=1000, description="Размер страницы идентификаторов.")
+    after: int | None = Field(
+        None, description="Идентификатор пользователя, после которого начинается страница."
+    )
+
+
+class AchievementQueryResult(BaseModel):
+    """Результат запроса пользователей по выданным достижениям."""
+
+    count: int = Field(..., description="Количество подходящих пользователей.")
+    total_users: int = Field(..., description="Количество всех пользователей.")
+    percentage: float = Field(..., description="Доля подходящих пользователей, в процентах.")
+    user_ids: list[int] = Field(
+        ..., description="Страница идентификаторов подходящих пользователей по возрастанию."
+    )
+    next_after: int | None = Field(
+        None, description="Значение after для следующей страницы или None, если она последняя."
+    )
+
+
+class AchievementOwnership(BaseModel):
+    """Наличие у пользователя указанных достижений."""
+
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    achievements: dict[str, bool] = Field(
+        ..., description="Признак наличия достижения по каждому запрошенному коду."
+    )
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.schemas.achievements import GrantBatchItem
+
+
+class EventCreate(BaseModel):
+    """Событие пользователя для движка правил выдачи достижений."""
+
+    type: str = Field(..., min_length=1, max_length=64, description="Тип события.")
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    value: int = Field(1, ge=0, description="Числовое значение события.")
+    occurred_at: datetime | None = Field(
+        None,
+        description="Время события; день события учитывается правилами streak. По умолчанию - now.",
+    )
+
+
+class EventBatchResult(BaseModel):
+    """Результат обработки пакета событий."""
+
+    accepted: int = Field(..., description="Количество принятых событий.")
+    matched: int = Field(
+        ..., description="Количество событий, для типа которых есть хотя бы одно правило."
+    )
+    unknown_user: int = Field(
+        ..., description="Количество событий с правилами и неизвестным пользователем."
+    )
+    granted: list[GrantBatchItem] = Field(
+        ..., description="Достижения, выданные по результатам обработки событий."
+    )
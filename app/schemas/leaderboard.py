@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+
+from app.models.enums import Language
+
+
+class LeaderboardEntry(BaseModel):
+    """Позиция пользователя в лидерборде."""
+
+    rank: int = Field(..., description="Место; пользователи с равной суммой очков делят место.")
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    username: str = Field(..., description="Имя пользователя.")
+    language: Language = Field(..., description="Предпочитаемый язык интерфейса пользователя.")
+    total_points: int = Field(
+        ..., description="Суммарное количество очков за все достижения пользователя."
+    )
+    window_points: int | None = Field(
+        None,
+        description="Очки за скользящее окно, по которым считается место; None для всего времени.",
+    )
+
+
+class UserRank(BaseModel):
+    """Место пользователя в глобальном лидерборде."""
+
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    username: str = Field(..., description="Имя пользователя.")
+    total_points: int = Field(
+        ..., description="Суммарное количество очков за все достижения пользователя."
+    )
+    rank: int = Field(..., description="Место; пользователи с равной суммой очков делят место.")
+    total_users: int = Field(..., description="Количество пользователей в лидерборде.")
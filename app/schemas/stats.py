@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 
+from app.models.enums import TimeWindow
 from app.schemas.users import Language
 
 
@@ -58,3 +59,35 @@ class StatsSummary(BaseModel):
         default_factory=list,
         description="Список пользователей, которые получали достижения не менее 7 дней подряд.",
     )
+
+
+class UserWithWindowPoints(BaseModel):
+    """Пользователь и сумма его очков за скользящее окно."""
+
+    user_id: int = Field(..., description="Идентификатор пользователя.")
+    username: str = Field(..., description="Имя пользователя.")
+    language: Language = Field(..., description="Предпочитаемый язык интерфейса пользователя.")
+    total_points: int = Field(
+        ..., description="Суммарное количество очков за все достижения пользователя."
+    )
+    window_points: int = Field(..., description="Количество очков за окно.")
+
+
+class WindowStatsSummary(BaseModel):
+    """Сводная статистика по очкам пользователей за скользящее окно."""
+
+    window: TimeWindow = Field(..., description="Скользящее окно.")
+    language: Language | None = Field(
+        None, description="Язык пользователей, по которым считается сводка; None для всех."
+    )
+    active_users: int = Field(..., description="Количество пользователей, получавших очки в окне.")
+    total_points: int = Field(..., description="Сумма очков всех пользователей за окно.")
+    max_points: UserWithWindowPoints | None = Field(
+        None, description="Пользователь с максимальной суммой очков за окно."
+    )
+    max_points_diff: PointsDiffPair | None = Field(
+        None, description="Пара пользователей с максимальной разностью очков за окно."
+    )
+    min_points_diff: PointsDiffPair | None = Field(
+        None, description="Пара пользователей с минимальной ненулевой разностью очков за окно."
+    )
@@ -1,7 +1,7 @@
 import asyncio
 import json
 import random
-from collections import defaultdict
+from collections.abc import Iterator
 from datetime import date, datetime, time, timedelta
 from pathlib import Path
 from typing import Any
@@ -17,6 +17,8 @@ from app.models import (
     User,
     UserAchievement,
 )
+from app.services.bulk_import import BulkImportService
+from app.services.daily_stats import DailyStatsService
 
 BASE_DIR = Path(__file__).resolve().parent
 ACHIEVEMENTS_JSON_PATH = BASE_DIR / "data" / "achievements.json"
@@ -143,6 +145,8 @@ async def seed_user_achievements(
     """
     Выдача достижений пользователям для заполнения базы демонстрационными данными.
     Для части пользователей создаются стрики из нескольких подряд идущих дней.
+    Выдачи загружаются через COPY, суммы очков пользователей пересчитываются
+    по загруженным данным.
 
     :param session: Асинхронная сессия SQLAlchemy.
     :param users: Пользователи, которым выдаются достижения.
@@ -154,64 +158,39 @@ async def seed_user_achievements(
 
     random.seed(42)
 
-    all_achievements = list(achievements_by_code.values())
+    achievement_ids = [achievement.id for achievement in achievements_by_code.values()]
+    user_ids = [user.id for user in users]
     today = date.today()
 
-    user_to_achievement_ids: dict[int, set[int]] = defaultdict(set)
-    user_points: dict[int, int] = defaultdict(int)
+    def grants() -> Iterator[tuple[int, int, datetime]]:
+        streak_length = 7
+        streak_start = today - timedelta(days=streak_length - 1)
 
-    streak_users = users[:2]
-    streak_length = 7
-    streak_start = today - timedelta(days=streak_length - 1)
+        for user_id in user_ids[:2]:
+            available = achievement_ids.copy()
+            random.shuffle(available)
 
-    for user in streak_users:
-        available_for_user = all_achievements.copy()
-        random.shuffle(available_for_user)
+            for i, achievement_id in enumerate(available[:streak_length]):
+                issued_day = streak_start + timedelta(days=i)
+                yield user_id, achievement_id, datetime.combine(issued_day, time(hour=10))
 
-        for i in range(streak_length):
-            if not available_for_user:
-                break
-            ach = available_for_user.pop()
-            issued_day = streak_start + timedelta(days=i)
-            issued_at = datetime.combine(issued_day, time(hour=10, minute=0))
+        for user_id in user_ids[2:]:
+            available = achievement_ids.copy()
+            random.shuffle(available)
+            count = random.randint(5, min(12, len(available)))  # noqa: S311
 
-            ua = UserAchievement(
-                user_id=user.id,
-                achievement_id=ach.id,
-                issued_at=issued_at,
-            )
-            session.add(ua)
-
-            user_to_achievement_ids[user.id].add(ach.id)
-            user_points[user.id] += ach.points
-
-    other_users = users[2:]
+            for achievement_id in available[:count]:
+                days_ago = random.randint(0, 29)  # noqa: S311
+                issued_day = today - timedelta(days=days_ago)
+                issued_at = datetime.combine(issued_day, time(hour=random.randint(9, 20)))  # noqa: S311
+                yield user_id, achievement_id, issued_at
 
-    for user in other_users:
-        available = all_achievements.copy()
-        random.shuffle(available)
-        count = random.randint(5, min(12, len(available)))  # noqa: S311
-        selected = available[:count]
-
-        for ach in selected:
-            days_ago = random.randint(0, 29)  # noqa: S311
-            issued_day = today - timedelta(days=days_ago)
-            issued_at = datetime.combine(issued_day, time(hour=random.randint(9, 20)))  # noqa: S311
-
-            ua = UserAchievement(
-                user_id=user.id,
-                achievement_id=ach.id,
-                issued_at=issued_at,
-            )
-            session.add(ua)
-
-            user_to_achievement_ids[user.id].add(ach.id)
-            user_points[user.id] += ach.points
-
-    for user in users:
-        user.total_points = user_points.get(user.id, 0)
-
-    await session.commit()
+    importer = BulkImportService(session)
+    await importer.copy_records(
+        UserAchievement.__table__, ["user_id", "achievement_id", "issued_at"], grants()
+    )
+    await importer.recompute_user_totals()
+    await importer.recompute_counters()
 
 
 async def main() -> None:
@@ -238,6 +217,9 @@ async def main() -> None:
         print("Seeding user achievements (including 7-day streaks)...")
         await seed_user_achievements(session, users, achievements_by_code)
 
+        print("Rebuilding daily stats...")
+        await DailyStatsService(session).rebuild()
+
         print("Done. Demo data has been inserted.")
 
 
@@ -1,43 +1,142 @@
 import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
 
-from sqlalchemy import select
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Integer,
+    SmallInteger,
+    String,
+    any_,
+    bindparam,
+    cast,
+    column,
+    func,
+    literal,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.achievement import Achievement
+from app.models.achievement_rule import AchievementRule
 from app.models.achievement_translation import AchievementTranslation
+from app.models.achievement_unlock_stripe import AchievementUnlockStripe
 from app.models.user import User
 from app.models.user_achievement import UserAchievement
+from app.models.user_count_stripe import UserCountStripe
 from app.schemas.achievements import (
     AchievementCreate,
+    AchievementStats,
+    GrantBatchItem,
+    GrantBatchItemResult,
+    GrantStatus,
+)
+from app.services.catalog import CatalogEntry, CatalogListing, achievement_catalog
+from app.services.daily_stats import daily_points_upsert
+from app.services.leaderboard import leaderboard
+from app.services.ownership import VARBIT, achievement_bits_or, achievement_mask, ownership_index
+from app.services.points_deltas import (
+    delta_stripe,
+    pending_points,
+    points_delta_upsert,
+    points_striping,
+)
+from app.services.rarity import (
+    counter_stripe,
+    rarity_store,
+    unlock_counts_upsert,
+    unlock_percentage,
 )
+from app.services.stats_cache import stats_cache
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class GrantResult:
+    """
+    Результат выдачи достижения пользователю.
+
+    Поля:
+        user_id: Идентификатор пользователя.
+        achievement_id: Идентификатор достижения.
+        granted: True, если достижение выдано этим вызовом, False - если уже было выдано.
+        points: Количество начисленных очков (0, если достижение уже было выдано).
+        total_points: Суммарные очки пользователя после выдачи, если она произошла.
+        issued_at: Время выдачи, если она произошла.
+    """
+
+    user_id: int
+    achievement_id: int
+    granted: bool = False
+    points: int = 0
+    total_points: int | None = None
+    issued_at: datetime | None = None
+
+
 class AchievementService:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def list_achievements(self) -> list[Achievement]:
+    async def catalog_listing(self) -> CatalogListing:
         """
-        Получение списка всех доступных достижений с сортировкой по идентификатору.
+        Получение предварительно сериализованного списка достижений из
+        каталога в памяти процесса. Счётчики выдач берутся из снимка
+        счётчиков редкости, который перечитывается не чаще раза в
+        RARITY_REFRESH_INTERVAL секунд.
 
-        :return: Список достижений.
+        :return: Варианты тела ответа для разных Content-Encoding.
         """
-        stmt = (
-            select(Achievement)
-            .options(selectinload(Achievement.translations))
-            .order_by(Achievement.id)
+        catalog = await achievement_catalog.get(self.session)
+        return catalog.listing(await rarity_store.get(self.session))
+
+    async def get_achievement_stats(self, code: str) -> AchievementStats | None:
+        """
+        Получение количества и доли пользователей, получивших достижение.
+        Значения читаются из полос счётчиков в момент запроса, без обхода
+        журнала выдач.
+
+        :param code: Код достижения.
+        :return: Статистика достижения или None, если достижение не найдено.
+        """
+        achievement = await self._resolve_code(code)
+        if achievement is None:
+            return None
+
+        unlocks = (
+            select(func.coalesce(func.sum(AchievementUnlockStripe.count), 0))
+            .where(AchievementUnlockStripe.achievement_id == achievement.id)
+            .scalar_subquery()
+        )
+        users = select(func.coalesce(func.sum(UserCountStripe.count), 0)).scalar_subquery()
+        row = (
+            await self.session.execute(select(unlocks.label("unlocks"), users.label("users")))
+        ).one()
+
+        return AchievementStats(
+            achievement_id=achievement.id,
+            code=achievement.code,
+            unlock_count=row.unlocks,
+            total_users=row.users,
+            unlock_percentage=unlock_percentage(row.unlocks, row.users),
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
 
     async def create_achievement(self, data: AchievementCreate) -> Achievement:
         """
-        Создание нового достижения и его переводов на доступные языки.
+        Создание нового достижения, его переводов на доступные языки и
+        правил выдачи по событиям. После коммита каталог достижений в памяти
+        перезагружается, а другие воркеры получают уведомление через
+        Postgres NOTIFY.
 
-        :param data: Данные для создания достижения (код, очки, переводы).
+        :param data: Данные для создания достижения (код, очки, переводы, правила).
         :return: Созданное достижение.
         """
         achievement = Achievement(
@@ -56,7 +155,20 @@ class AchievementService:
             )
             self.session.add(translation)
 
+        for rule in data.rules:
+            self.session.add(
+                AchievementRule(
+                    achievement_id=achievement.id,
+                    event_type=rule.event_type,
+                    kind=rule.kind,
+                    target=rule.target,
+                )
+            )
+
+        await achievement_catalog.notify(self.session)
         await self.session.commit()
+        await achievement_catalog.reload(self.session)
+
         stmt = (
             select(Achievement)
             .options(selectinload(Achievement.translations))
@@ -71,60 +183,403 @@ class AchievementService:
         self,
         user_id: int,
         code: str,
-    ) -> UserAchievement:
+    ) -> GrantResult | None:
         """
         Выдача достижения пользователю по коду достижения. Если пользователь
         или достижение не найдены, возвращается None. Если достижение уже
-        выдано, возвращается существующая запись.
+        выдано, возвращается результат с granted=False.
+
+        Код достижения разрешается через каталог в памяти процесса, после чего
+        выдача выполняется одним оператором: CTE с INSERT ... ON CONFLICT
+        ON CONSTRAINT uq_user_achievement DO NOTHING RETURNING, атомарным
+        увеличением users.total_points и users.achievements_count, установкой
+        бита достижения в users.achievement_bits, обновлением дневного
+        агрегата user_daily_stats и полосы счётчика выдач достижения
+        (achievement_unlock_stripes). Очки и счётчики начисляются только при
+        реальной вставке, поэтому одновременные выдачи не теряют обновлений.
+        В режиме полосатых счётчиков (USER_POINTS_STRIPES > 0) очки, счётчик,
+        бит и день выдачи пишутся в полосу user_points_deltas, а строки users
+        и user_daily_stats обновляются позже фоновым переносом.
 
         :param user_id: Идентификатор пользователя.
         :param code: Код достижения.
-        :return: Запись о выданном достижении или None.
+        :return: Результат выдачи или None.
         """
-        user_stmt = select(User).where(User.id == user_id)
-        ach_stmt = select(Achievement).where(Achievement.code == code)
+        achievement = await self._resolve_code(code)
+        if achievement is None:
+            logger.warning(
+                "Cannot grant achievement: user_id=%s, code=%s (achievement not found)",
+                user_id,
+                code,
+            )
+            return None
 
-        user = (await self.session.execute(user_stmt)).scalar_one_or_none()
-        achievement = (await self.session.execute(ach_stmt)).scalar_one_or_none()
+        striped = points_striping()
+        usr_columns = (User.id, User.language, User.total_points) if striped else (User.id,)
+        usr = select(*usr_columns).where(User.id == user_id).cte("usr")
+        ach_id = literal(achievement.id, Integer)
+        ach_points = literal(achievement.points, Integer)
+        ach_mask = cast(literal(achievement_mask([achievement.id]), String), VARBIT)
 
-        if user is None or achievement is None:
+        ins = (
+            pg_insert(UserAchievement)
+            .from_select(["user_id", "achievement_id"], select(usr.c.id, ach_id))
+            .on_conflict_do_nothing(constraint="uq_user_achievement")
+            .returning(UserAchievement.user_id, UserAchievement.issued_at)
+            .cte("ins")
+        )
+        unlocks = unlock_counts_upsert(
+            select(
+                ach_id,
+                literal(counter_stripe(user_id), SmallInteger),
+                literal(1, BigInteger),
+            ).select_from(ins)
+        ).cte("unlocks")
+
+        if striped:
+            delta = points_delta_upsert(
+                select(
+                    ins.c.user_id,
+                    delta_stripe(),
+                    cast(ins.c.issued_at, Date),
+                    ach_points,
+                    literal(1, Integer),
+                    ach_mask,
+                )
+            ).cte("delta")
+            # Строка users не изменяется и не блокируется; сумма очков
+            # считается по снимку оператора, включая неперенесённые полосы.
+            total_points = usr.c.total_points + pending_points(usr.c.id) + ach_points
+            stmt = (
+                select(
+                    usr.c.id.label("user_id"),
+                    ins.c.issued_at,
+                    total_points.label("total_points"),
+                    usr.c.language,
+                )
+                .select_from(usr.outerjoin(ins, true()))
+                .add_cte(delta, unlocks)
+            )
+        else:
+            upd = (
+                update(User)
+                .where(User.id == ins.c.user_id)
+                .values(
+                    total_points=User.total_points + ach_points,
+                    achievements_count=User.achievements_count + 1,
+                    achievement_bits=achievement_bits_or(User.achievement_bits, ach_mask),
+                )
+                .returning(User.total_points, User.language)
+                .cte("upd")
+            )
+            daily = daily_points_upsert(
+                select(ins.c.user_id, cast(ins.c.issued_at, Date), ach_points)
+            ).cte("daily")
+            stmt = (
+                select(
+                    usr.c.id.label("user_id"), ins.c.issued_at, upd.c.total_points, upd.c.language
+                )
+                .select_from(usr.outerjoin(ins, true()).outerjoin(upd, true()))
+                .add_cte(daily, unlocks)
+            )
+
+        row = (await self.session.execute(stmt)).one_or_none()
+        await self.session.commit()
+
+        if row is None:
             logger.warning(
-                "Cannot grant achievement: user_id=%s, code=%s (user or achievement not found)",
+                "Cannot grant achievement: user_id=%s, code=%s (user not found)",
                 user_id,
                 code,
             )
             return None
 
-        existing_stmt = select(UserAchievement).where(
-            UserAchievement.user_id == user.id,
-            UserAchievement.achievement_id == achievement.id,
-        )
-        existing = (await self.session.execute(existing_stmt)).scalar_one_or_none()
-        if existing:
+        if row.issued_at is None:
             logger.info(
                 "Achievement already granted: user_id=%s, achievement_id=%s",
                 user_id,
                 achievement.id,
             )
-            return existing
+            return GrantResult(user_id=user_id, achievement_id=achievement.id)
 
-        ua = UserAchievement(
-            user_id=user.id,
+        await stats_cache.invalidate()
+        if not striped:
+            # Режим полос обновляет индекс рангов при переносе полос в users.
+            leaderboard.record_points(
+                row.language, row.total_points - achievement.points, row.total_points
+            )
+        ownership_index.record_grants([(user_id, achievement.id)])
+
+        logger.info(
+            "Granted achievement: user_id=%s, achievement_id=%s, points=%s, new_total_points=%s",
+            user_id,
+            achievement.id,
+            achievement.points,
+            row.total_points,
+        )
+
+        return GrantResult(
+            user_id=user_id,
             achievement_id=achievement.id,
+            granted=True,
+            points=achievement.points,
+            total_points=row.total_points,
+            issued_at=row.issued_at,
+        )
+
+    async def grant_achievements_batch(
+        self,
+        items: list[GrantBatchItem],
+    ) -> list[GrantBatchItemResult]:
+        """
+        Пакетная выдача достижений. Коды достижений разрешаются через каталог
+        в памяти процесса, пользователи - одним запросом `= ANY(...)`, выдачи
+        вставляются одним
+        многострочным INSERT ... ON CONFLICT DO NOTHING RETURNING, а очки,
+        счётчики и битовые строки достижений пользователей, дневные агрегаты и
+        полосы счётчиков выдач достижений обновляются агрегированными
+        операторами (в режиме полосатых счётчиков вместо users и
+        user_daily_stats пишутся полосы user_points_deltas по пользователю и
+        дню). Все изменения фиксируются одним коммитом.
+
+        :param items: Элементы пакета (пользователь и код достижения).
+        :return: Результаты по каждому элементу в порядке запроса.
+        """
+        if not items:
+            return []
+
+        striped = points_striping()
+        codes = sorted({item.code for item in items})
+        user_ids = sorted({item.user_id for item in items})
+
+        catalog = await achievement_catalog.get(self.session)
+        if any(code not in catalog.by_code for code in codes):
+            catalog = await achievement_catalog.refresh_on_miss(self.session)
+        achievements = {code: catalog.by_code[code] for code in codes if code in catalog.by_code}
+
+        users_stmt = select(User.id).where(
+            User.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(Integer)))
+        )
+        known_users = set((await self.session.scalars(users_stmt)).all())
+
+        pairs = sorted(
+            {
+                (item.user_id, achievements[item.code].id)
+                for item in items
+                if item.user_id in known_users and item.code in achievements
+            }
         )
-        self.session.add(ua)
-        user.total_points += achievement.points
+
+        granted: dict[tuple[int, int], datetime] = {}
+        if pairs:
+            source = (
+                func.unnest(
+                    bindparam(
+                        "pair_user_ids", [user_id for user_id, _ in pairs], type_=ARRAY(Integer)
+                    ),
+                    bindparam(
+                        "pair_ach_ids", [ach_id for _, ach_id in pairs], type_=ARRAY(Integer)
+                    ),
+                )
+                .table_valued("user_id", "achievement_id")
+                .render_derived(name="pairs")
+            )
+            ins = (
+                pg_insert(UserAchievement)
+                .from_select(
+                    ["user_id", "achievement_id"], select(source.c.user_id, source.c.achievement_id)
+                )
+                .on_conflict_do_nothing(constraint="uq_user_achievement")
+                .returning(
+                    UserAchievement.user_id,
+                    UserAchievement.achievement_id,
+                    UserAchievement.issued_at,
+                )
+            )
+            for row in (await self.session.execute(ins)).all():
+                granted[(row.user_id, row.achievement_id)] = row.issued_at
+
+        if granted:
+            points_by_id = {row.id: row.points for row in achievements.values()}
+            user_points: dict[int, int] = defaultdict(int)
+            user_counts: dict[int, int] = defaultdict(int)
+            user_achievement_ids: dict[int, list[int]] = defaultdict(list)
+            daily_points: dict[tuple[int, date], int] = defaultdict(int)
+            day_achievement_ids: dict[tuple[int, date], list[int]] = defaultdict(list)
+            unlock_counts: dict[tuple[int, int], int] = defaultdict(int)
+            for (user_id, ach_id), issued_at in granted.items():
+                user_points[user_id] += points_by_id[ach_id]
+                user_counts[user_id] += 1
+                user_achievement_ids[user_id].append(ach_id)
+                daily_points[(user_id, issued_at.date())] += points_by_id[ach_id]
+                day_achievement_ids[(user_id, issued_at.date())].append(ach_id)
+                unlock_counts[(ach_id, counter_stripe(user_id))] += 1
+
+            if striped:
+                day_rows = sorted(day_achievement_ids.items())
+                day_deltas = (
+                    func.unnest(
+                        bindparam(
+                            "delta_user_ids",
+                            [user_id for (user_id, _), _ in day_rows],
+                            type_=ARRAY(Integer),
+                        ),
+                        bindparam(
+                            "delta_days", [day for (_, day), _ in day_rows], type_=ARRAY(Date)
+                        ),
+                        bindparam(
+                            "delta_points",
+                            [sum(points_by_id[i] for i in ids) for _, ids in day_rows],
+                            type_=ARRAY(BigInteger),
+                        ),
+                        bindparam(
+                            "delta_counts", [len(ids) for _, ids in day_rows], type_=ARRAY(Integer)
+                        ),
+                        bindparam(
+                            "delta_masks",
+                            [achievement_mask(ids) for _, ids in day_rows],
+                            type_=ARRAY(String),
+                        ),
+                    )
+                    .table_valued("user_id", "day", "points", "count", "mask")
+                    .render_derived(name="deltas")
+                )
+                await self.session.execute(
+                    points_delta_upsert(
+                        select(
+                            day_deltas.c.user_id,
+                            delta_stripe(),
+                            day_deltas.c.day,
+                            day_deltas.c.points,
+                            day_deltas.c.count,
+                            cast(day_deltas.c.mask, VARBIT),
+                        )
+                    )
+                )
+                # Индекс рангов обновится при переносе полос в users.
+                new_totals = {}
+            else:
+                user_deltas = values(
+                    column("user_id", Integer),
+                    column("points", Integer),
+                    column("count", Integer),
+                    column("mask", String),
+                    name="deltas",
+                ).data(
+                    sorted(
+                        (
+                            user_id,
+                            points,
+                            user_counts[user_id],
+                            achievement_mask(user_achievement_ids[user_id]),
+                        )
+                        for user_id, points in user_points.items()
+                    )
+                )
+                totals = await self.session.execute(
+                    update(User)
+                    .where(User.id == user_deltas.c.user_id)
+                    .values(
+                        total_points=User.total_points + user_deltas.c.points,
+                        achievements_count=User.achievements_count + user_deltas.c.count,
+                        achievement_bits=achievement_bits_or(
+                            User.achievement_bits, cast(user_deltas.c.mask, VARBIT)
+                        ),
+                    )
+                    .returning(User.id, User.total_points, User.language)
+                )
+                new_totals = {row.id: (row.total_points, row.language) for row in totals}
+
+                day_deltas = values(
+                    column("user_id", Integer),
+                    column("day", Date),
+                    column("points", Integer),
+                    name="day_deltas",
+                ).data(
+                    sorted(
+                        (user_id, day, points) for (user_id, day), points in daily_points.items()
+                    )
+                )
+                await self.session.execute(daily_points_upsert(select(day_deltas)))
+
+            unlock_rows = sorted(unlock_counts.items())
+            unlock_deltas = (
+                func.unnest(
+                    bindparam(
+                        "unlock_ach_ids",
+                        [ach_id for (ach_id, _), _ in unlock_rows],
+                        type_=ARRAY(Integer),
+                    ),
+                    bindparam(
+                        "unlock_stripes",
+                        [stripe for (_, stripe), _ in unlock_rows],
+                        type_=ARRAY(SmallInteger),
+                    ),
+                    bindparam(
+                        "unlock_counts",
+                        [count for _, count in unlock_rows],
+                        type_=ARRAY(BigInteger),
+                    ),
+                )
+                .table_valued("achievement_id", "stripe", "count")
+                .render_derived(name="unlock_deltas")
+            )
+            await self.session.execute(unlock_counts_upsert(select(unlock_deltas)))
 
         await self.session.commit()
-        await self.session.refresh(ua)
-        await self.session.refresh(user)
+
+        if granted:
+            await stats_cache.invalidate()
+            for user_id, (total_points, language) in new_totals.items():
+                leaderboard.record_points(
+                    language, total_points - user_points[user_id], total_points
+                )
+            ownership_index.record_grants(granted)
+
+        results: list[GrantBatchItemResult] = []
+        # Повторы одной пары внутри пакета считаются уже выданными.
+        reported: set[tuple[int, int]] = set()
+        for item in items:
+            achievement = achievements.get(item.code)
+            if item.user_id not in known_users:
+                status = GrantStatus.UNKNOWN_USER
+            elif achievement is None:
+                status = GrantStatus.UNKNOWN_CODE
+            else:
+                pair = (item.user_id, achievement.id)
+                if pair in granted and pair not in reported:
+                    status = GrantStatus.GRANTED
+                    reported.add(pair)
+                else:
+                    status = GrantStatus.ALREADY_GRANTED
+
+            results.append(
+                GrantBatchItemResult(
+                    user_id=item.user_id,
+                    code=item.code,
+                    status=status,
+                    achievement_id=achievement.id if achievement is not None else None,
+                )
+            )
 
         logger.info(
-            "Granted achievement: user_id=%s, achievement_id=%s, points=%s, new_total_points=%s",
-            user.id,
-            achievement.id,
-            achievement.points,
-            user.total_points,
+            "Granted achievements batch: items=%s, granted=%s",
+            len(items),
+            len(granted),
         )
+        return results
 
-        return ua
+    async def _resolve_code(self, code: str) -> CatalogEntry | None:
+        """
+        Поиск достижения по коду в каталоге в памяти процесса. При промахе
+        каталог перезагружается, если достижение могло появиться в другом воркере.
+
+        :param code: Код достижения.
+        :return: Достижение из каталога или None.
+        """
+        catalog = await achievement_catalog.get(self.session)
+        achievement = catalog.by_code.get(code)
+        if achievement is None:
+            catalog = await achievement_catalog.refresh_on_miss(self.session)
+            achievement = catalog.by_code.get(code)
+        return achievement
@@ -0,0 +1,336 @@
+import logging
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import batched
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import Achievement
+from app.models.achievement_translation import AchievementTranslation
+from app.models.enums import Language
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.services.consistency import ConsistencyService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50_000
+
+Record = tuple[Any, ...]
+
+_staging = MetaData()
+_language = PG_ENUM(Language, name="language_enum", create_type=False)
+
+
+def _staging_table(name: str, *columns: Column) -> Table:
+    # Временная таблица создаётся в транзакции пачки и удаляется при коммите.
+    return Table(name, _staging, *columns, prefixes=["TEMPORARY"], postgresql_on_commit="DROP")
+
+
+users_staging = _staging_table(
+    "import_users",
+    Column("username", String(64)),
+    Column("language", _language),
+    Column("created_at", DateTime),
+)
+achievements_staging = _staging_table(
+    "import_achievements",
+    Column("code", String(64)),
+    Column("points", Integer),
+)
+translations_staging = _staging_table(
+    "import_translations",
+    Column("code", String(64)),
+    Column("language", _language),
+    Column("name", String(128)),
+    Column("description", Text),
+)
+grants_staging = _staging_table(
+    "import_grants",
+    Column("user_id", BigInteger),
+    Column("username", String(64)),
+    Column("code", String(64)),
+    Column("issued_at", DateTime),
+)
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    """
+    Итог загрузки одного вида записей.
+
+    Поля:
+        read: Количество прочитанных записей.
+        written: Количество вставленных или обновлённых строк целевой таблицы.
+    """
+
+    read: int = 0
+    written: int = 0
+
+
+class BulkImportService:
+    """
+    Массовая загрузка данных через COPY (asyncpg copy_records_to_table).
+
+    Записи читаются из потока пачками по batch_size, каждая пачка
+    загружается и коммитится в отдельной транзакции, поэтому потребление
+    памяти и объём работы одной транзакции не зависят от общего объёма.
+    copy_records пишет прямо в целевую таблицу; import_* загружают пачку
+    во временную таблицу и переносят её в целевую одним INSERT ... SELECT
+    с разрешением естественных ключей (username, code) и ON CONFLICT.
+    Счётчики users.total_points, users.achievements_count, битовые строки
+    users.achievement_bits, полосы счётчиков редкости и агрегаты
+    user_daily_stats после загрузки нужно пересчитать: recompute_user_totals,
+    recompute_counters и DailyStatsService.rebuild.
+    """
+
+    def __init__(self, session: AsyncSession, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.session = session
+        self.batch_size = batch_size
+
+    async def copy_records(
+        self,
+        table: Table,
+        columns: Sequence[str],
+        records: Iterable[Record],
+    ) -> int:
+        """
+        Загрузка записей напрямую в таблицу. Значения должны быть готовы
+        к записи: идентификаторы разрешены, enum-столбцы заданы именами
+        (например "EN"). Конфликты уникальности прерывают загрузку пачки.
+
+        :param table: Целевая таблица.
+        :param columns: Столбцы в порядке значений записей.
+        :param records: Поток записей.
+        :return: Количество загруженных строк.
+        """
+        total = 0
+        for batch in batched(records, self.batch_size):
+            await self._copy(table, columns, list(batch))
+            await self.session.commit()
+            total += len(batch)
+        return total
+
+    async def import_users(self, records: Iterable[Mapping[str, Any]]) -> ImportResult:
+        """
+        Загрузка пользователей. Поля записи: username, language (ru/en),
+        необязательное created_at. Уже существующие имена пропускаются.
+
+        :param records: Поток записей.
+        :return: Итог загрузки.
+        """
+        rows = (
+            (
+                str(record["username"]),
+                _language_name(record["language"]),
+                _parse_datetime(record.get("created_at")),
+            )
+            for record in records
+        )
+        source = select(
+            users_staging.c.username,
+            users_staging.c.language,
+            func.coalesce(users_staging.c.created_at, func.now()),
+        )
+        stmt = (
+            pg_insert(User)
+            .from_select(["username", "language", "created_at"], source)
+            .on_conflict_do_nothing(index_elements=[User.username])
+        )
+        return await self._staged(users_staging, rows, [stmt])
+
+    async def import_achievements(self, records: Iterable[Mapping[str, Any]]) -> ImportResult:
+        """
+        Загрузка достижений и их переводов. Поля записи: code, points и пары
+        name_<язык>, description_<язык> для каждого доступного языка (как в
+        app/data/achievements.json, где код задаётся полем id). Существующие
+        достижения и переводы обновляются.
+
+        :param records: Поток записей.
+        :return: Итог загрузки (written - количество достижений).
+        """
+        ach_stmt = pg_insert(Achievement).from_select(
+            ["code", "points"], select(achievements_staging.c.code, achievements_staging.c.points)
+        )
+        ach_stmt = ach_stmt.on_conflict_do_update(
+            index_elements=[Achievement.code], set_={"points": ach_stmt.excluded.points}
+        )
+
+        tr_source = select(
+            Achievement.id,
+            translations_staging.c.language,
+            translations_staging.c.name,
+            translations_staging.c.description,
+        ).join(Achievement, Achievement.code == translations_staging.c.code)
+        tr_stmt = pg_insert(AchievementTranslation).from_select(
+            ["achievement_id", "language", "name", "description"], tr_source
+        )
+        tr_stmt = tr_stmt.on_conflict_do_update(
+            constraint="uq_achievement_language",
+            set_={"name": tr_stmt.excluded.name, "description": tr_stmt.excluded.description},
+        )
+
+        read = written = 0
+        for batch in batched(records, self.batch_size):
+            # Повтор кода внутри пачки: побеждает последняя запись, как и
+            # между пачками.
+            items = list({_achievement_code(record): record for record in batch}.values())
+            await self._copy(achievements_staging, None, [_achievement_row(item) for item in items])
+            await self._copy(translations_staging, None, list(_translation_rows(items)))
+            result = await self.session.execute(ach_stmt)
+            await self.session.execute(tr_stmt)
+            await self.session.commit()
+            read += len(batch)
+            written += result.rowcount
+        return ImportResult(read=read, written=written)
+
+    async def import_grants(self, records: Iterable[Mapping[str, Any]]) -> ImportResult:
+        """
+        Загрузка выданных достижений. Поля записи: user_id или username,
+        code и необязательное issued_at. Записи с неизвестным пользователем
+        или кодом и уже выданные достижения пропускаются.
+
+        :param records: Поток записей.
+        :return: Итог загрузки.
+        """
+        rows = (
+            (
+                _optional_int(record.get("user_id")),
+                record.get("username") or None,
+                str(record["code"]),
+                _parse_datetime(record.get("issued_at")),
+            )
+            for record in records
+        )
+        by_name = User.__table__.alias("by_name")
+        user_id = func.coalesce(grants_staging.c.user_id, by_name.c.id)
+        source = (
+            select(User.id, Achievement.id, func.coalesce(grants_staging.c.issued_at, func.now()))
+            .select_from(grants_staging)
+            .outerjoin(by_name, by_name.c.username == grants_staging.c.username)
+            .join(User, User.id == user_id)
+            .join(Achievement, Achievement.code == grants_staging.c.code)
+        )
+        stmt = (
+            pg_insert(UserAchievement)
+            .from_select(["user_id", "achievement_id", "issued_at"], source)
+            .on_conflict_do_nothing(constraint="uq_user_achievement")
+        )
+        return await self._staged(grants_staging, rows, [stmt])
+
+    async def recompute_user_totals(self, chunk_size: int = 10_000) -> int:
+        """
+        Пересчёт users.total_points, users.achievements_count и
+        users.achievement_bits по выданным достижениям. Пересчёт идёт
+        диапазонами идентификаторов пользователей через ConsistencyService:
+        каждый диапазон сверяется с журналом выдач и исправляется в
+        отдельной транзакции.
+
+        :param chunk_size: Количество идентификаторов пользователей в одном чанке.
+        :return: Количество пользователей, у которых счётчики изменились.
+        """
+        report = await ConsistencyService(self.session).check_user_totals(
+            chunk_size, repair=True, max_samples=0
+        )
+        return report.repaired
+
+    async def recompute_counters(self) -> int:
+        """
+        Пересчёт полос счётчиков выдач достижений и пользователей по журналу
+        выдач и таблице users через ConsistencyService.
+
+        :return: Количество исправленных счётчиков.
+        """
+        drifts = await ConsistencyService(self.session).reconcile_counters(repair=True)
+        return len(drifts)
+
+    async def _staged(
+        self,
+        staging: Table,
+        rows: Iterable[Record],
+        statements: Sequence[Any],
+    ) -> ImportResult:
+        read = written = 0
+        for batch in batched(rows, self.batch_size):
+            await self._copy(staging, None, list(batch))
+            for stmt in statements:
+                written += (await self.session.execute(stmt)).rowcount
+            await self.session.commit()
+            read += len(batch)
+        return ImportResult(read=read, written=written)
+
+    async def _copy(self, table: Table, columns: Sequence[str] | None, batch: list[Record]) -> None:
+        """
+        COPY одной пачки на соединении текущей транзакции сессии. Для
+        временных таблиц таблица предварительно создаётся в этой транзакции.
+        """
+        connection = await self.session.connection()
+        # Первый оператор открывает транзакцию драйвера, и COPY выполняется
+        # в ней, без автокоммита.
+        await connection.execute(text("SET LOCAL statement_timeout = 0"))
+        if table.metadata is _staging:
+            await connection.run_sync(table.create)
+
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=batch,
+            columns=list(columns) if columns is not None else [c.name for c in table.columns],
+            schema_name=table.schema,
+        )
+
+
+def _achievement_code(record: Mapping[str, Any]) -> str:
+    return str(record.get("code") or record["id"])
+
+
+def _achievement_row(record: Mapping[str, Any]) -> Record:
+    return _achievement_code(record), int(record["points"])
+
+
+def _translation_rows(records: Iterable[Mapping[str, Any]]) -> Iterator[Record]:
+    for record in records:
+        code = _achievement_code(record)
+        for language in Language:
+            name = record.get(f"name_{language.value}")
+            if name:
+                description = record.get(f"description_{language.value}") or ""
+                yield code, language.name, str(name), str(description)
+
+
+def _language_name(value: Any) -> str:
+    # asyncpg передаёт enum в COPY по имени значения в БД.
+    return Language(str(value).strip().lower()).name
+
+
+def _optional_int(value: Any) -> int | None:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _parse_datetime(value: Any) -> datetime | None:
+    if value is None or value == "":
+        return None
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    # Столбцы хранят время без часового пояса в UTC.
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
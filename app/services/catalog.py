@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import gzip
+import hashlib
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from time import monotonic
+from types import MappingProxyType
+from typing import Any
+
+import asyncpg
+from pydantic import TypeAdapter
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.models.achievement import Achievement
+from app.models.enums import Language, RuleKind
+from app.schemas.achievements import AchievementRead, AchievementTranslationRead
+from app.services.rarity import RaritySnapshot
+
+try:
+    import brotli
+except ImportError:  # brotli - опциональная зависимость
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CHANNEL = "achievement_catalog"
+
+_listing_adapter = TypeAdapter(list[AchievementRead])
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """
+    Готовое к отдаче представление тела ответа.
+
+    Поля:
+        content: Байты тела (возможно сжатые).
+        etag: Строгий ETag этого представления.
+        encoding: Значение Content-Encoding или None для несжатого тела.
+    """
+
+    content: bytes
+    etag: str
+    encoding: str | None = None
+
+
+@dataclass(frozen=True)
+class CatalogListing:
+    """
+    Предварительно сериализованный список достижений для GET /achievements
+    в несжатом и сжатых вариантах.
+    """
+
+    variants: Mapping[str, EncodedBody]
+
+    @classmethod
+    def encode(cls, body: bytes) -> CatalogListing:
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {"identity": EncodedBody(content=body, etag=f'"{digest}"')}
+        variants["gzip"] = EncodedBody(
+            content=gzip.compress(body, compresslevel=9, mtime=0),
+            etag=f'"{digest}-gzip"',
+            encoding="gzip",
+        )
+        if brotli is not None:
+            variants["br"] = EncodedBody(
+                content=brotli.compress(body),
+                etag=f'"{digest}-br"',
+                encoding="br",
+            )
+        return cls(variants=MappingProxyType(variants))
+
+
+@dataclass(frozen=True)
+class RuleEntry:
+    """
+    Правило выдачи достижения по событиям в каталоге в памяти процесса.
+
+    Поля:
+        id: Идентификатор правила.
+        achievement_id: Идентификатор выдаваемого достижения.
+        code: Код выдаваемого достижения.
+        event_type: Тип событий, которые обрабатывает правило.
+        kind: Вид правила.
+        target: Целевое значение условия.
+    """
+
+    id: int
+    achievement_id: int
+    code: str
+    event_type: str
+    kind: RuleKind
+    target: int
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """
+    Достижение в каталоге в памяти процесса.
+
+    Поля:
+        id: Идентификатор достижения.
+        code: Уникальный код достижения.
+        points: Количество очков за достижение.
+        translations: Переводы названия и описания по языкам.
+        rules: Правила выдачи достижения по событиям.
+    """
+
+    id: int
+    code: str
+    points: int
+    translations: Mapping[Language, AchievementTranslationRead]
+    rules: tuple[RuleEntry, ...] = ()
+
+    def to_read(self, rarity: RaritySnapshot | None = None) -> AchievementRead:
+        return AchievementRead(
+            id=self.id,
+            code=self.code,
+            points=self.points,
+            translations=list(self.translations.values()),
+            unlock_count=rarity.unlock_count(self.id) if rarity is not None else 0,
+            unlock_percentage=rarity.unlock_percentage(self.id) if rarity is not None else 0.0,
+        )
+
+
+@dataclass(frozen=True)
+class AchievementCatalog:
+    """
+    Неизменяемый снимок каталога достижений. Новый снимок создаётся при
+    каждой перезагрузке и подменяет предыдущий одной операцией присваивания,
+    поэтому читатели всегда видят согласованный каталог.
+
+    Поля:
+        version: Номер версии снимка в рамках процесса.
+        entries: Достижения, отсортированные по идентификатору.
+        by_code: Индекс код → достижение.
+        by_id: Индекс идентификатор → достижение.
+        by_event: Индекс тип события → правила, которые его обрабатывают.
+    """
+
+    version: int
+    entries: tuple[CatalogEntry, ...]
+    by_code: Mapping[str, CatalogEntry] = field(repr=False)
+    by_id: Mapping[int, CatalogEntry] = field(repr=False)
+    by_event: Mapping[str, tuple[RuleEntry, ...]] = field(repr=False)
+    _listings: dict[int, CatalogListing] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def build(cls, version: int, entries: list[CatalogEntry]) -> AchievementCatalog:
+        entries = sorted(entries, key=lambda entry: entry.id)
+        by_event: dict[str, list[RuleEntry]] = {}
+        for entry in entries:
+            for rule in entry.rules:
+                by_event.setdefault(rule.event_type, []).append(rule)
+        return cls(
+            version=version,
+            entries=tuple(entries),
+            by_code=MappingProxyType({entry.code: entry for entry in entries}),
+            by_id=MappingProxyType({entry.id: entry for entry in entries}),
+            by_event=MappingProxyType(
+                {event_type: tuple(rules) for event_type, rules in by_event.items()}
+            ),
+        )
+
+    def achievements(self, rarity: RaritySnapshot | None = None) -> list[AchievementRead]:
+        """
+        Список достижений каталога в формате ответа API.
+
+        :param rarity: Снимок счётчиков редкости или None для нулевых счётчиков.
+        :return: Список достижений с переводами и счётчиками выдач.
+        """
+        return [entry.to_read(rarity) for entry in self.entries]
+
+    def listing(self, rarity: RaritySnapshot) -> CatalogListing:
+        """
+        Сериализованный и сжатый список достижений. Вычисляется один раз на
+        пару версий каталога и снимка счётчиков редкости, то есть заново
+        только при изменении каталога или счётчиков.
+
+        :param rarity: Снимок счётчиков редкости.
+        :return: Варианты тела ответа для разных Content-Encoding.
+        """
+        listing = self._listings.get(rarity.version)
+        if listing is None:
+            listing = CatalogListing.encode(_listing_adapter.dump_json(self.achievements(rarity)))
+            # Хранится только вариант для последнего снимка счётчиков.
+            self._listings.clear()
+            self._listings[rarity.version] = listing
+        return listing
+
+
+class CatalogStore:
+    """
+    Держатель текущего снимка каталога достижений. Каталог загружается при
+    старте приложения, перезагружается после создания достижений и, если
+    включено, по уведомлениям Postgres LISTEN/NOTIFY от других воркеров.
+    """
+
+    def __init__(self) -> None:
+        self._catalog: AchievementCatalog | None = None
+        self._lock = asyncio.Lock()
+        self._last_reload = 0.0
+        self._listener: asyncpg.Connection | None = None
+        self._supervisor: asyncio.Task[None] | None = None
+        self._background: set[asyncio.Task[Any]] = set()
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None and not self._listener.is_closed()
+
+    async def get(self, session: AsyncSession) -> AchievementCatalog:
+        """
+        Получение текущего снимка каталога. При первом обращении каталог
+        загружается из БД, дальнейшие обращения запросов к БД не выполняют.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Текущий снимок каталога.
+        """
+        catalog = self._catalog
+        if catalog is None:
+            async with self._lock:
+                # Пока запрос ждал блокировку, каталог мог загрузить другой запрос.
+                catalog = self._catalog
+                if catalog is None:
+                    catalog = await self._load(session)
+        return catalog
+
+    async def reload(self, session: AsyncSession) -> AchievementCatalog:
+        """
+        Загрузка каталога из БД и атомарная подмена текущего снимка.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Новый снимок каталога.
+        """
+        async with self._lock:
+            return await self._load(session)
+
+    async def _load(self, session: AsyncSession) -> AchievementCatalog:
+        stmt = (
+            select(Achievement)
+            .options(
+                selectinload(Achievement.translations),
+                selectinload(Achievement.rules),
+            )
+            .order_by(Achievement.id)
+        )
+        achievements = (await session.execute(stmt)).scalars().all()
+
+        entries = [
+            CatalogEntry(
+                id=achievement.id,
+                code=achievement.code,
+                points=achievement.points,
+                translations=MappingProxyType(
+                    {
+                        translation.language: AchievementTranslationRead.model_validate(translation)
+                        for translation in sorted(achievement.translations, key=lambda t: t.id)
+                    }
+                ),
+                rules=tuple(
+                    RuleEntry(
+                        id=rule.id,
+                        achievement_id=achievement.id,
+                        code=achievement.code,
+                        event_type=rule.event_type,
+                        kind=rule.kind,
+                        target=rule.target,
+                    )
+                    for rule in sorted(achievement.rules, key=lambda r: r.id)
+                ),
+            )
+            for achievement in achievements
+        ]
+
+        version = self._catalog.version + 1 if self._catalog is not None else 1
+        self._catalog = AchievementCatalog.build(version, entries)
+        self._last_reload = monotonic()
+
+        logger.info(
+            "Loaded achievement catalog v%s: %s achievements, %s rules",
+            version,
+            len(entries),
+            sum(len(entry.rules) for entry in entries),
+        )
+        return self._catalog
+
+    async def refresh_on_miss(self, session: AsyncSession) -> AchievementCatalog:
+        """
+        Перезагрузка каталога при обращении к неизвестному коду: достижение
+        могло быть создано другим воркером. Если соединение LISTEN/NOTIFY
+        активно или каталог недавно перезагружался, возвращается текущий
+        снимок; пока слушающее соединение потеряно, каталог перезагружается
+        не чаще CATALOG_MISS_RELOAD_INTERVAL.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Актуальный снимок каталога.
+        """
+        catalog = await self.get(session)
+        if self.listening:
+            return catalog
+        if monotonic() - self._last_reload < settings.catalog_miss_reload_interval:
+            return catalog
+        return await self.reload(session)
+
+    async def notify(self, session: AsyncSession) -> None:
+        """
+        Отправка уведомления об изменении каталога другим воркерам. Уведомление
+        доставляется только после коммита текущей транзакции.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: None.
+        """
+        await session.execute(
+            text("SELECT pg_notify(:channel, '')"),
+            {"channel": CATALOG_CHANNEL},
+        )
+
+    async def listen(self, engine: AsyncEngine, session_factory: Any) -> None:
+        """
+        Подписка на уведомления об изменении каталога через выделенное
+        соединение вне пула приложения. При получении уведомления каталог
+        перезагружается. Фоновая задача раз в CATALOG_LISTEN_CHECK_INTERVAL
+        секунд проверяет соединение и при потере переподключается, после
+        чего перезагружает каталог, чтобы учесть пропущенные уведомления.
+
+        :param engine: Асинхронный движок SQLAlchemy, из которого берутся
+            параметры подключения.
+        :param session_factory: Фабрика сессий для перезагрузки каталога.
+        :return: None.
+        """
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+        async def reload_catalog() -> None:
+            async with session_factory() as session:
+                await self.reload(session)
+
+        def on_notify(*_: Any) -> None:
+            task = asyncio.get_running_loop().create_task(reload_catalog())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        async def connect() -> None:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(CATALOG_CHANNEL, on_notify)
+            self._listener = connection
+            logger.info("Listening for achievement catalog changes on %s", CATALOG_CHANNEL)
+
+        async def supervise() -> None:
+            while True:
+                await asyncio.sleep(settings.catalog_listen_check_interval)
+                try:
+                    if self.listening:
+                        await self._listener.execute("SELECT 1", timeout=5)
+                        continue
+                    self._drop_listener()
+                    await connect()
+                    await reload_catalog()
+                except Exception:
+                    logger.warning(
+                        "Achievement catalog listener is unavailable, reconnecting", exc_info=True
+                    )
+                    self._drop_listener()
+
+        await connect()
+        self._supervisor = asyncio.create_task(supervise(), name="catalog-listener")
+
+    def _drop_listener(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None and not listener.is_closed():
+            listener.terminate()
+
+    async def close(self) -> None:
+        """
+        Остановка проверки и закрытие соединения, слушающего уведомления.
+
+        :return: None.
+        """
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._supervisor
+            self._supervisor = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+achievement_catalog = CatalogStore()
@@ -0,0 +1,376 @@
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Select,
+    SmallInteger,
+    String,
+    Text,
+    and_,
+    bindparam,
+    cast,
+    func,
+    literal,
+    not_,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import Achievement
+from app.models.achievement_unlock_stripe import AchievementUnlockStripe
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.models.user_count_stripe import UserCountStripe
+from app.models.user_points_delta import UserPointsDelta
+from app.services.ownership import VARBIT, achievement_mask
+from app.services.points_deltas import points_striping
+from app.services.rarity import unlock_counts_upsert, user_count_upsert
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserTotalsDrift:
+    """
+    Расхождение денормализованных счётчиков пользователя с журналом выдач.
+
+    Поля:
+        user_id: Идентификатор пользователя.
+        total_points: Значение users.total_points.
+        expected_points: Сумма очков по user_achievements.
+        achievements_count: Значение users.achievements_count.
+        expected_count: Количество выдач по user_achievements.
+        achievement_bits_ok: Совпадает ли users.achievement_bits с выдачами.
+    """
+
+    user_id: int
+    total_points: int
+    expected_points: int
+    achievements_count: int
+    expected_count: int
+    achievement_bits_ok: bool
+
+
+@dataclass(frozen=True)
+class CounterDrift:
+    """
+    Расхождение полос счётчиков редкости с журналом выдач или таблицей
+    пользователей.
+
+    Поля:
+        achievement_id: Идентификатор достижения или None для счётчика пользователей.
+        current: Сумма полос счётчика.
+        expected: Количество выдач достижения или пользователей.
+    """
+
+    achievement_id: int | None
+    current: int
+    expected: int
+
+
+@dataclass
+class ConsistencyReport:
+    """
+    Результат проверки счётчиков пользователей.
+
+    Поля:
+        checked: Количество проверенных пользователей.
+        drifted: Количество пользователей с расхождениями.
+        repaired: Количество исправленных пользователей.
+        samples: Первые найденные расхождения.
+    """
+
+    checked: int = 0
+    drifted: int = 0
+    repaired: int = 0
+    samples: list[UserTotalsDrift] = field(default_factory=list)
+
+
+def expected_user_totals(condition: ColumnElement[bool]) -> Select:
+    """
+    Построение эталонных значений users.total_points и
+    users.achievements_count по журналу выдач для пользователей,
+    удовлетворяющих условию, и сверка users.achievement_bits: длина строки
+    равна наибольшему выданному идентификатору плюс один, число единиц -
+    числу выдач, и бит каждой выдачи установлен. Пользователи без выдач
+    получают нули и пустую строку.
+
+    :param condition: Условие на таблицу users.
+    :return: Выборка из столбцов user_id, points, count и bits_ok.
+    """
+    bits = User.achievement_bits
+    granted_bit = cast(func.substring(bits, UserAchievement.achievement_id + 1, 1), Text) == "1"
+    return (
+        select(
+            User.id.label("user_id"),
+            func.coalesce(func.sum(Achievement.points), 0).label("points"),
+            func.count(UserAchievement.id).label("count"),
+            and_(
+                func.length(bits) == func.coalesce(func.max(UserAchievement.achievement_id) + 1, 0),
+                func.bit_count(bits) == func.count(UserAchievement.id),
+                func.coalesce(func.bool_and(granted_bit), True),
+            ).label("bits_ok"),
+        )
+        .outerjoin(UserAchievement, UserAchievement.user_id == User.id)
+        .outerjoin(Achievement, UserAchievement.achievement_id == Achievement.id)
+        .where(condition)
+        .group_by(User.id)
+    )
+
+
+def unlock_counter_drifts() -> Select:
+    """
+    Построение сверки сумм полос achievement_unlock_stripes с количеством
+    выдач каждого достижения в user_achievements.
+
+    :return: Выборка из столбцов achievement_id, current и expected только
+        для достижений с расхождениями.
+    """
+    expected = (
+        select(UserAchievement.achievement_id, func.count().label("count"))
+        .group_by(UserAchievement.achievement_id)
+        .subquery("expected")
+    )
+    current = (
+        select(
+            AchievementUnlockStripe.achievement_id,
+            func.sum(AchievementUnlockStripe.count).label("count"),
+        )
+        .group_by(AchievementUnlockStripe.achievement_id)
+        .subquery("current")
+    )
+    current_count = func.coalesce(current.c.count, 0)
+    expected_count = func.coalesce(expected.c.count, 0)
+    return (
+        select(
+            Achievement.id.label("achievement_id"),
+            current_count.label("current"),
+            expected_count.label("expected"),
+        )
+        .outerjoin(expected, expected.c.achievement_id == Achievement.id)
+        .outerjoin(current, current.c.achievement_id == Achievement.id)
+        .where(current_count != expected_count)
+    )
+
+
+def user_counter_drift() -> Select:
+    """
+    Построение сверки суммы полос user_count_stripes с количеством
+    пользователей.
+
+    :return: Выборка из столбцов current и expected (пустая, если
+        расхождения нет).
+    """
+    current = select(func.coalesce(func.sum(UserCountStripe.count), 0)).scalar_subquery()
+    expected = select(func.count(User.id)).scalar_subquery()
+    return select(current.label("current"), expected.label("expected")).where(current != expected)
+
+
+def settled_users(condition: ColumnElement[bool]) -> ColumnElement[bool]:
+    """
+    Ограничение условия на users пользователями без неперенесённых полос
+    user_points_deltas. Выдачи в полосах уже есть в журнале, но ещё не в
+    счётчиках users, поэтому такие пользователи проверяются после переноса.
+
+    :param condition: Условие на таблицу users.
+    :return: Условие, исключающее пользователей с полосами в режиме
+        полосатых счётчиков.
+    """
+    if not points_striping():
+        return condition
+    return and_(
+        condition,
+        ~select(UserPointsDelta.user_id).where(UserPointsDelta.user_id == User.id).exists(),
+    )
+
+
+class ConsistencyService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def check_user_totals(
+        self,
+        chunk_size: int = 10_000,
+        repair: bool = False,
+        max_samples: int = 20,
+    ) -> ConsistencyReport:
+        """
+        Сверка users.total_points и users.achievements_count с журналом
+        выдач user_achievements. Проверка идёт диапазонами идентификаторов
+        пользователей; каждый диапазон сверяется одним оператором, поэтому
+        счётчики и журнал читаются из одного снимка и параллельные выдачи
+        не дают ложных расхождений. Пользователи с неперенесёнными полосами
+        user_points_deltas пропускаются до переноса. При repair=True
+        найденные расхождения исправляются в транзакции диапазона.
+
+        :param chunk_size: Количество идентификаторов пользователей в одном чанке.
+        :param repair: Исправлять найденные расхождения.
+        :param max_samples: Сколько первых расхождений вернуть в отчёте.
+        :return: Отчёт о проверке.
+        """
+        bounds = (
+            await self.session.execute(
+                select(func.min(User.id), func.max(User.id), func.count(User.id))
+            )
+        ).one()
+        await self.session.commit()
+
+        min_id, max_id, checked = bounds
+        report = ConsistencyReport(checked=checked)
+        if min_id is None:
+            return report
+
+        for lo in range(min_id, max_id + 1, chunk_size):
+            hi = lo + chunk_size - 1
+            expected = expected_user_totals(settled_users(User.id.between(lo, hi))).subquery(
+                "expected"
+            )
+            stmt = (
+                select(
+                    User.id,
+                    User.total_points,
+                    expected.c.points,
+                    User.achievements_count,
+                    expected.c.count,
+                    expected.c.bits_ok,
+                )
+                .join(expected, User.id == expected.c.user_id)
+                .where(
+                    or_(
+                        User.total_points != expected.c.points,
+                        User.achievements_count != expected.c.count,
+                        not_(expected.c.bits_ok),
+                    )
+                )
+                .order_by(User.id)
+            )
+            drifts = [UserTotalsDrift(*row) for row in await self.session.execute(stmt)]
+            report.drifted += len(drifts)
+            report.samples += drifts[: max(max_samples - len(report.samples), 0)]
+
+            if repair and drifts:
+                report.repaired += await self._repair([drift.user_id for drift in drifts])
+            await self.session.commit()
+
+            if drifts:
+                logger.warning(
+                    "User totals drift for user_id %s..%s: %s users%s",
+                    lo,
+                    hi,
+                    len(drifts),
+                    " (repaired)" if repair else "",
+                )
+
+        return report
+
+    async def _repair(self, user_ids: Sequence[int]) -> int:
+        """
+        Пересчёт счётчиков и битовых строк достижений указанных
+        пользователей по журналу выдач.
+        Сначала строки пользователей блокируются (FOR UPDATE в порядке id),
+        затем эталон считается новым оператором: выдача, успевшая
+        зафиксироваться до блокировки, попадает в эталон, а выдача, ждущая
+        блокировку, прибавит свои очки уже к исправленному значению.
+
+        :param user_ids: Идентификаторы пользователей с расхождениями.
+        :return: Количество исправленных пользователей.
+        """
+        await self.session.execute(
+            select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update()
+        )
+        expected = expected_user_totals(settled_users(User.id.in_(user_ids))).subquery("expected")
+        repaired = set(
+            await self.session.scalars(
+                update(User)
+                .where(
+                    User.id == expected.c.user_id,
+                    or_(
+                        User.total_points != expected.c.points,
+                        User.achievements_count != expected.c.count,
+                    ),
+                )
+                .values(total_points=expected.c.points, achievements_count=expected.c.count)
+                .returning(User.id)
+            )
+        )
+
+        granted = (
+            select(UserAchievement.user_id, func.array_agg(UserAchievement.achievement_id))
+            .where(UserAchievement.user_id.in_(user_ids))
+            .group_by(UserAchievement.user_id)
+        )
+        masks = dict.fromkeys(user_ids, "")
+        for user_id, achievement_ids in await self.session.execute(granted):
+            masks[user_id] = achievement_mask(achievement_ids)
+        source = (
+            func.unnest(
+                bindparam("mask_user_ids", list(masks), type_=ARRAY(Integer)),
+                bindparam("masks", list(masks.values()), type_=ARRAY(String)),
+            )
+            .table_valued("user_id", "mask")
+            .render_derived(name="masks")
+        )
+        repaired.update(
+            await self.session.scalars(
+                update(User)
+                .where(
+                    User.id == source.c.user_id,
+                    User.achievement_bits != cast(source.c.mask, VARBIT),
+                )
+                .values(achievement_bits=cast(source.c.mask, VARBIT))
+                .returning(User.id)
+            )
+        )
+        return len(repaired)
+
+    async def reconcile_counters(self, repair: bool = False) -> list[CounterDrift]:
+        """
+        Сверка полос счётчиков редкости (выдачи по достижениям и количество
+        пользователей) с журналом выдач и таблицей users. Каждая сверка
+        выполняется одним оператором, поэтому счётчики и журнал читаются из
+        одного снимка. При repair=True разница прибавляется к полосе 0 тем же
+        атомарным увеличением, что и при выдаче: выдачи, зафиксированные после
+        снимка, не попадают ни в разницу, ни в эталон и не теряются.
+
+        :param repair: Исправлять найденные расхождения.
+        :return: Найденные расхождения (achievement_id=None - счётчик пользователей).
+        """
+        drifts = [
+            CounterDrift(row.achievement_id, row.current, row.expected)
+            for row in await self.session.execute(unlock_counter_drifts().order_by(Achievement.id))
+        ]
+        drifts += [
+            CounterDrift(None, row.current, row.expected)
+            for row in await self.session.execute(user_counter_drift())
+        ]
+
+        if repair and drifts:
+            unlocks = unlock_counter_drifts().subquery("drifts")
+            await self.session.execute(
+                unlock_counts_upsert(
+                    select(
+                        unlocks.c.achievement_id,
+                        literal(0, SmallInteger),
+                        unlocks.c.expected - unlocks.c.current,
+                    )
+                )
+            )
+            users = user_counter_drift().subquery("drift")
+            await self.session.execute(
+                user_count_upsert(
+                    select(literal(0, SmallInteger), users.c.expected - users.c.current)
+                )
+            )
+        await self.session.commit()
+
+        if drifts:
+            logger.warning(
+                "Rarity counters drift: %s counters%s", len(drifts), " (repaired)" if repair else ""
+            )
+        return drifts
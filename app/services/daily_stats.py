@@ -0,0 +1,146 @@
+import logging
+
+from sqlalchemy import (
+    Date,
+    Insert,
+    Integer,
+    Select,
+    Subquery,
+    cast,
+    delete,
+    func,
+    insert,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import Achievement
+from app.models.enums import Language, TimeWindow
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.models.user_daily_stat import UserDailyStat
+from app.models.user_points_delta import UserPointsDelta
+from app.services.points_deltas import pending_points, points_striping
+
+logger = logging.getLogger(__name__)
+
+
+def daily_points_upsert(source: Select) -> Insert:
+    """
+    Построение атомарного добавления очков в дневные агрегаты пользователей.
+    Для отсутствующих пар (user_id, day) строки создаются, для существующих
+    очки прибавляются к уже накопленным (ON CONFLICT по uq_user_day).
+
+    :param source: Выборка из трёх столбцов: user_id, day, points.
+    :return: Оператор INSERT ... ON CONFLICT DO UPDATE.
+    """
+    stmt = pg_insert(UserDailyStat).from_select(["user_id", "day", "points"], source)
+    return stmt.on_conflict_do_update(
+        constraint="uq_user_day",
+        set_={"points": UserDailyStat.points + stmt.excluded.points},
+    )
+
+
+def window_points(window: TimeWindow, language: Language | None = None) -> Subquery:
+    """
+    Построение скользящих сумм очков пользователей за окно по дневным
+    агрегатам user_daily_stats. Окно задаётся диапазоном дней от
+    current_date - (days - 1) до текущего дня, поэтому дни, выпавшие из окна,
+    перестают учитываться без отдельной очистки. Диапазон читается из индекса
+    ix_user_daily_stats_day_user_id_points, журнал выдач не сканируется.
+    В режиме полосатых счётчиков к дневным агрегатам добавляются
+    неперенесённые полосы user_points_deltas.
+
+    :param window: Скользящее окно.
+    :param language: Язык пользователей или None для всех языков.
+    :return: Подзапрос со столбцами id, username, language, total_points
+        и points (очки за окно) для пользователей, получавших очки в окне.
+    """
+    since = func.current_date() - (window.days - 1)
+    total_points = User.total_points
+    if points_striping():
+        days = union_all(
+            select(UserDailyStat.user_id, UserDailyStat.points).where(UserDailyStat.day >= since),
+            select(UserPointsDelta.user_id, UserPointsDelta.points).where(
+                UserPointsDelta.day >= since
+            ),
+        ).subquery("days")
+        total_points = total_points + pending_points(User.id)
+    else:
+        days = (
+            select(UserDailyStat.user_id, UserDailyStat.points)
+            .where(UserDailyStat.day >= since)
+            .subquery("days")
+        )
+    sums = (
+        select(days.c.user_id, func.sum(days.c.points).label("points"))
+        .group_by(days.c.user_id)
+        .subquery("sums")
+    )
+    stmt = select(
+        User.id,
+        User.username,
+        User.language,
+        total_points.label("total_points"),
+        cast(sums.c.points, Integer).label("points"),
+    ).join(sums, User.id == sums.c.user_id)
+    if language is not None:
+        stmt = stmt.where(User.language == language)
+    return stmt.subquery("window_points")
+
+
+class DailyStatsService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def rebuild(self, chunk_size: int = 10_000) -> int:
+        """
+        Полный пересчёт таблицы user_daily_stats по журналу выданных достижений.
+        Пересчёт идёт диапазонами идентификаторов пользователей, каждый диапазон
+        обрабатывается и коммитится в отдельной транзакции, поэтому объём
+        работы одной транзакции ограничен размером чанка.
+
+        :param chunk_size: Количество идентификаторов пользователей в одном чанке.
+        :return: Количество записанных строк дневной статистики.
+        """
+        bounds = (await self.session.execute(select(func.min(User.id), func.max(User.id)))).one()
+        await self.session.commit()
+
+        min_id, max_id = bounds
+        if min_id is None:
+            return 0
+
+        day_expr = cast(UserAchievement.issued_at, Date)
+        total_rows = 0
+
+        for lo in range(min_id, max_id + 1, chunk_size):
+            hi = lo + chunk_size - 1
+
+            await self.session.execute(
+                delete(UserDailyStat).where(UserDailyStat.user_id.between(lo, hi))
+            )
+
+            source = (
+                select(
+                    UserAchievement.user_id,
+                    day_expr,
+                    func.sum(Achievement.points),
+                )
+                .join(Achievement, UserAchievement.achievement_id == Achievement.id)
+                .where(UserAchievement.user_id.between(lo, hi))
+                .group_by(UserAchievement.user_id, day_expr)
+            )
+            result = await self.session.execute(
+                insert(UserDailyStat).from_select(
+                    ["user_id", "day", "points"],
+                    source,
+                )
+            )
+            await self.session.commit()
+
+            total_rows += result.rowcount
+            logger.info("Rebuilt daily stats for user_id %s..%s: %s rows", lo, hi, result.rowcount)
+
+        return total_rows
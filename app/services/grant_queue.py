@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from itertools import batched
+from pathlib import Path
+from typing import IO
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import Metric
+from app.schemas.achievements import GrantBatchItem, QueuedGrant, QueuedGrantStatus
+from app.services.achievements import AchievementService
+from app.services.catalog import achievement_catalog
+
+logger = logging.getLogger(__name__)
+
+APPLY_ATTEMPTS = 3
+LOG_SLOTS = 64
+
+
+class GrantQueueFullError(RuntimeError):
+    """Очередь выдач заполнена и не освободилась за GRANT_QUEUE_PUT_TIMEOUT."""
+
+
+class GrantQueueClosedError(RuntimeError):
+    """Очередь выдач не запущена или останавливается."""
+
+
+@dataclass(frozen=True)
+class PendingGrant:
+    """
+    Выдача, принятая в очередь и ещё не записанная в БД.
+
+    Поля:
+        token: Токен выдачи.
+        user_id: Идентификатор пользователя.
+        code: Код достижения.
+        achievement_id: Идентификатор достижения из каталога.
+    """
+
+    token: str
+    user_id: int
+    code: str
+    achievement_id: int
+
+
+class GrantLog:
+    """
+    Локальный append-only журнал принятых выдач в формате JSON Lines.
+    Принятая выдача пишется строкой с её полями, записанная пачка -
+    строкой {"ack": [токены]}. При открытии журнал перечитывается и
+    неподтверждённые выдачи возвращаются для повторного применения; файл
+    очищается при открытии и после подтверждения, когда неподтверждённых
+    выдач не осталось. Запись
+    сбрасывается в ОС (flush) без fsync: журнал переживает падение процесса,
+    но не сбой питания узла.
+
+    Каждый воркер занимает отдельный файл журнала под эксклюзивной
+    блокировкой flock: первый свободный из path, path.1, path.2 и т.д.
+    После перезапуска воркеры подхватывают те же файлы.
+    """
+
+    def __init__(self, file: IO[str], path: Path, pending: dict[str, PendingGrant]) -> None:
+        self.path = path
+        self._file = file
+        self._pending = pending
+
+    @classmethod
+    def open(cls, path: Path) -> GrantLog:
+        """
+        Открытие первого свободного файла журнала и чтение неподтверждённых выдач.
+
+        :param path: Путь к журналу.
+        :return: Открытый журнал.
+        :raises RuntimeError: Если все файлы журнала заняты другими процессами.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for slot in range(LOG_SLOTS):
+            candidate = path if slot == 0 else path.with_name(f"{path.name}.{slot}")
+            file = candidate.open("a+", encoding="utf-8")
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                continue
+
+            file.seek(0)
+            pending = cls._read(file)
+            if not pending:
+                file.truncate(0)
+            return cls(file, candidate, {grant.token: grant for grant in pending})
+
+        raise RuntimeError(f"All {LOG_SLOTS} grant log files at {path} are locked")
+
+    @property
+    def pending(self) -> list[PendingGrant]:
+        """Неподтверждённые выдачи в порядке приёма."""
+        return list(self._pending.values())
+
+    def append(self, grants: Iterable[PendingGrant]) -> None:
+        """
+        Запись принятых выдач.
+
+        :param grants: Принятые выдачи.
+        :return: None.
+        """
+        lines = []
+        for grant in grants:
+            self._pending[grant.token] = grant
+            lines.append(json.dumps(asdict(grant), separators=(",", ":")) + "\n")
+        if lines:
+            self._file.writelines(lines)
+            self._file.flush()
+
+    def ack(self, tokens: Iterable[str]) -> None:
+        """
+        Отметка выдач как записанных в БД. Когда неподтверждённых выдач не
+        остаётся, файл очищается, чтобы журнал не рос без ограничений.
+
+        :param tokens: Токены записанных выдач.
+        :return: None.
+        """
+        tokens = [token for token in tokens if self._pending.pop(token, None) is not None]
+        if not tokens:
+            return
+        if not self._pending:
+            self._file.truncate(0)
+        else:
+            self._file.write(json.dumps({"ack": tokens}, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Закрытие журнала. Если все выдачи подтверждены, файл очищается.
+
+        :return: None.
+        """
+        if not self._pending:
+            self._file.truncate(0)
+        self._file.close()
+
+    @staticmethod
+    def _read(file: IO[str]) -> list[PendingGrant]:
+        pending: dict[str, PendingGrant] = {}
+        acked: set[str] = set()
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Строка, недописанная при падении процесса.
+                logger.warning("Skipping malformed grant log line: %r", line[:200])
+                continue
+            if "ack" in record:
+                acked.update(record["ack"])
+            else:
+                pending[record["token"]] = PendingGrant(**record)
+        # Подтверждение может быть записано раньше строки выдачи, поэтому
+        # подтверждённые токены исключаются после чтения всего файла.
+        return [grant for token, grant in pending.items() if token not in acked]
+
+
+class GrantQueue:
+    """
+    Очередь отложенной записи одиночных выдач (accept-then-apply).
+
+    Выдача проверяется по каталогу в памяти процесса, кладётся в
+    ограниченную asyncio-очередь (и, если задан журнал, в локальный
+    append-only журнал) и сразу подтверждается токеном. Фоновая задача
+    забирает выдачи пачками: пачка закрывается по размеру
+    GRANT_QUEUE_BATCH_SIZE или через GRANT_QUEUE_FLUSH_INTERVAL после первой
+    выдачи и записывается одним вызовом пакетной выдачи
+    (AchievementService.grant_achievements_batch). Состояния выдач по токенам
+    хранятся в памяти процесса, принявшего выдачу.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        put_timeout: float,
+        max_tracked: int,
+        log_path: Path | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_tracked = max_tracked
+        self.log_path = log_path
+
+        self._queue: asyncio.Queue[PendingGrant] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._log: GrantLog | None = None
+        self._closing = False
+        self._statuses: OrderedDict[str, QueuedGrant] = OrderedDict()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.applied = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        """Очередь запущена и принимает выдачи."""
+        return self._task is not None and not self._closing
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Запуск очереди: применение неподтверждённых выдач из журнала,
+        оставшихся от предыдущего запуска, и старт фоновой записи.
+
+        :param session_factory: Фабрика сессий для записи пачек.
+        :return: None.
+        """
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue(self.max_size)
+        self._closing = False
+
+        if self.log_path is not None:
+            self._log = GrantLog.open(self.log_path)
+            replay = self._log.pending
+            if replay:
+                logger.info("Replaying %s grants from %s", len(replay), self._log.path)
+            for batch in batched(replay, self.batch_size):
+                await self._apply(list(batch))
+
+        self._task = asyncio.create_task(self._run(), name="grant-queue-flusher")
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Остановка очереди: приём новых выдач прекращается, оставшиеся в
+        очереди выдачи записываются (не дольше timeout секунд), журнал
+        закрывается.
+
+        :param timeout: Сколько секунд ждать записи оставшихся выдач.
+        :return: None.
+        """
+        if self._task is None:
+            return
+
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except TimeoutError:
+            logger.error(
+                "Grant queue shutdown timed out with %s grants left%s",
+                self._queue.qsize(),
+                " (kept in the grant log)" if self._log is not None else "",
+            )
+
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    async def submit(self, session: AsyncSession, user_id: int, code: str) -> QueuedGrant | None:
+        """
+        Приём выдачи в очередь. Код достижения проверяется по каталогу в
+        памяти процесса; существование пользователя проверяется при записи.
+
+        :param session: Асинхронная сессия SQLAlchemy для перезагрузки каталога.
+        :param user_id: Идентификатор пользователя.
+        :param code: Код достижения.
+        :return: Принятая выдача или None, если достижение не найдено.
+        :raises GrantQueueClosedError: Если очередь не запущена или останавливается.
+        :raises GrantQueueFullError: Если очередь не освободилась за put_timeout.
+        """
+        if not self.running:
+            raise GrantQueueClosedError("Grant queue is not running")
+
+        catalog = await achievement_catalog.get(session)
+        achievement = catalog.by_code.get(code)
+        if achievement is None:
+            catalog = await achievement_catalog.refresh_on_miss(session)
+            achievement = catalog.by_code.get(code)
+        if achievement is None:
+            return None
+
+        grant = PendingGrant(
+            token=uuid.uuid4().hex, user_id=user_id, code=code, achievement_id=achievement.id
+        )
+        try:
+            self._queue.put_nowait(grant)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(grant), self.put_timeout)
+            except TimeoutError:
+                self.rejected += 1
+                raise GrantQueueFullError("Grant queue is full") from None
+
+        if self._log is not None:
+            self._log.append([grant])
+        self.accepted += 1
+        return self._track(grant, QueuedGrantStatus.PENDING)
+
+    def status(self, token: str) -> QueuedGrant | None:
+        """
+        Состояние выдачи по токену.
+
+        :param token: Токен выдачи.
+        :return: Выдача с текущим состоянием или None, если токен неизвестен.
+        """
+        return self._statuses.get(token)
+
+    def metrics(self) -> list[Metric]:
+        """
+        Снимок состояния очереди для /metrics.
+
+        :return: Список метрик очереди.
+        """
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return [
+            Metric("grant_queue_depth", "gauge", "Grants waiting to be written.", depth),
+            Metric("grant_queue_capacity", "gauge", "Grant queue capacity.", self.max_size),
+            Metric("grant_queue_accepted_total", "counter", "Accepted grants.", self.accepted),
+            Metric(
+                "grant_queue_rejected_total",
+                "counter",
+                "Grants rejected because the queue was full.",
+                self.rejected,
+            ),
+            Metric("grant_queue_applied_total", "counter", "Written grants.", self.applied),
+            Metric(
+                "grant_queue_failed_total",
+                "counter",
+                "Grants that could not be written.",
+                self.failed,
+            ),
+            Metric("grant_queue_batches_total", "counter", "Written batches.", self.batches),
+        ]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except TimeoutError:
+                    break
+
+            try:
+                await self._apply(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _apply(self, batch: list[PendingGrant]) -> None:
+        """
+        Запись пачки выдач одним вызовом пакетной выдачи с повтором при
+        ошибке БД. Выдача идемпотентна (ON CONFLICT DO NOTHING), поэтому
+        повтор пачки и повторное применение журнала безопасны.
+
+        :param batch: Пачка выдач.
+        :return: None.
+        """
+        items = [GrantBatchItem(user_id=grant.user_id, code=grant.code) for grant in batch]
+        for attempt in range(APPLY_ATTEMPTS):
+            try:
+                async with self._session_factory() as session:
+                    results = await AchievementService(session).grant_achievements_batch(items)
+                break
+            except Exception:
+                logger.exception(
+                    "Failed to write grant batch of %s (attempt %s)", len(batch), attempt + 1
+                )
+                await asyncio.sleep(0.1 * 2**attempt)
+        else:
+            # Выдачи остаются неподтверждёнными в журнале и будут применены
+            # при следующем старте.
+            self.failed += len(batch)
+            for grant in batch:
+                self._track(grant, QueuedGrantStatus.FAILED)
+            return
+
+        for grant, result in zip(batch, results, strict=True):
+            self._track(grant, QueuedGrantStatus(result.status.value))
+        if self._log is not None:
+            self._log.ack(grant.token for grant in batch)
+        self.applied += len(batch)
+        self.batches += 1
+
+    def _track(self, grant: PendingGrant, status: QueuedGrantStatus) -> QueuedGrant:
+        queued = QueuedGrant(
+            token=grant.token,
+            user_id=grant.user_id,
+            code=grant.code,
+            achievement_id=grant.achievement_id,
+            status=status,
+        )
+        self._statuses[grant.token] = queued
+        self._statuses.move_to_end(grant.token)
+        while len(self._statuses) > self.max_tracked:
+            self._statuses.popitem(last=False)
+        return queued
+
+
+grant_queue = GrantQueue(
+    max_size=settings.grant_queue_max_size,
+    batch_size=settings.grant_queue_batch_size,
+    flush_interval=settings.grant_queue_flush_interval,
+    put_timeout=settings.grant_queue_put_timeout,
+    max_tracked=settings.grant_queue_max_tracked,
+    log_path=Path(settings.grant_queue_log_path) if settings.grant_queue_log_path else None,
+)
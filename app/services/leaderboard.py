@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from time import monotonic
+
+from sqlalchemy import and_, func, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.models.enums import Language, TimeWindow
+from app.models.user import User
+from app.schemas.leaderboard import LeaderboardEntry, UserRank
+from app.services.daily_stats import window_points
+from app.services.pagination import decode_points_cursor, encode_points_cursor
+from app.services.points_deltas import pending_points, points_striping
+from app.services.window_cache import window_cache
+
+logger = logging.getLogger(__name__)
+
+
+class PointsFenwickTree:
+    """
+    Дерево Фенвика над суммами очков: для каждого значения total_points
+    хранит количество пользователей с такой суммой. Добавление, перенос
+    пользователя между значениями и подсчёт пользователей с большей суммой
+    выполняются за O(log P), где P - максимальная сумма очков. При росте
+    максимальной суммы ёмкость дерева удваивается.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._tree = [0] * (max(capacity, 1) + 1)
+        self._counts: Counter[int] = Counter()
+        self.total = 0
+
+    @classmethod
+    def from_counts(cls, counts: Iterable[tuple[int, int]]) -> PointsFenwickTree:
+        """
+        Построение дерева за O(P) по количеству пользователей на каждую сумму.
+
+        :param counts: Пары (сумма очков, количество пользователей).
+        :return: Заполненное дерево.
+        """
+        counter = Counter({points: count for points, count in counts if count})
+        capacity = 1024
+        while counter and capacity <= max(counter):
+            capacity *= 2
+
+        tree = cls(capacity)
+        tree._rebuild(counter)
+        return tree
+
+    def add(self, points: int, delta: int = 1) -> None:
+        """
+        Изменение количества пользователей с суммой points.
+
+        :param points: Сумма очков.
+        :param delta: Изменение количества (отрицательное для удаления).
+        :return: None.
+        """
+        if points < 0:
+            raise ValueError("points must be non-negative")
+        if points + 1 >= len(self._tree):
+            self._grow(points)
+
+        self._counts[points] += delta
+        self.total += delta
+        index = points + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def move(self, old_points: int, new_points: int) -> None:
+        """
+        Перенос одного пользователя с суммы old_points на new_points.
+
+        :param old_points: Прежняя сумма очков.
+        :param new_points: Новая сумма очков.
+        :return: None.
+        """
+        if old_points == new_points:
+            return
+        # Пользователь, которого ещё нет в индексе (создан другим воркером
+        # после загрузки), просто добавляется.
+        if self._counts[old_points] > 0:
+            self.add(old_points, -1)
+        self.add(new_points, 1)
+
+    def count_at_most(self, points: int) -> int:
+        """
+        Количество пользователей с суммой очков не больше points.
+
+        :param points: Сумма очков.
+        :return: Количество пользователей.
+        """
+        if points < 0:
+            return 0
+        index = min(points + 1, len(self._tree) - 1)
+        result = 0
+        while index > 0:
+            result += self._tree[index]
+            index -= index & -index
+        return result
+
+    def count_above(self, points: int) -> int:
+        """
+        Количество пользователей с суммой очков строго больше points.
+
+        :param points: Сумма очков.
+        :return: Количество пользователей.
+        """
+        return self.total - self.count_at_most(points)
+
+    def rank(self, points: int) -> int:
+        """
+        Место пользователя с суммой points; пользователи с равной суммой
+        делят одно место (1, 2, 2, 4).
+
+        :param points: Сумма очков.
+        :return: Место, начиная с 1.
+        """
+        return self.count_above(points) + 1
+
+    def _grow(self, points: int) -> None:
+        capacity = len(self._tree) - 1
+        while capacity <= points:
+            capacity *= 2
+        self._tree = [0] * (capacity + 1)
+        self._rebuild(self._counts)
+
+    def _rebuild(self, counts: Counter[int]) -> None:
+        tree = self._tree
+        for index in range(1, len(tree)):
+            tree[index] = 0
+        for points, count in counts.items():
+            tree[points + 1] += count
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._counts = Counter(counts)
+        self.total = sum(counts.values())
+
+
+class LeaderboardIndex:
+    """
+    Держатель индексов рангов в памяти процесса: общего и по одному на каждый
+    язык пользователей. Индексы строятся по users.total_points при первом
+    обращении, обновляются инкрементально при создании пользователей и
+    выдаче достижений в этом процессе и перезагружаются из БД раз в
+    LEADERBOARD_REFRESH_INTERVAL секунд, чтобы учесть изменения из других
+    воркеров и скриптов.
+    """
+
+    def __init__(self) -> None:
+        self._trees: dict[Language | None, PointsFenwickTree] | None = None
+        self._lock = asyncio.Lock()
+        self._loaded_at = 0.0
+
+    async def get(
+        self,
+        session: AsyncSession,
+        language: Language | None = None,
+    ) -> PointsFenwickTree:
+        """
+        Получение индекса рангов с перезагрузкой, если он устарел.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :param language: Язык пользователей или None для общего индекса.
+        :return: Текущий индекс рангов.
+        """
+        if self._stale():
+            async with self._lock:
+                # Пока запрос ждал блокировку, индекс мог перезагрузить другой запрос.
+                if self._stale():
+                    await self._load(session)
+        return self._tree(language)
+
+    async def reload(self, session: AsyncSession) -> PointsFenwickTree:
+        """
+        Построение индексов по текущим суммам очков пользователей и атомарная
+        подмена. Запрос читает только таблицу users с группировкой по
+        (language, total_points).
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Новый общий индекс рангов.
+        """
+        async with self._lock:
+            await self._load(session)
+            return self._tree(None)
+
+    def _stale(self) -> bool:
+        interval = settings.leaderboard_refresh_interval
+        return self._trees is None or (interval > 0 and monotonic() - self._loaded_at > interval)
+
+    def _tree(self, language: Language | None) -> PointsFenwickTree:
+        # Язык, пользователей которого ещё нет, получает пустой индекс.
+        return self._trees.setdefault(language, PointsFenwickTree())
+
+    async def _load(self, session: AsyncSession) -> None:
+        stmt = select(User.language, User.total_points, func.count()).group_by(
+            User.language, User.total_points
+        )
+        rows = (await session.execute(stmt)).all()
+
+        overall: Counter[int] = Counter()
+        by_language: dict[Language, Counter[int]] = defaultdict(Counter)
+        for language, points, count in rows:
+            overall[points] += count
+            by_language[language][points] += count
+
+        trees: dict[Language | None, PointsFenwickTree] = {
+            None: PointsFenwickTree.from_counts(overall.items())
+        }
+        for language, counts in by_language.items():
+            trees[language] = PointsFenwickTree.from_counts(counts.items())
+
+        self._trees = trees
+        self._loaded_at = monotonic()
+        logger.info("Loaded leaderboard index: %s users", trees[None].total)
+
+    def record_user(self, language: Language, points: int = 0) -> None:
+        """
+        Учёт нового пользователя. До первой загрузки индекса ничего не делает.
+
+        :param language: Язык пользователя.
+        :param points: Начальная сумма очков.
+        :return: None.
+        """
+        if self._trees is not None:
+            self._tree(None).add(points)
+            self._tree(language).add(points)
+
+    def record_points(self, language: Language, old_points: int, new_points: int) -> None:
+        """
+        Учёт изменения суммы очков пользователя после выдачи достижения.
+
+        :param language: Язык пользователя.
+        :param old_points: Сумма очков до выдачи.
+        :param new_points: Сумма очков после выдачи.
+        :return: None.
+        """
+        if self._trees is not None:
+            self._tree(None).move(old_points, new_points)
+            self._tree(language).move(old_points, new_points)
+
+
+class LeaderboardService:
+    def __init__(
+        self,
+        session: AsyncSession,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
+        self.session = session
+        self.session_factory = session_factory
+
+    async def top(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        language: Language | None = None,
+        window: TimeWindow | None = None,
+    ) -> tuple[list[LeaderboardEntry], str | None]:
+        """
+        Страница лидерборда за всё время или за скользящее окно, общего или
+        по одному языку пользователей. Страницы за окно кэшируются и
+        вычисляются в отдельной сессии из фабрики сессий; без фабрики
+        страница вычисляется в сессии сервиса без кэша.
+
+        :param limit: Размер страницы.
+        :param cursor: Курсор из предыдущей страницы или None для первой.
+        :param language: Язык пользователей или None для всех языков.
+        :param window: Скользящее окно или None для всего времени.
+        :return: Кортеж из записей страницы и курсора следующей страницы
+            (None, если страница последняя).
+        :raises InvalidCursorError: Если курсор не удаётся разобрать.
+        """
+        if window is None:
+            return await self._top_all_time(limit, cursor, language)
+
+        after = decode_points_cursor(cursor) if cursor is not None else None
+        if self.session_factory is None:
+            return await self._top_window(window, limit, after, language)
+        return await window_cache.get_or_compute(
+            ("leaderboard", window, language, limit, after),
+            self.session_factory,
+            lambda session: LeaderboardService(session)._top_window(window, limit, after, language),
+        )
+
+    async def _top_all_time(
+        self,
+        limit: int,
+        cursor: str | None,
+        language: Language | None,
+    ) -> tuple[list[LeaderboardEntry], str | None]:
+        """
+        Страница лидерборда за всё время в порядке (total_points DESC, id).
+        Следующая страница читается по курсору из двух диапазонов индекса
+        ix_users_total_points_id: оставшиеся пользователи с той же суммой
+        и пользователи с меньшей суммой. Для языкового лидерборда тот же
+        проход по индексу фильтруется по языку. Места считаются по индексу
+        рангов.
+
+        :param limit: Размер страницы.
+        :param cursor: Курсор из предыдущей страницы или None для первой.
+        :param language: Язык пользователей или None для всех языков.
+        :return: Кортеж из записей страницы и курсора следующей страницы.
+        :raises InvalidCursorError: Если курсор не удаётся разобрать.
+        """
+        columns = (User.id, User.username, User.language, User.total_points)
+        order = (User.total_points.desc(), User.id)
+        base = select(*columns)
+        if language is not None:
+            base = base.where(User.language == language)
+
+        if cursor is None:
+            stmt = base.order_by(*order).limit(limit + 1)
+        else:
+            points, user_id = decode_points_cursor(cursor)
+            same = (
+                base.where(User.total_points == points, User.id > user_id)
+                .order_by(User.id)
+                .limit(limit + 1)
+            )
+            lower = base.where(User.total_points < points).order_by(*order).limit(limit + 1)
+            page = union_all(same, lower).subquery("page")
+            stmt = select(page).order_by(page.c.total_points.desc(), page.c.id).limit(limit + 1)
+
+        rows = (await self.session.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_points_cursor(rows[-1].total_points, rows[-1].id)
+
+        tree = await leaderboard.get(self.session, language)
+        entries = [
+            LeaderboardEntry(
+                rank=tree.rank(row.total_points),
+                user_id=row.id,
+                username=row.username,
+                language=row.language,
+                total_points=row.total_points,
+            )
+            for row in rows
+        ]
+        return entries, next_cursor
+
+    async def _top_window(
+        self,
+        window: TimeWindow,
+        limit: int,
+        after: tuple[int, int] | None,
+        language: Language | None,
+    ) -> tuple[list[LeaderboardEntry], str | None]:
+        """
+        Страница лидерборда за скользящее окно в порядке (очки за окно DESC,
+        id). Очки за окно - скользящие суммы по user_daily_stats, места
+        считаются оконной функцией rank() по всем пользователям окна до
+        применения курсора.
+
+        :param window: Скользящее окно.
+        :param limit: Размер страницы.
+        :param after: Очки и идентификатор последнего пользователя предыдущей
+            страницы или None для первой.
+        :param language: Язык пользователей или None для всех языков.
+        :return: Кортеж из записей страницы и курсора следующей страницы.
+        """
+        points = window_points(window, language)
+        ranked = select(
+            points,
+            func.rank().over(order_by=points.c.points.desc()).label("rank"),
+        ).subquery("ranked")
+
+        stmt = select(ranked).order_by(ranked.c.points.desc(), ranked.c.id).limit(limit + 1)
+        if after is not None:
+            after_points, after_id = after
+            stmt = stmt.where(
+                or_(
+                    ranked.c.points < after_points,
+                    and_(ranked.c.points == after_points, ranked.c.id > after_id),
+                )
+            )
+
+        rows = (await self.session.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_points_cursor(rows[-1].points, rows[-1].id)
+
+        entries = [
+            LeaderboardEntry(
+                rank=row.rank,
+                user_id=row.id,
+                username=row.username,
+                language=row.language,
+                total_points=row.total_points,
+                window_points=row.points,
+            )
+            for row in rows
+        ]
+        return entries, next_cursor
+
+    async def user_rank(self, user_id: int) -> UserRank | None:
+        """
+        Место пользователя в глобальном лидерборде за O(log P) по индексу
+        рангов вместо подсчёта пользователей с большей суммой очков. В режиме
+        полосатых счётчиков сумма очков пользователя включает неперенесённые
+        полосы, а остальные пользователи в индексе учитываются по
+        перенесённым суммам.
+
+        :param user_id: Идентификатор пользователя.
+        :return: Место пользователя или None, если пользователь не найден.
+        """
+        total_points = User.total_points
+        if points_striping():
+            total_points = total_points + pending_points(User.id)
+        stmt = select(User.id, User.username, total_points.label("total_points")).where(
+            User.id == user_id
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+
+        tree = await leaderboard.get(self.session)
+        rank = tree.rank(row.total_points)
+        return UserRank(
+            user_id=row.id,
+            username=row.username,
+            total_points=row.total_points,
+            rank=rank,
+            # Пользователь мог быть создан другим воркером после загрузки индекса.
+            total_users=max(tree.total, rank),
+        )
+
+
+leaderboard = LeaderboardIndex()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections.abc import Iterable, Sequence
+from time import monotonic
+
+from sqlalchemy import ColumnElement, Text, case, cast, func, select
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.models.user_points_delta import UserPointsDelta
+from app.schemas.achievements import (
+    AchievementExpr,
+    AchievementOwnership,
+    AchievementQuery,
+    AchievementQueryResult,
+)
+from app.services.catalog import achievement_catalog
+
+logger = logging.getLogger(__name__)
+
+VARBIT = BIT(varying=True)
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+class UnknownAchievementCodeError(ValueError):
+    """Код достижения не найден в каталоге."""
+
+    def __init__(self, codes: Iterable[str]) -> None:
+        self.codes = sorted(set(codes))
+        super().__init__(f"Unknown achievement codes: {', '.join(self.codes)}")
+
+
+def achievement_mask(achievement_ids: Iterable[int]) -> str:
+    """
+    Построение битовой маски достижений в текстовом виде для bit varying:
+    символ с номером Achievement.id равен '1'. Длина маски - наибольший
+    идентификатор плюс один, как у users.achievement_bits.
+
+    :param achievement_ids: Идентификаторы достижений.
+    :return: Строка из '0' и '1' (пустая для пустого набора).
+    """
+    ids = set(achievement_ids)
+    if not ids:
+        return ""
+    mask = bytearray(b"0" * (max(ids) + 1))
+    for achievement_id in ids:
+        mask[achievement_id] = ord("1")
+    return mask.decode()
+
+
+def achievement_bits_or(bits: ColumnElement, mask: ColumnElement) -> ColumnElement:
+    """
+    Построение побитового ИЛИ двух bit varying разной длины. Оператор `|`
+    в Postgres требует строк одной длины, поэтому более короткая строка
+    дополняется нулями справа.
+
+    :param bits: Текущая битовая строка.
+    :param mask: Маска добавляемых битов.
+    :return: Выражение с объединённой битовой строкой.
+    """
+
+    def padded(value: ColumnElement, length: ColumnElement) -> ColumnElement:
+        return value.op("||")(cast(func.repeat("0", length), VARBIT))
+
+    bits_length, mask_length = func.length(bits), func.length(mask)
+    return case(
+        (bits_length >= mask_length, bits.op("|")(padded(mask, bits_length - mask_length))),
+        else_=padded(bits, mask_length - bits_length).op("|")(mask),
+    )
+
+
+class Bitmap:
+    """
+    Плотное множество неотрицательных целых (идентификаторов
+    пользователей) в bytearray: добавление и проверка принадлежности - O(1).
+    Для операций над множествами используется представление в виде int,
+    которое вычисляется один раз и сбрасывается при изменении.
+    """
+
+    __slots__ = ("_bytes", "_int")
+
+    def __init__(self) -> None:
+        self._bytes = bytearray()
+        self._int: int | None = 0
+
+    def add(self, value: int) -> None:
+        """
+        Добавление элемента.
+
+        :param value: Неотрицательное целое.
+        :return: None.
+        """
+        index = value >> 3
+        if index >= len(self._bytes):
+            self._bytes.extend(bytes(max(index + 1 - len(self._bytes), len(self._bytes) // 4)))
+        self._bytes[index] |= 1 << (value & 7)
+        self._int = None
+
+    def update(self, values: Iterable[int]) -> None:
+        """
+        Добавление нескольких элементов.
+
+        :param values: Неотрицательные целые.
+        :return: None.
+        """
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: int) -> bool:
+        index = value >> 3
+        return index < len(self._bytes) and bool(self._bytes[index] & (1 << (value & 7)))
+
+    def as_int(self) -> int:
+        """
+        Множество в виде целого числа: бит с номером i установлен, если
+        i принадлежит множеству.
+
+        :return: Целое число.
+        """
+        if self._int is None:
+            self._int = int.from_bytes(self._bytes, "little")
+        return self._int
+
+
+def iter_bits(value: int, start: int = 0) -> Iterable[int]:
+    """
+    Перебор номеров установленных битов целого числа по возрастанию.
+    Нулевые байты пропускаются поиском по регулярному выражению.
+
+    :param value: Неотрицательное целое.
+    :param start: Номер бита, с которого начинается перебор.
+    :return: Итератор номеров установленных битов не меньше start.
+    """
+    data = value.to_bytes((value.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data, start >> 3):
+        index = match.start()
+        byte = data[index]
+        for bit in range(8):
+            position = index * 8 + bit
+            if byte & (1 << bit) and position >= start:
+                yield position
+
+
+class OwnershipIndex:
+    """
+    Индекс выдач в памяти процесса: по одному битовому множеству
+    пользователей на каждое достижение и множество всех пользователей для
+    отрицаний и процентов. Индекс строится при первом обращении,
+    обновляется инкрементально при создании пользователей и выдачах в этом
+    процессе и перезагружается из БД раз в OWNERSHIP_REFRESH_INTERVAL секунд,
+    чтобы учесть изменения из других воркеров и скриптов.
+    """
+
+    def __init__(self) -> None:
+        self._users: Bitmap | None = None
+        self._users_total = 0
+        self._bitmaps: dict[int, Bitmap] = {}
+        self._lock = asyncio.Lock()
+        self._loaded_at = 0.0
+
+    async def get(self, session: AsyncSession) -> OwnershipIndex:
+        """
+        Получение индекса с перезагрузкой, если он устарел.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Текущий индекс.
+        """
+        if self._stale():
+            async with self._lock:
+                # Пока запрос ждал блокировку, индекс мог перезагрузить другой запрос.
+                if self._stale():
+                    await self._load(session)
+        return self
+
+    async def reload(self, session: AsyncSession) -> None:
+        """
+        Построение индекса по таблицам users и user_achievements и атомарная
+        подмена.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: None.
+        """
+        async with self._lock:
+            await self._load(session)
+
+    def _stale(self) -> bool:
+        interval = settings.ownership_refresh_interval
+        return self._users is None or (interval > 0 and monotonic() - self._loaded_at > interval)
+
+    async def _load(self, session: AsyncSession) -> None:
+        users = Bitmap()
+        users_total = 0
+        for user_id in await session.scalars(select(User.id)):
+            users.add(user_id)
+            users_total += 1
+
+        bitmaps: dict[int, Bitmap] = {}
+        stmt = select(
+            UserAchievement.achievement_id, func.array_agg(UserAchievement.user_id)
+        ).group_by(UserAchievement.achievement_id)
+        for achievement_id, user_ids in await session.execute(stmt):
+            bitmap = bitmaps[achievement_id] = Bitmap()
+            bitmap.update(user_ids)
+
+        self._users, self._users_total, self._bitmaps = users, users_total, bitmaps
+        self._loaded_at = monotonic()
+        logger.info("Loaded ownership index: %s users, %s achievements", users_total, len(bitmaps))
+
+    def record_user(self, user_id: int) -> None:
+        """
+        Учёт нового пользователя. До первой загрузки индекса ничего не делает.
+
+        :param user_id: Идентификатор пользователя.
+        :return: None.
+        """
+        if self._users is not None and user_id not in self._users:
+            self._users.add(user_id)
+            self._users_total += 1
+
+    def record_grants(self, grants: Iterable[tuple[int, int]]) -> None:
+        """
+        Учёт выданных достижений. До первой загрузки индекса ничего не делает.
+
+        :param grants: Пары (user_id, achievement_id).
+        :return: None.
+        """
+        if self._users is None:
+            return
+        for user_id, achievement_id in grants:
+            self._bitmaps.setdefault(achievement_id, Bitmap()).add(user_id)
+
+    @property
+    def users_total(self) -> int:
+        return self._users_total
+
+    def evaluate(self, expr: AchievementExpr, ids: dict[str, int]) -> int:
+        """
+        Вычисление булева выражения над множествами владельцев достижений.
+
+        :param expr: Выражение.
+        :param ids: Идентификаторы достижений по кодам.
+        :return: Множество пользователей в виде целого числа.
+        """
+        if expr.has is not None:
+            bitmap = self._bitmaps.get(ids[expr.has])
+            return bitmap.as_int() if bitmap is not None else 0
+        if expr.not_ is not None:
+            return self._users.as_int() & ~self.evaluate(expr.not_, ids)
+        operands = [self.evaluate(operand, ids) for operand in expr.all or expr.any]
+        result = operands[0]
+        for operand in operands[1:]:
+            result = result & operand if expr.all else result | operand
+        return result
+
+
+ownership_index = OwnershipIndex()
+
+
+class OwnershipService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def has_achievements(
+        self,
+        user_id: int,
+        codes: Sequence[str],
+    ) -> AchievementOwnership | None:
+        """
+        Проверка наличия у пользователя достижений по битовой строке
+        users.achievement_bits: один поиск строки пользователя по первичному
+        ключу без обращения к user_achievements. В режиме полосатых счётчиков
+        учитываются и биты неперенесённых полос user_points_deltas.
+
+        :param user_id: Идентификатор пользователя.
+        :param codes: Коды достижений.
+        :return: Наличие каждого достижения или None, если пользователь не найден.
+        :raises UnknownAchievementCodeError: Если какой-то код не найден в каталоге.
+        """
+        ids = await self._resolve_codes(codes)
+        columns = [cast(User.achievement_bits, Text)]
+        if settings.user_points_stripes > 0:
+            columns.append(
+                func.array(
+                    select(cast(UserPointsDelta.achievement_bits, Text))
+                    .where(UserPointsDelta.user_id == User.id)
+                    .scalar_subquery()
+                )
+            )
+        row = (await self.session.execute(select(*columns).where(User.id == user_id))).first()
+        if row is None:
+            return None
+        strings = [row[0], *(row[1] if len(row) > 1 else ())]
+        return AchievementOwnership(
+            user_id=user_id,
+            achievements={
+                code: any(bits[ids[code] : ids[code] + 1] == "1" for bits in strings)
+                for code in codes
+            },
+        )
+
+    async def query(self, query: AchievementQuery) -> AchievementQueryResult:
+        """
+        Поиск пользователей по булеву выражению над выданными достижениями
+        (all/any/not) по индексу в памяти процесса. Возвращает количество
+        подходящих пользователей, их долю среди всех пользователей и страницу
+        идентификаторов по возрастанию.
+
+        :param query: Выражение и параметры страницы.
+        :return: Результат запроса.
+        :raises UnknownAchievementCodeError: Если какой-то код не найден в каталоге.
+        """
+        ids = await self._resolve_codes(query.expr.codes())
+        index = await ownership_index.get(self.session)
+        matched = index.evaluate(query.expr, ids)
+
+        count = matched.bit_count()
+        user_ids: list[int] = []
+        for user_id in iter_bits(matched, query.after + 1 if query.after is not None else 0):
+            if len(user_ids) == query.limit:
+                break
+            user_ids.append(user_id)
+        has_more = len(user_ids) == query.limit and matched >> (user_ids[-1] + 1) != 0
+
+        total = index.users_total
+        return AchievementQueryResult(
+            count=count,
+            total_users=total,
+            percentage=round(count * 100 / total, 4) if total else 0.0,
+            user_ids=user_ids,
+            next_after=user_ids[-1] if has_more else None,
+        )
+
+    async def _resolve_codes(self, codes: Iterable[str]) -> dict[str, int]:
+        codes = set(codes)
+        catalog = await achievement_catalog.get(self.session)
+        if any(code not in catalog.by_code for code in codes):
+            catalog = await achievement_catalog.refresh_on_miss(self.session)
+        unknown = [code for code in codes if code not in catalog.by_code]
+        if unknown:
+            raise UnknownAchievementCodeError(unknown)
+        return {code: catalog.by_code[code].id for code in codes}
@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагинации повреждён или сформирован не этим сервисом."""
+
+
+def encode_cursor(issued_at: datetime, row_id: int) -> str:
+    """
+    Кодирование позиции последней отданной записи в непрозрачный курсор.
+
+    :param issued_at: Время выдачи последней записи страницы.
+    :param row_id: Идентификатор последней записи страницы.
+    :return: Курсор в формате base64url без выравнивания.
+    """
+    return _encode([issued_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Разбор курсора, полученного из encode_cursor().
+
+    :param cursor: Курсор из запроса клиента.
+    :return: Кортеж из времени выдачи и идентификатора записи.
+    :raises InvalidCursorError: Если курсор не удаётся разобрать.
+    """
+    try:
+        issued_at, row_id = _decode(cursor)
+        return datetime.fromisoformat(issued_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
+def encode_points_cursor(total_points: int, user_id: int) -> str:
+    """
+    Кодирование позиции последнего пользователя страницы лидерборда.
+
+    :param total_points: Сумма очков последнего пользователя страницы.
+    :param user_id: Идентификатор последнего пользователя страницы.
+    :return: Курсор в формате base64url без выравнивания.
+    """
+    return _encode([total_points, user_id])
+
+
+def decode_points_cursor(cursor: str) -> tuple[int, int]:
+    """
+    Разбор курсора, полученного из encode_points_cursor().
+
+    :param cursor: Курсор из запроса клиента.
+    :return: Кортеж из суммы очков и идентификатора пользователя.
+    :raises InvalidCursorError: Если курсор не удаётся разобрать.
+    """
+    try:
+        total_points, user_id = _decode(cursor)
+        return int(total_points), int(user_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
+def _encode(values: list[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode(cursor: str) -> list[Any]:
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
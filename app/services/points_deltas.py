@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Insert,
+    Integer,
+    Select,
+    SmallInteger,
+    Subquery,
+    cast,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.user_points_delta import UserPointsDelta
+from app.services.ownership import achievement_bits_or
+
+
+def points_striping() -> bool:
+    """
+    Включён ли режим полосатых счётчиков очков пользователей.
+
+    :return: True, если USER_POINTS_STRIPES больше нуля.
+    """
+    return settings.user_points_stripes > 0
+
+
+def delta_stripe() -> ColumnElement[int]:
+    """
+    Номер полосы для изменений текущей транзакции: остаток от деления
+    идентификатора серверного процесса соединения. Одновременные транзакции
+    идут через разные соединения, поэтому выдачи одному пользователю из
+    разных запросов попадают в разные полосы.
+
+    :return: Выражение с номером полосы от 0 до USER_POINTS_STRIPES - 1.
+    """
+    return cast(func.pg_backend_pid() % settings.user_points_stripes, SmallInteger)
+
+
+def points_delta_upsert(source: Select) -> Insert:
+    """
+    Построение атомарного добавления изменений в полосы user_points_deltas.
+    Для отсутствующих полос строки создаются, для существующих очки и счётчик
+    прибавляются, а биты достижений объединяются.
+
+    :param source: Выборка из шести столбцов: user_id, stripe, day, points,
+        achievements_count, achievement_bits.
+    :return: Оператор INSERT ... ON CONFLICT DO UPDATE.
+    """
+    stmt = pg_insert(UserPointsDelta).from_select(
+        ["user_id", "stripe", "day", "points", "achievements_count", "achievement_bits"], source
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[UserPointsDelta.user_id, UserPointsDelta.day, UserPointsDelta.stripe],
+        set_={
+            "points": UserPointsDelta.points + stmt.excluded.points,
+            "achievements_count": (
+                UserPointsDelta.achievements_count + stmt.excluded.achievements_count
+            ),
+            "achievement_bits": achievement_bits_or(
+                UserPointsDelta.achievement_bits, stmt.excluded.achievement_bits
+            ),
+        },
+    )
+
+
+def pending_totals() -> Subquery:
+    """
+    Построение сумм ещё не перенесённых полос по пользователям.
+
+    :return: Подзапрос со столбцами user_id, points и count.
+    """
+    return (
+        select(
+            UserPointsDelta.user_id,
+            cast(func.sum(UserPointsDelta.points), BigInteger).label("points"),
+            cast(func.sum(UserPointsDelta.achievements_count), Integer).label("count"),
+        )
+        .group_by(UserPointsDelta.user_id)
+        .subquery("pending")
+    )
+
+
+def pending_points(user_id: ColumnElement[int]) -> ColumnElement[int]:
+    """
+    Построение суммы ещё не перенесённых очков одного пользователя.
+
+    :param user_id: Выражение с идентификатором пользователя.
+    :return: Скалярный подзапрос (0, если полос нет).
+    """
+    return (
+        select(cast(func.coalesce(func.sum(UserPointsDelta.points), 0), BigInteger))
+        .where(UserPointsDelta.user_id == user_id)
+        .scalar_subquery()
+    )
+
+
+def effective_users() -> Subquery:
+    """
+    Построение счётчиков пользователей с учётом ещё не перенесённых полос.
+
+    :return: Подзапрос со столбцами id, username, language, total_points и
+        achievements_count.
+    """
+    pending = pending_totals()
+    return (
+        select(
+            User.id,
+            User.username,
+            User.language,
+            (User.total_points + func.coalesce(pending.c.points, 0)).label("total_points"),
+            (User.achievements_count + func.coalesce(pending.c.count, 0)).label(
+                "achievements_count"
+            ),
+        )
+        .outerjoin(pending, pending.c.user_id == User.id)
+        .subquery("users")
+    )
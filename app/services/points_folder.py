@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Integer,
+    String,
+    Text,
+    any_,
+    bindparam,
+    cast,
+    delete,
+    func,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.user_points_delta import UserPointsDelta
+from app.services.daily_stats import daily_points_upsert
+from app.services.leaderboard import leaderboard
+from app.services.ownership import VARBIT, achievement_bits_or, achievement_mask
+
+logger = logging.getLogger(__name__)
+
+
+def _bit_positions(bits: str) -> list[int]:
+    return [position for position, bit in enumerate(bits) if bit == "1"]
+
+
+class PointsFolder:
+    """
+    Фоновый перенос полос user_points_deltas в users.total_points,
+    users.achievements_count, users.achievement_bits и user_daily_stats.
+    Полосы забираются пачками через DELETE ... RETURNING с SKIP LOCKED:
+    полосы, которые сейчас увеличивает выдача, переносятся в следующий раз,
+    а выдача после переноса создаёт полосу заново. Несколько воркеров
+    переносят разные полосы и не мешают друг другу.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[None] | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Запуск периодического переноса полос.
+
+        :param session_factory: Фабрика сессий для переноса.
+        :return: None.
+        """
+        self._session_factory = session_factory
+        self._task = asyncio.create_task(self._run(), name="points-folder")
+
+    async def stop(self) -> None:
+        """
+        Остановка периодического переноса и перенос оставшихся полос.
+
+        :return: None.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+        async with self._session_factory() as session:
+            await self.fold(session)
+
+    async def fold(self, session: AsyncSession) -> int:
+        """
+        Перенос всех полос, не занятых выдачами, пачками по
+        USER_POINTS_FOLD_BATCH_SIZE, каждая пачка - отдельной транзакцией.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Количество перенесённых полос.
+        """
+        total = 0
+        while True:
+            folded = await self._fold_batch(session, settings.user_points_fold_batch_size)
+            total += folded
+            if folded < settings.user_points_fold_batch_size:
+                return total
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.user_points_fold_interval)
+            try:
+                async with self._session_factory() as session:
+                    await self.fold(session)
+            except Exception:
+                logger.exception("Failed to fold user points deltas")
+
+    async def _fold_batch(self, session: AsyncSession, batch_size: int) -> int:
+        key = (UserPointsDelta.user_id, UserPointsDelta.day, UserPointsDelta.stripe)
+        batch = select(*key).limit(batch_size).with_for_update(skip_locked=True)
+        moved = (
+            await session.execute(
+                delete(UserPointsDelta)
+                .where(tuple_(*key).in_(batch))
+                .returning(
+                    UserPointsDelta.user_id,
+                    UserPointsDelta.day,
+                    UserPointsDelta.points,
+                    UserPointsDelta.achievements_count,
+                    cast(UserPointsDelta.achievement_bits, Text),
+                )
+            )
+        ).all()
+        if not moved:
+            await session.commit()
+            return 0
+
+        user_points: dict[int, int] = defaultdict(int)
+        user_counts: dict[int, int] = defaultdict(int)
+        user_bits: dict[int, set[int]] = defaultdict(set)
+        daily_points: dict[tuple[int, date], int] = defaultdict(int)
+        for user_id, day, points, count, bits in moved:
+            user_points[user_id] += points
+            user_counts[user_id] += count
+            user_bits[user_id].update(_bit_positions(bits))
+            daily_points[(user_id, day)] += points
+
+        user_ids = sorted(user_points)
+        # Строки пользователей блокируются в порядке id, чтобы переносы в
+        # разных воркерах не взаимоблокировались.
+        await session.execute(
+            select(User.id)
+            .where(User.id == any_(bindparam("fold_user_ids", user_ids, type_=ARRAY(Integer))))
+            .order_by(User.id)
+            .with_for_update()
+        )
+        deltas = (
+            func.unnest(
+                bindparam("delta_user_ids", user_ids, type_=ARRAY(Integer)),
+                bindparam(
+                    "delta_points", [user_points[i] for i in user_ids], type_=ARRAY(BigInteger)
+                ),
+                bindparam("delta_counts", [user_counts[i] for i in user_ids], type_=ARRAY(Integer)),
+                bindparam(
+                    "delta_masks",
+                    [achievement_mask(user_bits[i]) for i in user_ids],
+                    type_=ARRAY(String),
+                ),
+            )
+            .table_valued("user_id", "points", "count", "mask")
+            .render_derived(name="deltas")
+        )
+        totals = await session.execute(
+            update(User)
+            .where(User.id == deltas.c.user_id)
+            .values(
+                total_points=User.total_points + deltas.c.points,
+                achievements_count=User.achievements_count + deltas.c.count,
+                achievement_bits=achievement_bits_or(
+                    User.achievement_bits, cast(deltas.c.mask, VARBIT)
+                ),
+            )
+            .returning(User.id, User.total_points, User.language)
+        )
+        new_totals = {row.id: (row.total_points, row.language) for row in totals}
+
+        days = sorted(daily_points.items())
+        day_deltas = (
+            func.unnest(
+                bindparam("day_user_ids", [key[0] for key, _ in days], type_=ARRAY(Integer)),
+                bindparam("day_days", [key[1] for key, _ in days], type_=ARRAY(Date)),
+                bindparam("day_points", [points for _, points in days], type_=ARRAY(Integer)),
+            )
+            .table_valued("user_id", "day", "points")
+            .render_derived(name="day_deltas")
+        )
+        await session.execute(daily_points_upsert(select(day_deltas)))
+        await session.commit()
+
+        for user_id, (total_points, language) in new_totals.items():
+            leaderboard.record_points(language, total_points - user_points[user_id], total_points)
+
+        logger.info("Folded %s user points deltas for %s users", len(moved), len(new_totals))
+        return len(moved)
+
+
+points_folder = PointsFolder()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from time import monotonic
+from types import MappingProxyType
+
+from sqlalchemy import Insert, Select, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.achievement_unlock_stripe import AchievementUnlockStripe
+from app.models.user_count_stripe import UserCountStripe
+
+logger = logging.getLogger(__name__)
+
+
+def counter_stripe(user_id: int) -> int:
+    """
+    Номер полосы счётчика для изменения, вызванного пользователем.
+
+    :param user_id: Идентификатор пользователя.
+    :return: Номер полосы от 0 до COUNTER_STRIPES - 1.
+    """
+    return user_id % settings.counter_stripes
+
+
+def unlock_counts_upsert(source: Select) -> Insert:
+    """
+    Построение атомарного увеличения полос счётчиков выдач достижений.
+    Для отсутствующих полос строки создаются, для существующих значение
+    прибавляется к накопленному (ON CONFLICT по первичному ключу).
+
+    :param source: Выборка из трёх столбцов: achievement_id, stripe, count.
+    :return: Оператор INSERT ... ON CONFLICT DO UPDATE.
+    """
+    stmt = pg_insert(AchievementUnlockStripe).from_select(
+        ["achievement_id", "stripe", "count"], source
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[AchievementUnlockStripe.achievement_id, AchievementUnlockStripe.stripe],
+        set_={"count": AchievementUnlockStripe.count + stmt.excluded.count},
+    )
+
+
+def user_count_upsert(source: Select) -> Insert:
+    """
+    Построение атомарного увеличения полос счётчика пользователей.
+
+    :param source: Выборка из двух столбцов: stripe, count.
+    :return: Оператор INSERT ... ON CONFLICT DO UPDATE.
+    """
+    stmt = pg_insert(UserCountStripe).from_select(["stripe", "count"], source)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserCountStripe.stripe],
+        set_={"count": UserCountStripe.count + stmt.excluded.count},
+    )
+
+
+def unlock_percentage(unlock_count: int, total_users: int) -> float:
+    """
+    Доля пользователей, получивших достижение.
+
+    :param unlock_count: Количество выдач достижения.
+    :param total_users: Количество пользователей.
+    :return: Процент с точностью до сотых (0 при отсутствии пользователей).
+    """
+    return round(unlock_count * 100 / total_users, 2) if total_users else 0.0
+
+
+@dataclass(frozen=True)
+class RaritySnapshot:
+    """
+    Неизменяемый снимок счётчиков редкости достижений.
+
+    Поля:
+        version: Номер версии снимка в рамках процесса; меняется только при
+            изменении значений.
+        total_users: Количество пользователей.
+        unlocks: Количество выдач по идентификатору достижения.
+    """
+
+    version: int
+    total_users: int
+    unlocks: Mapping[int, int] = field(repr=False)
+
+    def unlock_count(self, achievement_id: int) -> int:
+        return self.unlocks.get(achievement_id, 0)
+
+    def unlock_percentage(self, achievement_id: int) -> float:
+        return unlock_percentage(self.unlock_count(achievement_id), self.total_users)
+
+
+class RarityStore:
+    """
+    Держатель снимка счётчиков редкости для списка достижений. Снимок
+    читается из полос счётчиков (несколько строк на достижение, без обхода
+    user_achievements) и перечитывается не чаще раза в
+    RARITY_REFRESH_INTERVAL секунд. Версия снимка меняется только при
+    изменении значений, поэтому сериализованный список достижений
+    пересобирается лишь тогда, когда счётчики действительно изменились.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: RaritySnapshot | None = None
+        self._lock = asyncio.Lock()
+        self._loaded_at = 0.0
+
+    async def get(self, session: AsyncSession) -> RaritySnapshot:
+        """
+        Получение снимка с перечитыванием, если он устарел.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        :return: Текущий снимок счётчиков.
+        """
+        if self._stale():
+            async with self._lock:
+                # Пока запрос ждал блокировку, снимок мог перечитать другой запрос.
+                if self._stale():
+                    await self._load(session)
+        return self._snapshot
+
+    def _stale(self) -> bool:
+        interval = settings.rarity_refresh_interval
+        return self._snapshot is None or monotonic() - self._loaded_at >= interval
+
+    async def _load(self, session: AsyncSession) -> None:
+        unlocks_stmt = select(
+            AchievementUnlockStripe.achievement_id, func.sum(AchievementUnlockStripe.count)
+        ).group_by(AchievementUnlockStripe.achievement_id)
+        unlocks = {
+            achievement_id: int(count)
+            for achievement_id, count in await session.execute(unlocks_stmt)
+        }
+        total_users = int(
+            await session.scalar(select(func.coalesce(func.sum(UserCountStripe.count), 0)))
+        )
+
+        previous = self._snapshot
+        if previous is None or previous.total_users != total_users or previous.unlocks != unlocks:
+            self._snapshot = RaritySnapshot(
+                version=previous.version + 1 if previous is not None else 1,
+                total_users=total_users,
+                unlocks=MappingProxyType(unlocks),
+            )
+            logger.info(
+                "Loaded rarity counters v%s: %s users, %s achievements",
+                self._snapshot.version,
+                total_users,
+                len(unlocks),
+            )
+        self._loaded_at = monotonic()
+
+
+rarity_store = RarityStore()
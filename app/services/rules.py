@@ -0,0 +1,407 @@
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Integer,
+    TableValuedAlias,
+    any_,
+    bindparam,
+    delete,
+    func,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import TypeEngine
+
+from app.core.config import settings
+from app.models.achievement_rule import AchievementRule
+from app.models.enums import RuleKind
+from app.models.rule_progress import RuleProgress
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.schemas.achievements import (
+    AchievementRuleCreate,
+    AchievementRuleRead,
+    GrantBatchItem,
+    GrantStatus,
+)
+from app.schemas.events import EventBatchResult, EventCreate
+from app.services.achievements import AchievementService
+from app.services.catalog import AchievementCatalog, RuleEntry, achievement_catalog
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY: tuple[tuple[str, TypeEngine], ...] = (("user_id", Integer()), ("rule_id", Integer()))
+
+
+@dataclass
+class RuleBatch:
+    """
+    Агрегированные по парам (пользователь, правило) события одной
+    микропачки.
+
+    Поля:
+        fired: Пары, условие которых выполнено без учёта сохранённого прогресса.
+        counts: Сумма значений событий для правил COUNT.
+        streak_days: Дни событий для правил STREAK.
+    """
+
+    fired: set[tuple[int, RuleEntry]] = field(default_factory=set)
+    counts: dict[tuple[int, RuleEntry], int] = field(default_factory=lambda: defaultdict(int))
+    streak_days: dict[tuple[int, RuleEntry], set[date]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+
+
+def advance_streak(
+    value: int,
+    last_day: date | None,
+    days: Iterable[date],
+) -> tuple[int, date | None]:
+    """
+    Продление серии дней новыми днями событий. День, следующий за последним
+    днём серии, удлиняет её, пропуск дня начинает серию заново, а дни не
+    позже последнего дня серии ничего не меняют.
+
+    :param value: Текущая длина серии.
+    :param last_day: Последний день серии или None, если серии нет.
+    :param days: Дни новых событий.
+    :return: Новая длина серии и её последний день.
+    """
+    for day in sorted(days):
+        if last_day is not None and day <= last_day:
+            continue
+        value = value + 1 if last_day is not None and day == last_day + timedelta(days=1) else 1
+        last_day = day
+    return value, last_day
+
+
+def unnest_rows(
+    name: str,
+    columns: Sequence[tuple[str, TypeEngine]],
+    rows: Sequence[tuple],
+) -> TableValuedAlias:
+    """
+    Построение производной таблицы из строк через unnest() по массивам
+    столбцов. В отличие от VALUES, текст запроса не зависит от количества
+    строк, поэтому оператор компилируется один раз и берётся из кэша.
+
+    :param name: Имя производной таблицы и префикс параметров.
+    :param columns: Имена и типы столбцов.
+    :param rows: Строки в порядке столбцов.
+    :return: Производная таблица со столбцами columns.
+    """
+    return (
+        func.unnest(
+            *(
+                bindparam(f"{name}_{column}", [row[i] for row in rows], type_=ARRAY(type_))
+                for i, (column, type_) in enumerate(columns)
+            )
+        )
+        .table_valued(*(column for column, _ in columns))
+        .render_derived(name=name)
+    )
+
+
+class RulesService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def list_rules(self, code: str) -> list[AchievementRuleRead] | None:
+        """
+        Получение правил выдачи достижения из каталога в памяти процесса.
+
+        :param code: Код достижения.
+        :return: Правила достижения или None, если достижение не найдено.
+        """
+        catalog = await achievement_catalog.get(self.session)
+        entry = catalog.by_code.get(code)
+        if entry is None:
+            return None
+        return [AchievementRuleRead.model_validate(rule) for rule in entry.rules]
+
+    async def add_rules(
+        self,
+        code: str,
+        rules: list[AchievementRuleCreate],
+    ) -> list[AchievementRuleRead] | None:
+        """
+        Добавление правил выдачи к существующему достижению. После коммита
+        каталог (вместе с индексом правил по типу события) перезагружается,
+        другие воркеры получают уведомление через Postgres NOTIFY.
+
+        :param code: Код достижения.
+        :param rules: Создаваемые правила.
+        :return: Все правила достижения или None, если достижение не найдено.
+        """
+        catalog = await achievement_catalog.get(self.session)
+        entry = catalog.by_code.get(code)
+        if entry is None:
+            catalog = await achievement_catalog.refresh_on_miss(self.session)
+            entry = catalog.by_code.get(code)
+        if entry is None:
+            return None
+
+        self.session.add_all(
+            AchievementRule(
+                achievement_id=entry.id,
+                event_type=rule.event_type,
+                kind=rule.kind,
+                target=rule.target,
+            )
+            for rule in rules
+        )
+        await achievement_catalog.notify(self.session)
+        await self.session.commit()
+        await achievement_catalog.reload(self.session)
+        return await self.list_rules(code)
+
+    async def process_events(self, events: list[EventCreate]) -> EventBatchResult:
+        """
+        Обработка событий движком правил. События делятся на микропачки по
+        RULES_MICRO_BATCH_SIZE, каждая микропачка вычисляется и фиксируется
+        отдельной транзакцией.
+
+        :param events: События в порядке поступления.
+        :return: Сводка обработки и выданные достижения.
+        """
+        result = EventBatchResult(accepted=len(events), matched=0, unknown_user=0, granted=[])
+        size = settings.rules_micro_batch_size
+        for start in range(0, len(events), size):
+            await self._evaluate(events[start : start + size], result)
+        return result
+
+    async def _evaluate(self, events: list[EventCreate], result: EventBatchResult) -> None:
+        """
+        Вычисление одной микропачки событий. Для каждого события берутся только
+        правила его типа из индекса каталога; пары (пользователь, правило),
+        достижение которых уже выдано, пропускаются. Прогресс правил COUNT
+        прибавляется одним INSERT ... ON CONFLICT DO UPDATE RETURNING, правил
+        STREAK - продлевается под блокировкой строк прогресса. Сработавшие
+        правила выдают достижения через пакетную выдачу AchievementService,
+        их строки прогресса удаляются в той же транзакции.
+
+        :param events: События микропачки.
+        :param result: Сводка обработки, дополняемая результатами микропачки.
+        :return: None.
+        """
+        catalog = await achievement_catalog.get(self.session)
+        matched = [
+            (event, rules) for event in events if (rules := catalog.by_event.get(event.type))
+        ]
+        result.matched += len(matched)
+        if not matched:
+            return
+
+        user_ids = sorted({event.user_id for event, _ in matched})
+        known_users = set(
+            (
+                await self.session.scalars(
+                    select(User.id).where(
+                        User.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(Integer)))
+                    )
+                )
+            ).all()
+        )
+        granted = await self._granted_pairs(
+            sorted(known_users),
+            sorted({rule.achievement_id for _, rules in matched for rule in rules}),
+        )
+
+        batch = RuleBatch()
+        today = date.today()
+        for event, rules in matched:
+            if event.user_id not in known_users:
+                result.unknown_user += 1
+                continue
+            for rule in rules:
+                if (event.user_id, rule.achievement_id) in granted:
+                    continue
+                key = (event.user_id, rule)
+                if rule.kind == RuleKind.THRESHOLD:
+                    if event.value >= rule.target:
+                        batch.fired.add(key)
+                elif rule.kind == RuleKind.COUNT:
+                    batch.counts[key] += event.value
+                else:
+                    day = event.occurred_at.date() if event.occurred_at is not None else today
+                    batch.streak_days[key].add(day)
+
+        fired = batch.fired | await self._add_counts(batch.counts)
+        fired |= await self._extend_streaks(batch.streak_days)
+
+        if not fired:
+            await self.session.commit()
+            return
+
+        grants = sorted({(user_id, rule.achievement_id) for user_id, rule in fired})
+        await self.session.execute(
+            delete(RuleProgress).where(
+                tuple_(RuleProgress.user_id, RuleProgress.rule_id).in_(_rule_keys(catalog, grants))
+            )
+        )
+        items = [
+            GrantBatchItem(user_id=user_id, code=catalog.by_id[achievement_id].code)
+            for user_id, achievement_id in grants
+        ]
+        # Пакетная выдача фиксирует транзакцию, включая изменения прогресса правил.
+        results = await AchievementService(self.session).grant_achievements_batch(items)
+        result.granted += [
+            GrantBatchItem(user_id=item.user_id, code=item.code)
+            for item in results
+            if item.status == GrantStatus.GRANTED
+        ]
+        logger.info(
+            "Evaluated rules for %s events: fired=%s, granted=%s",
+            len(events),
+            len(grants),
+            sum(item.status == GrantStatus.GRANTED for item in results),
+        )
+
+    async def _granted_pairs(
+        self,
+        user_ids: list[int],
+        achievement_ids: list[int],
+    ) -> set[tuple[int, int]]:
+        """
+        Поиск уже выданных достижений среди пар пользователей и достижений
+        микропачки одним запросом по uq_user_achievement.
+
+        :param user_ids: Идентификаторы пользователей.
+        :param achievement_ids: Идентификаторы достижений.
+        :return: Множество пар (user_id, achievement_id).
+        """
+        if not user_ids:
+            return set()
+        stmt = select(UserAchievement.user_id, UserAchievement.achievement_id).where(
+            UserAchievement.user_id
+            == any_(bindparam("ua_user_ids", user_ids, type_=ARRAY(Integer))),
+            UserAchievement.achievement_id
+            == any_(bindparam("ua_ach_ids", achievement_ids, type_=ARRAY(Integer))),
+        )
+        return {(row.user_id, row.achievement_id) for row in await self.session.execute(stmt)}
+
+    async def _add_counts(
+        self,
+        counts: dict[tuple[int, RuleEntry], int],
+    ) -> set[tuple[int, RuleEntry]]:
+        """
+        Прибавление сумм значений событий к прогрессу правил COUNT одним
+        атомарным INSERT ... ON CONFLICT DO UPDATE RETURNING.
+
+        :param counts: Суммы значений по парам (пользователь, правило).
+        :return: Пары, прогресс которых достиг цели.
+        """
+        if not counts:
+            return set()
+        rules = {rule.id: rule for _, rule in counts}
+        deltas = unnest_rows(
+            "deltas",
+            [*PROGRESS_KEY, ("value", BigInteger())],
+            sorted((user_id, rule.id, value) for (user_id, rule), value in counts.items()),
+        )
+        stmt = pg_insert(RuleProgress).from_select(["user_id", "rule_id", "value"], select(deltas))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RuleProgress.user_id, RuleProgress.rule_id],
+            set_={"value": RuleProgress.value + stmt.excluded.value},
+        ).returning(RuleProgress.user_id, RuleProgress.rule_id, RuleProgress.value)
+        return {
+            (row.user_id, rules[row.rule_id])
+            for row in await self.session.execute(stmt)
+            if row.value >= rules[row.rule_id].target
+        }
+
+    async def _extend_streaks(
+        self,
+        streak_days: dict[tuple[int, RuleEntry], set[date]],
+    ) -> set[tuple[int, RuleEntry]]:
+        """
+        Продление серий правил STREAK. Недостающие строки прогресса создаются,
+        затем все строки микропачки блокируются в порядке ключа (FOR UPDATE),
+        новые значения вычисляются в процессе и записываются одним UPDATE по
+        массивам, поэтому параллельные микропачки не теряют дни серии.
+
+        :param streak_days: Дни событий по парам (пользователь, правило).
+        :return: Пары, длина серии которых достигла цели.
+        """
+        if not streak_days:
+            return set()
+        rules = {rule.id: rule for _, rule in streak_days}
+        keys = sorted((user_id, rule.id) for user_id, rule in streak_days)
+
+        source = unnest_rows("streak_keys", PROGRESS_KEY, keys)
+
+        await self.session.execute(
+            pg_insert(RuleProgress)
+            .from_select(["user_id", "rule_id"], select(source.c.user_id, source.c.rule_id))
+            .on_conflict_do_nothing(index_elements=[RuleProgress.user_id, RuleProgress.rule_id])
+        )
+        current = await self.session.execute(
+            select(
+                RuleProgress.user_id,
+                RuleProgress.rule_id,
+                RuleProgress.value,
+                RuleProgress.last_day,
+            )
+            .join(
+                source,
+                (RuleProgress.user_id == source.c.user_id)
+                & (RuleProgress.rule_id == source.c.rule_id),
+            )
+            .order_by(RuleProgress.user_id, RuleProgress.rule_id)
+            .with_for_update(of=RuleProgress)
+        )
+
+        updates: list[tuple[int, int, int, date | None]] = []
+        fired: set[tuple[int, RuleEntry]] = set()
+        for row in current:
+            rule = rules[row.rule_id]
+            value, last_day = advance_streak(
+                row.value, row.last_day, streak_days[(row.user_id, rule)]
+            )
+            updates.append((row.user_id, row.rule_id, value, last_day))
+            if value >= rule.target:
+                fired.add((row.user_id, rule))
+
+        progress = unnest_rows(
+            "progress",
+            [*PROGRESS_KEY, ("value", BigInteger()), ("last_day", Date())],
+            updates,
+        )
+        await self.session.execute(
+            update(RuleProgress)
+            .where(
+                RuleProgress.user_id == progress.c.user_id,
+                RuleProgress.rule_id == progress.c.rule_id,
+            )
+            .values(value=progress.c.value, last_day=progress.c.last_day)
+        )
+        return fired
+
+
+def _rule_keys(
+    catalog: AchievementCatalog,
+    grants: list[tuple[int, int]],
+) -> list[tuple[int, int]]:
+    """
+    Ключи строк прогресса всех правил выдаваемых достижений: после выдачи
+    прогресс по любому правилу этого достижения больше не нужен.
+
+    :param catalog: Снимок каталога достижений.
+    :param grants: Пары (user_id, achievement_id) выдаваемых достижений.
+    :return: Пары (user_id, rule_id).
+    """
+    return [
+        (user_id, rule.id)
+        for user_id, achievement_id in grants
+        for rule in catalog.by_id[achievement_id].rules
+    ]
@@ -1,195 +1,434 @@
-from datetime import date
-from itertools import combinations, pairwise
+from __future__ import annotations
 
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
 
+from sqlalchemy import Integer, Row, Select, Subquery, cast, func, select, text, union
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.enums import Language, TimeWindow
 from app.models.user import User
-from app.models.user_achievement import UserAchievement
-from app.schemas.stats import PointsDiffPair, UserWithCount, UserWithStreak
+from app.models.user_daily_stat import UserDailyStat
+from app.models.user_points_delta import UserPointsDelta
+from app.schemas.stats import (
+    PointsDiffPair,
+    StatsSummary,
+    UserWithCount,
+    UserWithStreak,
+    UserWithWindowPoints,
+    WindowStatsSummary,
+)
+from app.services.daily_stats import window_points
+from app.services.points_deltas import effective_users, points_striping
+
+SNAPSHOT_EXECUTION_OPTIONS = {
+    "isolation_level": "REPEATABLE READ",
+    "postgresql_readonly": True,
+}
 
 
 class StatsService:
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
         self.session = session
+        self.session_factory = session_factory
+
+    async def summary(self, streak_min_days: int = 7) -> tuple[StatsSummary, dict[str, float]]:
+        """
+        Сбор сводной статистики и времени выполнения каждого подзапроса.
+
+        Если сервису передана фабрика сессий, подзапросы выполняются
+        параллельно на отдельных соединениях из пула. Чтобы результаты были
+        согласованы между собой, все соединения работают в read-only
+        транзакциях REPEATABLE READ на одном снимке данных, экспортированном
+        через pg_export_snapshot(). Без фабрики подзапросы выполняются
+        последовательно в текущей сессии.
+
+        :param streak_min_days: Минимальная длина стрика в днях.
+        :return: Кортеж из сводной статистики и словаря имя подзапроса → время в мс.
+        """
+        queries: dict[str, Callable[[StatsService], Awaitable[Any]]] = {
+            "max_achievements": lambda service: service.user_with_max_achievements(),
+            "max_points": lambda service: service.user_with_max_points(),
+            "points_diff": lambda service: service.max_min_points_diff(),
+            "streaks": lambda service: service.users_with_7day_streak(min_days=streak_min_days),
+        }
+
+        started = perf_counter()
+        if self.session_factory is None:
+            timed = [await self._timed(query(self)) for query in queries.values()]
+        else:
+            timed = await self._run_in_shared_snapshot(list(queries.values()))
+
+        timings = {name: elapsed for name, (_, elapsed) in zip(queries, timed, strict=True)}
+        timings["total"] = (perf_counter() - started) * 1000
+
+        results = {name: result for name, (result, _) in zip(queries, timed, strict=True)}
+        max_diff, min_diff = results["points_diff"]
+        summary = StatsSummary(
+            max_achievements=results["max_achievements"],
+            max_points=results["max_points"],
+            max_points_diff=max_diff,
+            min_points_diff=min_diff,
+            streak_users=results["streaks"],
+        )
+        return summary, timings
+
+    async def window_summary(
+        self,
+        window: TimeWindow,
+        language: Language | None = None,
+    ) -> WindowStatsSummary:
+        """
+        Сводная статистика по очкам за скользящее окно: количество активных
+        пользователей, сумма очков, лидер окна и пары с максимальной и
+        минимальной ненулевой разностью очков за окно. Все подзапросы строятся
+        над теми же скользящими суммами user_daily_stats, что и лидерборды за
+        окно, и выполняются в одной read-only транзакции REPEATABLE READ,
+        поэтому видят один снимок данных. Уровень изоляции задаётся при
+        открытии транзакции, поэтому сессия не должна быть в транзакции.
+
+        :param window: Скользящее окно.
+        :param language: Язык пользователей или None для всех языков.
+        :return: Сводная статистика за окно.
+        :raises RuntimeError: Если в сессии уже открыта транзакция.
+        """
+        if self.session.in_transaction():
+            raise RuntimeError(
+                "window_summary() needs a session without an open transaction "
+                "to run in a REPEATABLE READ snapshot"
+            )
+        await self.session.connection(execution_options=SNAPSHOT_EXECUTION_OPTIONS)
+        points = window_points(window, language)
+
+        totals_stmt = select(func.count(), func.coalesce(func.sum(points.c.points), 0))
+        active_users, total_points = (await self.session.execute(totals_stmt)).one()
+
+        leader_stmt = select(points).order_by(points.c.points.desc(), points.c.id).limit(1)
+        leader = (await self.session.execute(leader_stmt)).one_or_none()
+
+        source = select(
+            points.c.id, points.c.username, points.c.points.label("total_points")
+        ).subquery("window_users")
+        max_diff, min_diff = await self.max_min_points_diff(source)
+
+        return WindowStatsSummary(
+            window=window,
+            language=language,
+            active_users=active_users,
+            total_points=total_points,
+            max_points=UserWithWindowPoints(
+                user_id=leader.id,
+                username=leader.username,
+                language=leader.language,
+                total_points=leader.total_points,
+                window_points=leader.points,
+            )
+            if leader is not None
+            else None,
+            max_points_diff=max_diff,
+            min_points_diff=min_diff,
+        )
+
+    async def _run_in_shared_snapshot(
+        self,
+        queries: list[Callable[[StatsService], Awaitable[Any]]],
+    ) -> list[tuple[Any, float]]:
+        """
+        Параллельное выполнение подзапросов на отдельных соединениях,
+        импортирующих общий снимок данных. Экспортирующая транзакция держится
+        открытой, пока все подзапросы не завершатся.
+
+        :param queries: Подзапросы, принимающие экземпляр StatsService.
+        :return: Список пар (результат, время выполнения в мс) в порядке подзапросов.
+        """
+        async with self.session_factory() as exporter:
+            await exporter.connection(execution_options=SNAPSHOT_EXECUTION_OPTIONS)
+            snapshot_id = await exporter.scalar(text("SELECT pg_export_snapshot()"))
+
+            async def run(query: Callable[[StatsService], Awaitable[Any]]) -> tuple[Any, float]:
+                async with self.session_factory() as session:
+                    await session.connection(execution_options=SNAPSHOT_EXECUTION_OPTIONS)
+                    # Идентификатор снимка сгенерирован сервером; SET TRANSACTION
+                    # SNAPSHOT не поддерживает параметры запроса.
+                    await session.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'"))
+                    return await self._timed(query(StatsService(session)))
+
+            return await asyncio.gather(*(run(query) for query in queries))
+
+    @staticmethod
+    async def _timed(awaitable: Awaitable[Any]) -> tuple[Any, float]:
+        """
+        Ожидание результата с замером времени выполнения.
+
+        :param awaitable: Ожидаемый объект.
+        :return: Кортеж из результата и времени выполнения в мс.
+        """
+        started = perf_counter()
+        result = await awaitable
+        return result, (perf_counter() - started) * 1000
 
     async def user_with_max_achievements(self) -> UserWithCount | None:
         """
         Вычисление пользователя, у которого выдано максимальное количество достижений.
+        Лидер читается первой записью индекса ix_users_achievements_count_id
+        по денормализованному счётчику users.achievements_count. В режиме
+        полосатых счётчиков учитываются и неперенесённые полосы.
 
         :return: Пользователь и количество его достижений или None, если данных нет.
         """
-        stmt = (
-            select(
-                User.id,
-                User.username,
-                User.language,
-                User.total_points,
-                func.count(UserAchievement.id).label("achievements_count"),
-            )
-            .join(UserAchievement, User.id == UserAchievement.user_id)
-            .group_by(User.id)
-            .order_by(func.count(UserAchievement.id).desc())
-            .limit(1)
-        )
+        stmt = self._leader(User.achievements_count, "achievements_count")
 
         row = (await self.session.execute(stmt)).one_or_none()
-        if row is None:
+        if row is None or row.achievements_count == 0:
             return None
-
-        return UserWithCount(
-            user_id=row.id,
-            username=row.username,
-            language=row.language,
-            total_points=row.total_points,
-            achievements_count=row.achievements_count,
-        )
+        return self._user_with_count_row(row)
 
     async def user_with_max_points(self) -> UserWithCount | None:
         """
         Вычисление пользователя с максимальной суммой очков за достижения.
+        Лидер читается первой записью индекса ix_users_total_points_id,
+        количество достижений берётся из users.achievements_count. В режиме
+        полосатых счётчиков учитываются и неперенесённые полосы.
 
         :return: Пользователь и его суммарные очки или None, если данных нет.
         """
-        stmt = (
+        stmt = self._leader(User.total_points, "total_points")
+
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        return self._user_with_count_row(row)
+
+    @classmethod
+    def _leader(cls, column: Any, name: str) -> Select:
+        """
+        Построение запроса лидера по неубывающему счётчику пользователя.
+
+        Без полосатых счётчиков лидер - первая запись индекса по счётчику.
+        Полосы только увеличивают счётчики, поэтому с ними лидер - либо первая
+        запись индекса, либо пользователь с неперенесёнными полосами:
+        кандидаты сравниваются по сумме счётчика и полос, без обхода всех
+        пользователей.
+
+        :param column: Столбец счётчика в users.
+        :param name: Имя столбца счётчика в effective_users().
+        :return: Оператор SELECT не более чем одной строки пользователя.
+        """
+        if not points_striping():
+            return cls._user_with_count().order_by(column.desc(), User.id).limit(1)
+
+        top = select(User.id).order_by(column.desc(), User.id).limit(1)
+        candidates = union(top, select(UserPointsDelta.user_id)).subquery("candidates")
+        users = effective_users()
+        return (
             select(
-                User.id,
-                User.username,
-                User.language,
-                User.total_points,
-                func.count(UserAchievement.id).label("achievements_count"),
+                users.c.id,
+                users.c.username,
+                users.c.language,
+                users.c.total_points,
+                users.c.achievements_count,
             )
-            .join(UserAchievement, User.id == UserAchievement.user_id, isouter=True)
-            .group_by(User.id)
-            .order_by(User.total_points.desc())
+            .join(candidates, candidates.c.id == users.c.id)
+            .order_by(users.c[name].desc(), users.c.id)
             .limit(1)
         )
 
-        row = (await self.session.execute(stmt)).one_or_none()
-        if row is None:
-            return None
+    @staticmethod
+    def _user_with_count() -> Select:
+        """
+        Выборка полей пользователя, нужных для UserWithCount.
+
+        :return: Оператор SELECT по таблице users.
+        """
+        return select(
+            User.id, User.username, User.language, User.total_points, User.achievements_count
+        )
+
+    @staticmethod
+    def _user_with_count_row(row: Row) -> UserWithCount:
+        """
+        Преобразование строки пользователя в UserWithCount.
 
+        :param row: Строка с полями id, username, language, total_points, achievements_count.
+        :return: Пользователь и количество его достижений.
+        """
         return UserWithCount(
             user_id=row.id,
             username=row.username,
             language=row.language,
             total_points=row.total_points,
-            achievements_count=row.achievements_count or 0,
+            achievements_count=row.achievements_count,
         )
 
-    async def max_min_points_diff(self) -> tuple[PointsDiffPair | None, PointsDiffPair | None]:
+    async def max_min_points_diff(
+        self,
+        source: Subquery | None = None,
+    ) -> tuple[PointsDiffPair | None, PointsDiffPair | None]:
         """
         По всем пользователям вычисляется пара с максимальной и минимальной
         ненулевой разностью суммарных очков.
 
+        Максимальная разность - это разность между глобальными минимумом и
+        максимумом `total_points`. Минимальная ненулевая разность всегда
+        достигается на соседних различных значениях в отсортированном порядке,
+        поэтому она ищется в БД через `LAG` по отсортированным значениям очков.
+        Для каждого значения очков представителем выбирается пользователь с
+        наименьшим идентификатором, что делает выбор пары детерминированным.
+        Первым в паре всегда идёт пользователь с меньшим количеством очков.
+
+        :param source: Подзапрос со столбцами id, username и total_points, по
+            которому ищутся пары (например, очки за окно), или None для
+            суммарных очков всех пользователей (с неперенесёнными полосами в
+            режиме полосатых счётчиков).
         :return: Кортеж из пары с максимальной разностью и пары с минимальной разностью.
         """
-        stmt = select(User.id, User.username, User.total_points)
-        rows = (await self.session.execute(stmt)).all()
-        users = list(rows)
-        if len(users) < 2:
-            return None, None
+        if source is None and points_striping():
+            source = effective_users()
+        elif source is None:
+            source = select(User.id, User.username, User.total_points).subquery("users")
+        representatives = (
+            select(source.c.id, source.c.username, source.c.total_points)
+            .distinct(source.c.total_points)
+            .order_by(source.c.total_points, source.c.id)
+            .subquery("representatives")
+        )
+
+        lowest = (
+            select(representatives)
+            .order_by(representatives.c.total_points.asc())
+            .limit(1)
+            .subquery("lowest")
+        )
+        highest = (
+            select(representatives)
+            .order_by(representatives.c.total_points.desc())
+            .limit(1)
+            .subquery("highest")
+        )
+        max_stmt = select(
+            lowest.c.id.label("user1_id"),
+            lowest.c.username.label("user1_username"),
+            lowest.c.total_points.label("user1_points"),
+            highest.c.id.label("user2_id"),
+            highest.c.username.label("user2_username"),
+            highest.c.total_points.label("user2_points"),
+        ).where(highest.c.total_points > lowest.c.total_points)
 
-        max_pair: PointsDiffPair | None = None
-        min_pair: PointsDiffPair | None = None
-
-        for u1, u2 in combinations(users, 2):
-            diff = abs(u1.total_points - u2.total_points)
-            if diff == 0:
-                continue
-
-            pair = PointsDiffPair(
-                user1_id=u1.id,
-                user1_username=u1.username,
-                user1_points=u1.total_points,
-                user2_id=u2.id,
-                user2_username=u2.username,
-                user2_points=u2.total_points,
-                diff=diff,
+        window = {"order_by": representatives.c.total_points}
+        neighbours = select(
+            func.lag(representatives.c.id).over(**window).label("user1_id"),
+            func.lag(representatives.c.username).over(**window).label("user1_username"),
+            func.lag(representatives.c.total_points).over(**window).label("user1_points"),
+            representatives.c.id.label("user2_id"),
+            representatives.c.username.label("user2_username"),
+            representatives.c.total_points.label("user2_points"),
+        ).subquery("neighbours")
+        min_stmt = (
+            select(neighbours)
+            .where(neighbours.c.user1_id.is_not(None))
+            .order_by(
+                (neighbours.c.user2_points - neighbours.c.user1_points).asc(),
+                neighbours.c.user1_points.asc(),
             )
+            .limit(1)
+        )
+
+        max_row = (await self.session.execute(max_stmt)).one_or_none()
+        if max_row is None:
+            return None, None
 
-            if max_pair is None or diff > max_pair.diff:
-                max_pair = pair
-            if min_pair is None or diff < min_pair.diff:
-                min_pair = pair
+        min_row = (await self.session.execute(min_stmt)).one()
+        return self._points_diff_pair(max_row), self._points_diff_pair(min_row)
 
-        return max_pair, min_pair
+    @staticmethod
+    def _points_diff_pair(row: Row) -> PointsDiffPair:
+        """
+        Преобразование строки результата запроса в пару пользователей.
+
+        :param row: Строка с полями user1_* и user2_*.
+        :return: Пара пользователей и разность их очков.
+        """
+        return PointsDiffPair(
+            user1_id=row.user1_id,
+            user1_username=row.user1_username,
+            user1_points=row.user1_points,
+            user2_id=row.user2_id,
+            user2_username=row.user2_username,
+            user2_points=row.user2_points,
+            diff=row.user2_points - row.user1_points,
+        )
 
     async def users_with_7day_streak(self, min_days: int = 7) -> list[UserWithStreak]:
         """
-        По датам выдачи достижений для каждого пользователя вычисляется
+        По дневной статистике (user_daily_stats) для каждого пользователя вычисляется
         длина максимального стрика - количества подряд идущих дней, в каждый
         из которых было выдано хотя бы одно достижение. Возвращаются
         пользователи, у которых длина стрика не меньше min_days.
 
+        Стрики считаются в БД по схеме gaps-and-islands: для подряд идущих
+        дней разность `day - row_number()` постоянна, поэтому группировка по
+        ней даёт отрезки стриков. Чтение (user_id, day) обслуживается
+        уникальным индексом uq_user_day без обращения к таблице. В режиме
+        полосатых счётчиков к дням добавляются дни неперенесённых полос.
+
         :param min_days: Минимальная длина стрика в днях.
         :return: Список пользователей с информацией о максимальном стрике.
         """
+        active = select(UserDailyStat.user_id, UserDailyStat.day)
+        users = User.__table__
+        if points_striping():
+            active = union(active, select(UserPointsDelta.user_id, UserPointsDelta.day))
+            users = effective_users()
+        active = active.subquery("active")
 
-        day_expr = func.date_trunc("day", UserAchievement.issued_at).label("day")
+        row_number = func.row_number().over(
+            partition_by=active.c.user_id,
+            order_by=active.c.day,
+        )
+        days = select(
+            active.c.user_id,
+            (active.c.day - cast(row_number, Integer)).label("island"),
+        ).subquery("days")
+
+        islands = (
+            select(days.c.user_id, func.count().label("streak"))
+            .group_by(days.c.user_id, days.c.island)
+            .subquery("islands")
+        )
+
+        longest = (
+            select(islands.c.user_id, func.max(islands.c.streak).label("longest_streak"))
+            .group_by(islands.c.user_id)
+            .having(func.max(islands.c.streak) >= min_days)
+            .subquery("longest")
+        )
 
         stmt = (
             select(
-                User.id,
-                User.username,
-                User.language,
-                User.total_points,
-                day_expr,
-            )
-            .join(UserAchievement, User.id == UserAchievement.user_id)
-            .group_by(
-                User.id,
-                User.username,
-                User.language,
-                User.total_points,
-                day_expr,
+                users.c.id,
+                users.c.username,
+                users.c.language,
+                users.c.total_points,
+                longest.c.longest_streak,
             )
-            .order_by(User.id, day_expr)
+            .join(longest, users.c.id == longest.c.user_id)
+            .order_by(users.c.id)
         )
 
-        result = await self.session.execute(stmt)
-        rows = result.all()
-
-        users_days: dict[int, dict] = {}
-        for row in rows:
-            uid = row.id
-            if uid not in users_days:
-                users_days[uid] = {
-                    "username": row.username,
-                    "language": row.language,
-                    "total_points": row.total_points,
-                    "days": [],
-                }
-            day: date = row.day.date()
-            users_days[uid]["days"].append(day)
-
-        result_users: list[UserWithStreak] = []
-
-        for uid, data in users_days.items():
-            days = sorted(set(data["days"]))
-            if not days:
-                continue
-
-            longest = 1
-            current = 1
-
-            for prev_day, curr_day in pairwise(days):
-                delta = (curr_day - prev_day).days
-                if delta == 1:
-                    current += 1
-                else:
-                    current = 1
-                longest = max(longest, current)
-
-            if longest >= min_days:
-                result_users.append(
-                    UserWithStreak(
-                        user_id=uid,
-                        username=data["username"],
-                        language=data["language"],
-                        total_points=data["total_points"],
-                        longest_streak=longest,
-                    )
-                )
-
-        return result_users
+        rows = (await self.session.execute(stmt)).all()
+        return [
+            UserWithStreak(
+                user_id=row.id,
+                username=row.username,
+                language=row.language,
+                total_points=row.total_points,
+                longest_streak=row.longest_streak,
+            )
+            for row in rows
+        ]
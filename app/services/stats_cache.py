@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Protocol
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.schemas.stats import StatsSummary
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "stats:summary:generation"
+SUMMARY_KEY_PREFIX = "stats:summary:"
+
+
+class StatsCacheBackend(Protocol):
+    """Хранилище закэшированных сводок статистики."""
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+
+class MemoryCacheBackend:
+    """
+    LRU-кэш в памяти процесса с ограничением по количеству записей и TTL.
+    Счётчики (incr) хранятся отдельно и не вытесняются.
+    """
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class RedisCacheBackend:
+    """
+    Бэкенд поверх Redis-совместимого асинхронного клиента (redis.asyncio или
+    любой объект с методами get/set/incr). Общий счётчик поколений делает
+    инвалидацию видимой для всех воркеров.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> RedisCacheBackend:
+        """
+        Создание бэкенда по URL Redis. Пакет redis является опциональной
+        зависимостью и импортируется только при выборе этого бэкенда.
+
+        :param url: URL подключения к Redis.
+        :return: Экземпляр RedisCacheBackend.
+        """
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "STATS_CACHE_BACKEND=redis requires the 'redis' package to be installed"
+            ) from exc
+
+        return cls(redis_asyncio.from_url(url))
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.client.get(key)
+        if isinstance(value, str):
+            return value.encode()
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+
+@dataclass(frozen=True)
+class CachedSummary:
+    """
+    Сериализованная сводка статистики, готовая к отдаче клиенту.
+
+    Поля:
+        body: JSON-представление StatsSummary.
+        etag: Строгий ETag, вычисленный по содержимому body.
+        timings: Время выполнения подзапросов при вычислении сводки, в мс.
+    """
+
+    body: bytes
+    etag: str
+    timings: dict[str, float]
+
+    def dump(self) -> bytes:
+        """
+        Упаковка в байты для бэкенда: строка ETag, строка JSON с замерами, тело.
+
+        :return: Упакованное представление.
+        """
+        return b"\n".join([self.etag.encode(), json.dumps(self.timings).encode(), self.body])
+
+    @classmethod
+    def load(cls, raw: bytes) -> CachedSummary:
+        """
+        Распаковка представления, полученного из dump().
+
+        :param raw: Упакованное представление.
+        :return: Экземпляр CachedSummary.
+        """
+        etag, timings, body = raw.split(b"\n", 2)
+        return cls(body=body, etag=etag.decode(), timings=json.loads(timings))
+
+    @classmethod
+    def from_summary(cls, summary: StatsSummary, timings: dict[str, float]) -> CachedSummary:
+        """
+        Сериализация сводки и вычисление ETag по её содержимому.
+
+        :param summary: Сводная статистика.
+        :param timings: Время выполнения подзапросов в мс.
+        :return: Экземпляр CachedSummary.
+        """
+        body = summary.model_dump_json().encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return cls(body=body, etag=etag, timings=timings)
+
+
+class StatsCache:
+    """
+    Кэш сводной статистики с TTL, объединением одновременных промахов в одно
+    вычисление (single-flight) и инвалидацией через счётчик поколений:
+    ключ сводки включает номер поколения, а invalidate() его увеличивает.
+    """
+
+    def __init__(self, backend: StatsCacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: dict[str, asyncio.Task[CachedSummary]] = {}
+
+    async def get_or_compute(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        compute: Callable[[AsyncSession], Awaitable[tuple[StatsSummary, dict[str, float]]]],
+        bypass: bool = False,
+    ) -> tuple[CachedSummary, bool]:
+        """
+        Получение сводки из кэша или её вычисление при промахе. Одновременные
+        промахи в рамках процесса ожидают одно общее вычисление. Вычисление
+        идёт в собственной сессии из session_factory, а не в сессии
+        запроса: если первый запрос отменён и его сессия закрыта, остальные
+        ожидающие всё равно получают результат.
+
+        :param session_factory: Фабрика сессий для вычисления сводки.
+        :param compute: Функция вычисления сводки и времени подзапросов по сессии.
+        :param bypass: Вычислить сводку без чтения и записи кэша.
+        :return: Кортеж из сводки и признака попадания в кэш.
+        """
+        if self.ttl <= 0 or bypass:
+            return CachedSummary.from_summary(*await _run(session_factory, compute)), False
+
+        generation = await self.backend.get(GENERATION_KEY)
+        key = f"{SUMMARY_KEY_PREFIX}{int(generation or 0)}"
+
+        raw = await self.backend.get(key)
+        if raw is not None:
+            return CachedSummary.load(raw), True
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute_and_store(key, session_factory, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task), False
+
+    async def invalidate(self) -> None:
+        """
+        Инвалидация всех закэшированных сводок. Вызывается после коммита
+        изменений, влияющих на статистику.
+
+        :return: None.
+        """
+        if self.ttl <= 0:
+            return
+
+        try:
+            await self.backend.incr(GENERATION_KEY)
+        except Exception:
+            logger.exception("Failed to invalidate stats cache")
+
+    async def _compute_and_store(
+        self,
+        key: str,
+        session_factory: async_sessionmaker[AsyncSession],
+        compute: Callable[[AsyncSession], Awaitable[tuple[StatsSummary, dict[str, float]]]],
+    ) -> CachedSummary:
+        cached = CachedSummary.from_summary(*await _run(session_factory, compute))
+        await self.backend.set(key, cached.dump(), self.ttl)
+        return cached
+
+
+async def _run[T](
+    session_factory: async_sessionmaker[AsyncSession],
+    compute: Callable[[AsyncSession], Awaitable[T]],
+) -> T:
+    async with session_factory() as session:
+        return await compute(session)
+
+
+def build_stats_cache() -> StatsCache:
+    """
+    Создание кэша статистики по настройкам приложения.
+
+    :return: Экземпляр StatsCache с выбранным бэкендом.
+    """
+    if settings.stats_cache_backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("STATS_CACHE_BACKEND=redis requires REDIS_URL to be set")
+        backend: StatsCacheBackend = RedisCacheBackend.from_url(settings.redis_url)
+    else:
+        backend = MemoryCacheBackend(max_entries=settings.stats_cache_max_entries)
+
+    return StatsCache(backend, ttl=settings.stats_cache_ttl)
+
+
+stats_cache = build_stats_cache()
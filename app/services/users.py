@@ -1,17 +1,43 @@
 import logging
+from collections.abc import AsyncIterator
+from datetime import datetime
+from functools import cache
+from typing import Any
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    BigInteger,
+    Row,
+    Select,
+    SmallInteger,
+    bindparam,
+    func,
+    literal,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.models.achievement import Achievement
 from app.models.achievement_translation import AchievementTranslation
 from app.models.user import User
 from app.models.user_achievement import UserAchievement
 from app.schemas.achievements import UserAchievementRead
 from app.schemas.users import UserCreate
+from app.services.leaderboard import leaderboard
+from app.services.ownership import ownership_index
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.points_deltas import pending_totals, points_striping
+from app.services.rarity import counter_stripe, user_count_upsert
+from app.services.stats_cache import stats_cache
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE = 500
+
 
 class UserService:
     def __init__(self, session: AsyncSession) -> None:
@@ -20,6 +46,8 @@ class UserService:
     async def create_user(self, data: UserCreate) -> User:
         """
         Создание нового пользователя с указанным логином и языком интерфейса.
+        В той же транзакции увеличивается полоса счётчика пользователей
+        (user_count_stripes), по которому считается доля получивших достижение.
 
         :param data: Данные для создания пользователя.
         :return: Созданный пользователь.
@@ -29,8 +57,17 @@ class UserService:
             language=data.language.value,
         )
         self.session.add(user)
+        await self.session.flush()
+        await self.session.execute(
+            user_count_upsert(
+                select(literal(counter_stripe(user.id), SmallInteger), literal(1, BigInteger))
+            )
+        )
         await self.session.commit()
+        await stats_cache.invalidate()
+        leaderboard.record_user(data.language)
         await self.session.refresh(user)
+        ownership_index.record_user(user.id)
 
         logger.info(
             "Created user id=%s username=%s language=%s", user.id, user.username, user.language
@@ -40,60 +77,183 @@ class UserService:
 
     async def get_user(self, user_id: int) -> User | None:
         """
-        Получение пользователя по его первичному ключу.
+        Получение пользователя по его первичному ключу. В режиме полосатых
+        счётчиков к total_points и achievements_count прибавляются ещё не
+        перенесённые полосы user_points_deltas.
 
         :param user_id: Идентификатор пользователя.
         :return: Найденный пользователь или None, если пользователь не найден.
         """
-        stmt = select(User).where(User.id == user_id)
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        if not points_striping():
+            stmt = select(User).where(User.id == user_id)
+            result = await self.session.execute(stmt)
+            return result.scalar_one_or_none()
 
-    async def get_user_achievements(self, user_id: int) -> tuple[User, list[UserAchievementRead]]:
+        pending = pending_totals()
+        stmt = (
+            select(User, pending.c.points, pending.c.count)
+            .outerjoin(pending, pending.c.user_id == User.id)
+            .where(User.id == user_id)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        user, points, count = row
+        if points is not None:
+            # Значения выставляются как загруженные, чтобы сессия не сочла
+            # объект изменённым и не записала суммы в users.
+            set_committed_value(user, "total_points", user.total_points + points)
+            set_committed_value(user, "achievements_count", user.achievements_count + count)
+        return user
+
+    async def get_user_achievements(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> tuple[list[UserAchievementRead], str | None] | None:
         """
-        Получение пользователя и списка выданных ему достижений
-        на выбранном пользователем языке интерфейса.
+        Получение списка выданных пользователю достижений на выбранном
+        пользователем языке интерфейса одним запросом к БД. Достижения
+        упорядочены по (issued_at, id) по убыванию. При указании limit
+        возвращается одна страница и курсор следующей страницы.
 
         :param user_id: Идентификатор пользователя.
-        :return: Кортеж из пользователя и списка его достижений.
+        :param limit: Размер страницы или None, чтобы вернуть все достижения.
+        :param cursor: Курсор из предыдущей страницы или None для первой.
+        :return: Кортеж из списка достижений и курсора следующей страницы
+            (None, если страница последняя) или None, если пользователь не найден.
+        :raises InvalidCursorError: Если курсор не удаётся разобрать.
         """
-        user = await self.get_user(user_id)
-        if user is None:
-            return None, []
+        after = decode_cursor(cursor) if cursor is not None else None
+        stmt = user_achievements_stmt(keyset=after is not None, paged=limit is not None)
 
-        stmt = (
-            select(
-                UserAchievement.issued_at,
-                Achievement.id,
-                Achievement.code,
-                Achievement.points,
-                AchievementTranslation.name,
-                AchievementTranslation.description,
-            )
-            .join(Achievement, UserAchievement.achievement_id == Achievement.id)
-            .join(
-                AchievementTranslation,
-                (AchievementTranslation.achievement_id == Achievement.id)
-                & (AchievementTranslation.language == user.language),
-            )
-            .where(UserAchievement.user_id == user.id)
-            .order_by(UserAchievement.issued_at.desc())
+        result = await self.session.execute(
+            stmt, _achievements_params(user_id, after, None if limit is None else limit + 1)
         )
-
-        result = await self.session.execute(stmt)
         rows = result.all()
+        if not rows:
+            return None
+
+        rows = [row for row in rows if row.achievement_id is not None]
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].issued_at, rows[-1].user_achievement_id)
+
+        achievements = [UserAchievementRead.model_validate(row._mapping) for row in rows]
+
+        logger.info("Fetched %d achievements for user id=%s", len(achievements), user_id)
+        return achievements, next_cursor
+
+    async def stream_user_achievements(
+        self,
+        user_id: int,
+        cursor: str | None = None,
+    ) -> AsyncIterator[UserAchievementRead] | None:
+        """
+        Потоковая выдача достижений пользователя через серверный курсор:
+        строки читаются из БД порциями и не накапливаются в памяти. Первая
+        строка читается сразу, чтобы до начала выдачи определить, существует
+        ли пользователь.
+
+        :param user_id: Идентификатор пользователя.
+        :param cursor: Курсор, с которого начинается выдача, или None.
+        :return: Асинхронный итератор достижений или None, если пользователь не найден.
+        :raises InvalidCursorError: Если курсор не удаётся разобрать.
+        """
+        after = decode_cursor(cursor) if cursor is not None else None
+        stmt = user_achievements_stmt(keyset=after is not None, paged=False)
+
+        result = await self.session.stream(
+            stmt.execution_options(yield_per=STREAM_CHUNK_SIZE),
+            _achievements_params(user_id, after, None),
+        )
+        first = await result.fetchone()
+        if first is None:
+            await result.close()
+            return None
+        return self._stream_rows(first, result)
+
+    @staticmethod
+    async def _stream_rows(first: Row, result: AsyncResult) -> AsyncIterator[UserAchievementRead]:
+        if first.achievement_id is None:
+            return
+        yield UserAchievementRead.model_validate(first._mapping)
+        async for row in result:
+            yield UserAchievementRead.model_validate(row._mapping)
+
+
+@cache
+def user_achievements_stmt(keyset: bool, paged: bool) -> Select:
+    """
+    Построение запроса достижений пользователя. Запрос идёт от таблицы users
+    и присоединяет достижения через LEFT JOIN LATERAL, поэтому язык
+    пользователя и его существование определяются в том же запросе: для
+    неизвестного пользователя строк нет, для пользователя без достижений
+    возвращается одна строка с NULL в полях достижения. Если перевода на
+    языке пользователя нет, используется перевод на языке по умолчанию.
+
+    Все значения передаются через bindparam, а сам оператор строится один
+    раз на комбинацию флагов, поэтому его компиляция берётся из кэша.
+
+    :param keyset: Добавить условие keyset-пагинации (after_issued_at, after_id).
+    :param paged: Добавить LIMIT :limit.
+    :return: Оператор SELECT.
+    """
+    translation = aliased(AchievementTranslation, name="translation")
+    fallback = aliased(AchievementTranslation, name="fallback")
+
+    page = (
+        select(
+            UserAchievement.id.label("user_achievement_id"),
+            UserAchievement.issued_at,
+            Achievement.id.label("achievement_id"),
+            Achievement.code,
+            Achievement.points,
+            func.coalesce(translation.name, fallback.name, Achievement.code).label("name"),
+            func.coalesce(translation.description, fallback.description, "").label("description"),
+        )
+        .join(Achievement, UserAchievement.achievement_id == Achievement.id)
+        .outerjoin(
+            translation,
+            (translation.achievement_id == Achievement.id)
+            & (translation.language == User.language),
+        )
+        .outerjoin(
+            fallback,
+            (fallback.achievement_id == Achievement.id)
+            & (fallback.language == bindparam("default_language")),
+        )
+        .where(UserAchievement.user_id == User.id)
+        .order_by(UserAchievement.issued_at.desc(), UserAchievement.id.desc())
+    )
+    if keyset:
+        page = page.where(
+            tuple_(UserAchievement.issued_at, UserAchievement.id)
+            < tuple_(bindparam("after_issued_at"), bindparam("after_id"))
+        )
+    if paged:
+        page = page.limit(bindparam("limit"))
+    page = page.lateral("page")
+
+    return (
+        select(User.id.label("user_id"), *page.c)
+        .select_from(User)
+        .outerjoin(page, true())
+        .where(User.id == bindparam("user_id"))
+        .order_by(page.c.issued_at.desc(), page.c.user_achievement_id.desc())
+    )
 
-        achievements = [
-            UserAchievementRead(
-                achievement_id=row.id,
-                code=row.code,
-                name=row.name,
-                description=row.description,
-                points=row.points,
-                issued_at=row.issued_at.isoformat(),
-            )
-            for row in rows
-        ]
 
-        logger.info("Fetched %d achievements for user id=%s", len(achievements), user.id)
-        return user, achievements
+def _achievements_params(
+    user_id: int,
+    after: tuple[datetime, int] | None,
+    limit: int | None,
+) -> dict[str, Any]:
+    params: dict[str, Any] = {"user_id": user_id, "default_language": settings.default_language}
+    if after is not None:
+        params["after_issued_at"], params["after_id"] = after
+    if limit is not None:
+        params["limit"] = limit
+    return params
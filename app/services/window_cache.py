@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from time import monotonic
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+
+
+class WindowCache:
+    """
+    Кэш результатов запросов по скользящим окнам (лидерборды и сводки за
+    окно) в памяти процесса: LRU с ограничением по количеству записей, коротким
+    TTL и объединением одновременных промахов по одному ключу в одно
+    вычисление. Инвалидации нет: выдачи становятся видны не позже чем через TTL.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def get_or_compute[T](
+        self,
+        key: Hashable,
+        session_factory: async_sessionmaker[AsyncSession],
+        compute: Callable[[AsyncSession], Awaitable[T]],
+    ) -> T:
+        """
+        Получение результата из кэша или его вычисление при промахе.
+        Вычисление идёт в собственной сессии из session_factory, а не в сессии
+        запроса, поэтому отмена первого запроса не ломает общее вычисление
+        для остальных ожидающих.
+
+        :param key: Ключ результата (вид запроса и его параметры).
+        :param session_factory: Фабрика сессий для вычисления результата.
+        :param compute: Функция вычисления результата по сессии.
+        :return: Результат из кэша или только что вычисленный.
+        """
+        if self.ttl <= 0:
+            return await _run(session_factory, compute)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > monotonic():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute_and_store(key, session_factory, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _compute_and_store[T](
+        self,
+        key: Hashable,
+        session_factory: async_sessionmaker[AsyncSession],
+        compute: Callable[[AsyncSession], Awaitable[T]],
+    ) -> T:
+        value = await _run(session_factory, compute)
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+
+async def _run[T](
+    session_factory: async_sessionmaker[AsyncSession],
+    compute: Callable[[AsyncSession], Awaitable[T]],
+) -> T:
+    async with session_factory() as session:
+        return await compute(session)
+
+
+window_cache = WindowCache(
+    ttl=settings.window_cache_ttl,
+    max_entries=settings.window_cache_max_entries,
+)
@@ -0,0 +1,124 @@
+"""
+Замер задержки выдачи достижений одному горячему пользователю.
+
+Скрипт создаёт пользователя и --achievements достижений с уникальным
+префиксом и выдаёт их этому пользователю одиночными запросами с
+--concurrency одновременных запросов. Без полосатых счётчиков все выдачи
+обновляют одну строку users и одну строку user_daily_stats и ждут друг
+друга на блокировке строки; с USER_POINTS_STRIPES выдачи разных соединений
+пишут в разные полосы user_points_deltas.
+
+Режим счётчиков задаётся на сервере, поэтому для сравнения запускаются два
+экземпляра API на одной базе: без полос и с USER_POINTS_STRIPES=16.
+Для каждого адреса печатаются перцентили p50/p95/p99 задержки выдачи.
+
+Пример запуска:
+    uv run uvicorn app.main:app --port 8000
+    USER_POINTS_STRIPES=16 uv run uvicorn app.main:app --port 8001
+    uv run python -m bench.contention \\
+        --target baseline=http://localhost:8000 --target striped=http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any
+
+from httpx import AsyncClient
+
+from bench.report import emit, latency_summary
+
+
+async def create_fixtures(
+    client: AsyncClient, prefix: str, achievements: int
+) -> tuple[int, list[str]]:
+    """
+    Создание горячего пользователя и достижений для замера.
+
+    :param client: HTTP-клиент API.
+    :param prefix: Уникальный префикс имён и кодов.
+    :param achievements: Количество достижений.
+    :return: Кортеж из идентификатора пользователя и кодов достижений.
+    """
+    codes = [f"{prefix}_ach_{i}" for i in range(achievements)]
+    for code in codes:
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": 10,
+                "translations": [{"language": "en", "name": code, "description": code}],
+            },
+        )
+        resp.raise_for_status()
+
+    resp = await client.post("/api/v1/users", json={"username": f"{prefix}_hot", "language": "en"})
+    resp.raise_for_status()
+    return resp.json()["id"], codes
+
+
+async def run(
+    client: AsyncClient, user_id: int, codes: list[str], concurrency: int
+) -> dict[str, Any]:
+    """
+    Выдача всех достижений одному пользователю с ограниченной конкурентностью.
+
+    :param client: HTTP-клиент API.
+    :param user_id: Идентификатор горячего пользователя.
+    :param codes: Коды достижений.
+    :param concurrency: Количество одновременных запросов.
+    :return: Сводка по задержкам выдачи и итоговые очки пользователя.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: list[float] = []
+
+    async def grant(code: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            resp = await client.post(f"/api/v1/achievements/grant/{user_id}/{code}")
+            durations.append((time.perf_counter() - started) * 1000)
+            resp.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(grant(code) for code in codes))
+    elapsed = time.perf_counter() - started
+
+    resp = await client.get(f"/api/v1/users/{user_id}")
+    resp.raise_for_status()
+    return {
+        "seconds": round(elapsed, 3),
+        "grants": latency_summary(durations, elapsed),
+        "total_points": resp.json()["total_points"],
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    targets = dict(target.split("=", 1) for target in args.target or ["default=" + args.base_url])
+
+    results = {}
+    for name, base_url in targets.items():
+        prefix = f"hot_{uuid.uuid4().hex[:8]}"
+        async with AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+            user_id, codes = await create_fixtures(client, prefix, args.achievements)
+            results[name] = await run(client, user_id, codes, args.concurrency)
+        grants = results[name]["grants"]
+        print(f"{name}: p50 {grants['p50_ms']} ms, p99 {grants['p99_ms']} ms", flush=True)
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    emit("contention", {**params, "targets": targets}, results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grant latency for a single hot user.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--target",
+        action="append",
+        help="Named API instance as name=url; repeat to compare servers. Overrides --base-url.",
+    )
+    parser.add_argument("--achievements", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    asyncio.run(main(parser.parse_args()))
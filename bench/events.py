@@ -0,0 +1,170 @@
+"""
+Замер пропускной способности движка правил (событий в секунду).
+
+Скрипт работает с запущенным API: создаёт достижения с правилами
+threshold, count и streak на нескольких типах событий и пользователей с
+уникальным префиксом, отправляет случайные события пачками через
+POST /api/v1/events и печатает результат в JSON. Часть событий имеет тип
+без правил, чтобы учесть стоимость диспетчеризации по индексу правил.
+
+Пример запуска:
+    uv run python -m bench.events --base-url http://localhost:8000 --events 200000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from httpx import AsyncClient
+
+RULE_KINDS = (("threshold", 900), ("count", 500), ("streak", 5))
+
+
+async def create_fixtures(
+    client: AsyncClient,
+    prefix: str,
+    users: int,
+    event_types: int,
+) -> tuple[list[int], list[str]]:
+    """
+    Создание достижений с правилами и пользователей для замера. На каждый
+    тип событий создаётся по одному достижению на каждый вид правила.
+
+    :param client: HTTP-клиент API.
+    :param prefix: Уникальный префикс имён, кодов и типов событий.
+    :param users: Количество пользователей.
+    :param event_types: Количество типов событий с правилами.
+    :return: Кортеж из идентификаторов пользователей и типов событий.
+    """
+    types = [f"{prefix}_event_{i}" for i in range(event_types)]
+    for event_type in types:
+        for kind, target in RULE_KINDS:
+            code = f"{event_type}_{kind}"
+            resp = await client.post(
+                "/api/v1/achievements",
+                json={
+                    "code": code,
+                    "points": 10,
+                    "translations": [{"language": "en", "name": code, "description": code}],
+                    "rules": [{"event_type": event_type, "kind": kind, "target": target}],
+                },
+            )
+            resp.raise_for_status()
+
+    user_ids = []
+    for i in range(users):
+        resp = await client.post(
+            "/api/v1/users",
+            json={"username": f"{prefix}_user_{i}", "language": "en"},
+        )
+        resp.raise_for_status()
+        user_ids.append(resp.json()["id"])
+
+    return user_ids, types
+
+
+def generate_events(
+    rng: random.Random,
+    user_ids: list[int],
+    types: list[str],
+    count: int,
+    days: int,
+) -> list[dict]:
+    """
+    Генерация случайных событий. Десятая часть событий имеет тип без правил.
+
+    :param rng: Генератор случайных чисел.
+    :param user_ids: Идентификаторы пользователей.
+    :param types: Типы событий с правилами.
+    :param count: Количество событий.
+    :param days: Количество дней, по которым распределяются события.
+    :return: Тела событий.
+    """
+    start = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+    events = []
+    for _ in range(count):
+        event_type = rng.choice(types) if rng.random() < 0.9 else "bench_no_rules"
+        occurred_at = start + timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+        events.append(
+            {
+                "type": event_type,
+                "user_id": rng.choice(user_ids),
+                "value": rng.randint(1, 100),
+                "occurred_at": occurred_at.isoformat(),
+            }
+        )
+    return events
+
+
+async def run(
+    client: AsyncClient,
+    events: list[dict],
+    batch_size: int,
+    concurrency: int,
+) -> tuple[float, int]:
+    """
+    Отправка событий пачками с ограниченной конкурентностью.
+
+    :param client: HTTP-клиент API.
+    :param events: Тела событий.
+    :param batch_size: Количество событий в одном запросе.
+    :param concurrency: Количество одновременных запросов.
+    :return: Время выполнения в секундах и количество выданных достижений.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    granted = 0
+
+    async def send(batch: list[dict]) -> None:
+        nonlocal granted
+        async with semaphore:
+            resp = await client.post("/api/v1/events", json=batch)
+            resp.raise_for_status()
+            granted += len(resp.json()["granted"])
+
+    batches = [events[i : i + batch_size] for i in range(0, len(events), batch_size)]
+    started = time.perf_counter()
+    await asyncio.gather(*(send(batch) for batch in batches))
+    return time.perf_counter() - started, granted
+
+
+async def main(args: argparse.Namespace) -> None:
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+    rng = random.Random(args.seed)  # noqa: S311
+
+    async with AsyncClient(base_url=args.base_url, timeout=120.0) as client:
+        user_ids, types = await create_fixtures(client, prefix, args.users, args.event_types)
+        events = generate_events(rng, user_ids, types, args.events, args.days)
+        seconds, granted = await run(client, events, args.batch_size, args.concurrency)
+
+    print(
+        json.dumps(
+            {
+                "events": len(events),
+                "users": len(user_ids),
+                "rules": len(types) * len(RULE_KINDS),
+                "batch_size": args.batch_size,
+                "concurrency": args.concurrency,
+                "seconds": round(seconds, 3),
+                "events_per_second": round(len(events) / seconds, 1),
+                "granted": granted,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rules engine event throughput.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--event-types", type=int, default=10)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
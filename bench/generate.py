@@ -0,0 +1,252 @@
+"""
+Генератор объёмных данных для замеров производительности.
+
+Заполняет БД из DATABASE_URL синтетическими достижениями, пользователями и
+выданными достижениями через COPY (BulkImportService.copy_records) пачками
+ограниченного размера, поэтому потребление памяти не зависит от объёма.
+Активность пользователей и популярность достижений распределены по закону
+Ципфа, у части пользователей есть стрики из подряд идущих дней. После
+загрузки пересчитываются users.total_points, users.achievements_count,
+счётчики редкости и user_daily_stats.
+
+Генерация детерминирована при одинаковых параметрах и --seed.
+
+Пример запуска:
+    uv run python -m bench.generate --users 1000000 --grants 50000000 --truncate
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any
+
+from sqlalchemy import func, select, text
+
+from app.core.db import AsyncSessionFactory, engine
+from app.models.achievement import Achievement
+from app.models.achievement_translation import AchievementTranslation
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.services.bulk_import import DEFAULT_BATCH_SIZE, BulkImportService
+from app.services.daily_stats import DailyStatsService
+from bench.report import emit
+
+TABLES = (
+    "user_daily_stats",
+    "user_achievements",
+    "achievement_translations",
+    "achievements",
+    "users",
+    "user_count_stripes",
+)
+
+
+def zipf_weights(n: int, s: float) -> list[float]:
+    """
+    Веса рангов 1..n по закону Ципфа.
+
+    :param n: Количество рангов.
+    :param s: Показатель распределения.
+    :return: Список весов.
+    """
+    return [1 / rank**s for rank in range(1, n + 1)]
+
+
+class Generator:
+    """Детерминированный источник синтетических строк для всех таблиц."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)  # noqa: S311
+        self.today = date.today()
+
+        self.achievement_ids = list(range(1, args.achievements + 1))
+        popularity = self.achievement_ids.copy()
+        self.rng.shuffle(popularity)
+        self.popular_achievements = popularity
+        self.achievement_cum_weights = list(accumulate(zipf_weights(args.achievements, args.zipf)))
+        self.achievement_points = {
+            achievement_id: self.rng.choice((5, 10, 10, 20, 25, 50, 100))
+            for achievement_id in self.achievement_ids
+        }
+
+    def achievements(self) -> Iterator[tuple[Any, ...]]:
+        for achievement_id in self.achievement_ids:
+            yield achievement_id, f"bench_{achievement_id}", self.achievement_points[achievement_id]
+
+    def translations(self) -> Iterator[tuple[Any, ...]]:
+        for achievement_id in self.achievement_ids:
+            yield achievement_id, "EN", f"Achievement {achievement_id}", "Generated."
+            yield achievement_id, "RU", f"Достижение {achievement_id}", "Сгенерировано."
+
+    def users(self) -> Iterator[tuple[Any, ...]]:
+        created_at = datetime.combine(
+            self.today - timedelta(days=self.args.days), datetime.min.time()
+        )
+        for user_id in range(1, self.args.users + 1):
+            language = "RU" if self.rng.random() < 0.3 else "EN"
+            yield user_id, f"bench_user_{user_id}", language, 0, created_at
+
+    def grants_per_user(self) -> list[int]:
+        """
+        Количество выданных достижений у каждого пользователя: ранги
+        активности распределены по Ципфу и случайно назначены пользователям.
+
+        :return: Список длиной users, элемент i относится к пользователю i + 1.
+        """
+        args = self.args
+        weights = zipf_weights(args.users, args.zipf)
+        scale = args.grants / sum(weights)
+        self.rng.shuffle(weights)
+        return [
+            min(int(weight * scale + self.rng.random()), args.achievements) for weight in weights
+        ]
+
+    def grants(self, counts: list[int]) -> Iterator[tuple[Any, ...]]:
+        args = self.args
+        for user_id, count in enumerate(counts, start=1):
+            if count == 0:
+                continue
+
+            days_ago = self._issue_days(count)
+            for achievement_id, day_offset in zip(self._pick(count), days_ago, strict=True):
+                seconds = self.rng.randrange(86_400)
+                issued_at = datetime.combine(
+                    self.today - timedelta(days=day_offset), datetime.min.time()
+                ) + timedelta(seconds=seconds)
+                yield user_id, achievement_id, issued_at
+
+            if args.progress and user_id % args.progress == 0:
+                print(f"  generated grants for {user_id} users", flush=True)
+
+    def _pick(self, count: int) -> list[int]:
+        """
+        Выбор count различных достижений с учётом их популярности.
+        """
+        if count * 2 >= len(self.achievement_ids):
+            return self.rng.sample(self.achievement_ids, count)
+
+        picked: set[int] = set()
+        while len(picked) < count:
+            ranks = self.rng.choices(
+                range(len(self.popular_achievements)),
+                cum_weights=self.achievement_cum_weights,
+                k=(count - len(picked)) * 2,
+            )
+            for rank in ranks:
+                picked.add(self.popular_achievements[rank])
+                if len(picked) == count:
+                    break
+        return list(picked)
+
+    def _issue_days(self, count: int) -> list[int]:
+        """
+        Дни выдачи (сколько дней назад) для count достижений пользователя.
+        С вероятностью streak_share первые достижения образуют стрик.
+        """
+        args = self.args
+        days = [self.rng.randrange(args.days) for _ in range(count)]
+        if count >= 3 and self.rng.random() < args.streak_share:
+            length = min(count, self.rng.randint(3, args.max_streak))
+            end = self.rng.randrange(min(args.days - length, 14) + 1)
+            days[:length] = range(end, end + length)
+        return days
+
+
+async def main(args: argparse.Namespace) -> None:
+    generator = Generator(args)
+    phases: dict[str, dict[str, Any]] = {}
+
+    async def phase(name: str, coro: Any) -> Any:
+        started = time.perf_counter()
+        rows = await coro
+        seconds = time.perf_counter() - started
+        phases[name] = {"rows": rows, "seconds": round(seconds, 3)}
+        if seconds > 0:
+            phases[name]["rows_per_second"] = round(rows / seconds)
+        print(f"{name}: {rows} rows in {seconds:.1f}s", flush=True)
+        return rows
+
+    async with AsyncSessionFactory() as session:
+        if await session.scalar(select(func.count(User.id))) and not args.truncate:
+            raise SystemExit("Database is not empty, pass --truncate to replace its data")
+        await session.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+        await session.commit()
+
+        importer = BulkImportService(session, batch_size=args.batch_size)
+        await phase(
+            "achievements",
+            importer.copy_records(
+                Achievement.__table__, ["id", "code", "points"], generator.achievements()
+            ),
+        )
+        await phase(
+            "achievement_translations",
+            importer.copy_records(
+                AchievementTranslation.__table__,
+                ["achievement_id", "language", "name", "description"],
+                generator.translations(),
+            ),
+        )
+        await phase(
+            "users",
+            importer.copy_records(
+                User.__table__,
+                ["id", "username", "language", "total_points", "created_at"],
+                generator.users(),
+            ),
+        )
+        counts = generator.grants_per_user()
+        await phase(
+            "user_achievements",
+            importer.copy_records(
+                UserAchievement.__table__,
+                ["user_id", "achievement_id", "issued_at"],
+                generator.grants(counts),
+            ),
+        )
+
+        for table in (User.__table__, Achievement.__table__):
+            sequence = func.pg_get_serial_sequence(table.name, "id")
+            await session.execute(select(func.setval(sequence, func.max(table.c.id))))
+        await session.commit()
+
+        await phase("user_totals", importer.recompute_user_totals(args.chunk_size))
+        await phase("counters", importer.recompute_counters())
+        await phase("user_daily_stats", DailyStatsService(session).rebuild(args.chunk_size))
+
+        started = time.perf_counter()
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+        phases["analyze"] = {"seconds": round(time.perf_counter() - started, 3)}
+
+    await engine.dispose()
+
+    emit(
+        "generate",
+        {key: value for key, value in vars(args).items() if key not in {"output", "progress"}},
+        phases,
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic benchmark data via COPY.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--achievements", type=int, default=500)
+    parser.add_argument("--grants", type=int, default=2_000_000, help="Target number of grants.")
+    parser.add_argument("--days", type=int, default=365, help="History length in days.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for activity.")
+    parser.add_argument("--streak-share", type=float, default=0.05)
+    parser.add_argument("--max-streak", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Users per recompute chunk.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Replace existing data.")
+    parser.add_argument("--progress", type=int, default=0, help="Log every N users.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,156 @@
+"""
+Сравнение пропускной способности одиночной и пакетной выдачи достижений.
+
+Скрипт работает с запущенным API: создаёт пользователей и достижения с
+уникальным префиксом, выдаёт одинаковое количество достижений через
+POST /api/v1/achievements/grant/{user_id}/{code} и через
+POST /api/v1/achievements/grant:batch и печатает результат в JSON.
+
+Пример запуска:
+    uv run python -m bench.grant_throughput --base-url http://localhost:8000 --users 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from httpx import AsyncClient
+
+
+async def create_fixtures(
+    client: AsyncClient,
+    prefix: str,
+    users: int,
+    achievements: int,
+) -> tuple[list[int], list[str]]:
+    """
+    Создание пользователей и достижений для замера.
+
+    :param client: HTTP-клиент API.
+    :param prefix: Уникальный префикс имён и кодов.
+    :param users: Количество пользователей.
+    :param achievements: Количество достижений.
+    :return: Кортеж из идентификаторов пользователей и кодов достижений.
+    """
+    codes = [f"{prefix}_ach_{i}" for i in range(achievements)]
+    for code in codes:
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": 10,
+                "translations": [{"language": "en", "name": code, "description": code}],
+            },
+        )
+        resp.raise_for_status()
+
+    user_ids = []
+    for i in range(users):
+        resp = await client.post(
+            "/api/v1/users",
+            json={"username": f"{prefix}_user_{i}", "language": "en"},
+        )
+        resp.raise_for_status()
+        user_ids.append(resp.json()["id"])
+
+    return user_ids, codes
+
+
+async def run_single(
+    client: AsyncClient,
+    pairs: list[tuple[int, str]],
+    concurrency: int,
+) -> float:
+    """
+    Выдача достижений по одному на запрос с ограниченной конкурентностью.
+
+    :param client: HTTP-клиент API.
+    :param pairs: Пары (пользователь, код достижения).
+    :param concurrency: Количество одновременных запросов.
+    :return: Время выполнения в секундах.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def grant(user_id: int, code: str) -> None:
+        async with semaphore:
+            resp = await client.post(f"/api/v1/achievements/grant/{user_id}/{code}")
+            resp.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(grant(user_id, code) for user_id, code in pairs))
+    return time.perf_counter() - started
+
+
+async def run_batch(
+    client: AsyncClient,
+    pairs: list[tuple[int, str]],
+    batch_size: int,
+    concurrency: int,
+) -> float:
+    """
+    Выдача достижений пакетами через grant:batch.
+
+    :param client: HTTP-клиент API.
+    :param pairs: Пары (пользователь, код достижения).
+    :param batch_size: Размер одного пакета.
+    :param concurrency: Количество одновременных запросов.
+    :return: Время выполнения в секундах.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def grant(batch: list[tuple[int, str]]) -> None:
+        async with semaphore:
+            resp = await client.post(
+                "/api/v1/achievements/grant:batch",
+                json=[{"user_id": user_id, "code": code} for user_id, code in batch],
+            )
+            resp.raise_for_status()
+
+    batches = [pairs[i : i + batch_size] for i in range(0, len(pairs), batch_size)]
+    started = time.perf_counter()
+    await asyncio.gather(*(grant(batch) for batch in batches))
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+
+    async with AsyncClient(base_url=args.base_url, timeout=60.0) as client:
+        user_ids, codes = await create_fixtures(client, prefix, args.users * 2, args.achievements)
+        single_users, batch_users = user_ids[: args.users], user_ids[args.users :]
+
+        single_pairs = [(user_id, code) for user_id in single_users for code in codes]
+        batch_pairs = [(user_id, code) for user_id in batch_users for code in codes]
+
+        single_seconds = await run_single(client, single_pairs, args.concurrency)
+        batch_seconds = await run_batch(client, batch_pairs, args.batch_size, args.concurrency)
+
+    print(
+        json.dumps(
+            {
+                "grants": len(single_pairs),
+                "single": {
+                    "seconds": round(single_seconds, 3),
+                    "grants_per_second": round(len(single_pairs) / single_seconds, 1),
+                },
+                "batch": {
+                    "batch_size": args.batch_size,
+                    "seconds": round(batch_seconds, 3),
+                    "grants_per_second": round(len(batch_pairs) / batch_seconds, 1),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single vs batch grant throughput.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--achievements", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
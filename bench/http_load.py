@@ -0,0 +1,193 @@
+"""
+Нагрузочный профиль HTTP API по закрытому циклу.
+
+Заданное количество виртуальных клиентов в течение --duration секунд
+выполняют запросы без пауз: каждый следующий запрос отправляется после
+получения ответа на предыдущий, а операция выбирается случайно по весам
+смеси. Смеси:
+    grant-heavy    — в основном выдача достижений;
+    read-heavy     — в основном чтение достижений пользователя и каталога;
+    stats-polling  — частый опрос /stats на фоне чтений и выдач.
+
+Для выдачи скрипт создаёт собственных пользователей с уникальным префиксом
+и использует коды из каталога. Чтение достижений идёт по этим
+пользователям или, если задан --read-user-ids, по идентификаторам
+1..N из данных bench.generate. Повторная выдача (409) и приём выдачи в
+очередь отложенной записи (202, при GRANT_QUEUE_ENABLED) считаются
+ожидаемыми ответами. Для каждой операции и для смеси в целом печатаются пропускная
+способность и перцентили p50/p95/p99 в JSON.
+
+Пример запуска:
+    uv run python -m bench.http_load --mix all --clients 32 --duration 30
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from httpx import AsyncClient, Response
+
+from bench.report import emit, latency_summary
+
+MIXES: dict[str, dict[str, float]] = {
+    "grant-heavy": {"grant": 0.7, "user_achievements": 0.2, "catalog": 0.1},
+    "read-heavy": {"user_achievements": 0.6, "catalog": 0.25, "user": 0.1, "grant": 0.05},
+    "stats-polling": {"stats": 0.4, "user_achievements": 0.4, "grant": 0.2},
+}
+
+EXPECTED_STATUSES = {200, 201, 202, 409}
+
+
+class Workload:
+    """Операции нагрузочного профиля поверх общего HTTP-клиента."""
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        user_ids: list[int],
+        read_user_ids: range | list[int],
+        codes: list[str],
+        rng: random.Random,
+    ) -> None:
+        self.client = client
+        self.user_ids = user_ids
+        self.read_user_ids = read_user_ids
+        self.codes = codes
+        self.rng = rng
+        self.operations: dict[str, Callable[[], Awaitable[Response]]] = {
+            "grant": self.grant,
+            "user_achievements": self.user_achievements,
+            "user": self.user,
+            "catalog": self.catalog,
+            "stats": self.stats,
+        }
+
+    def grant(self) -> Awaitable[Response]:
+        user_id = self.rng.choice(self.user_ids)
+        code = self.rng.choice(self.codes)
+        return self.client.post(f"/api/v1/achievements/grant/{user_id}/{code}")
+
+    def user_achievements(self) -> Awaitable[Response]:
+        user_id = self.rng.choice(self.read_user_ids)
+        return self.client.get(f"/api/v1/users/{user_id}/achievements", params={"limit": 50})
+
+    def user(self) -> Awaitable[Response]:
+        return self.client.get(f"/api/v1/users/{self.rng.choice(self.read_user_ids)}")
+
+    def catalog(self) -> Awaitable[Response]:
+        return self.client.get("/api/v1/achievements")
+
+    def stats(self) -> Awaitable[Response]:
+        return self.client.get("/api/v1/stats")
+
+
+async def create_users(client: AsyncClient, prefix: str, count: int) -> list[int]:
+    """
+    Создание пользователей, которым выдаются достижения во время замера.
+
+    :param client: HTTP-клиент API.
+    :param prefix: Уникальный префикс имён.
+    :param count: Количество пользователей.
+    :return: Идентификаторы созданных пользователей.
+    """
+    user_ids = []
+    for i in range(count):
+        resp = await client.post(
+            "/api/v1/users", json={"username": f"{prefix}_user_{i}", "language": "en"}
+        )
+        resp.raise_for_status()
+        user_ids.append(resp.json()["id"])
+    return user_ids
+
+
+async def run_mix(
+    workload: Workload, mix: dict[str, float], clients: int, duration: float
+) -> dict[str, Any]:
+    """
+    Прогон одной смеси операций.
+
+    :param workload: Операции профиля.
+    :param mix: Веса операций.
+    :param clients: Количество одновременных клиентов.
+    :param duration: Длительность замера в секундах.
+    :return: Сводка по каждой операции и по смеси в целом.
+    """
+    names = list(mix)
+    weights = list(mix.values())
+    durations: dict[str, list[float]] = defaultdict(list)
+    unexpected: dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def client_loop() -> None:
+        while time.perf_counter() < deadline:
+            name = workload.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            resp = await workload.operations[name]()
+            durations[name].append((time.perf_counter() - started) * 1000)
+            if resp.status_code not in EXPECTED_STATUSES:
+                unexpected[f"{name}:{resp.status_code}"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "seconds": round(elapsed, 3),
+        "total": latency_summary(
+            [value for values in durations.values() for value in values], elapsed
+        ),
+        "operations": {
+            name: latency_summary(values, elapsed) for name, values in durations.items()
+        },
+        "unexpected_statuses": dict(unexpected),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    mixes = MIXES if args.mix == "all" else {args.mix: MIXES[args.mix]}
+    prefix = f"load_{uuid.uuid4().hex[:8]}"
+    rng = random.Random(args.seed)  # noqa: S311
+
+    async with AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        resp = await client.get("/api/v1/achievements")
+        resp.raise_for_status()
+        codes = [achievement["code"] for achievement in resp.json()]
+        if not codes:
+            raise SystemExit("Achievement catalog is empty, seed the database first")
+
+        user_ids = await create_users(client, prefix, args.users)
+        read_user_ids = range(1, args.read_user_ids + 1) if args.read_user_ids else user_ids
+        workload = Workload(client, user_ids, read_user_ids, codes, rng)
+
+        results = {}
+        for name, mix in mixes.items():
+            results[name] = await run_mix(workload, mix, args.clients, args.duration)
+            total = results[name]["total"]
+            print(
+                f"{name}: {total.get('per_second')} req/s, p99 {total.get('p99_ms')} ms",
+                flush=True,
+            )
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    emit("http_load", {**params, "mixes": mixes}, results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed-loop HTTP load profile.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mix", choices=["all", *MIXES], default="all")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per mix.")
+    parser.add_argument("--users", type=int, default=200, help="Users created for grants.")
+    parser.add_argument(
+        "--read-user-ids", type=int, default=0, help="Read users 1..N instead of created ones."
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    asyncio.run(main(parser.parse_args()))
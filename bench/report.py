@@ -0,0 +1,94 @@
+"""
+Общие функции замеров: перцентили задержек и вывод результата в JSON
+с метаданными запуска, чтобы результаты можно было сравнивать между
+коммитами.
+"""
+
+import json
+import math
+import platform
+import subprocess
+import sys
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+
+def latency_summary(durations_ms: Sequence[float], seconds: float | None = None) -> dict[str, Any]:
+    """
+    Сводка по задержкам: количество, среднее и перцентили p50/p95/p99.
+
+    :param durations_ms: Задержки отдельных операций в миллисекундах.
+    :param seconds: Общее время замера; если задано, добавляется пропускная способность.
+    :return: Словарь со сводкой.
+    """
+    values = sorted(durations_ms)
+    summary: dict[str, Any] = {"count": len(values)}
+    if values:
+        summary.update(
+            {
+                "mean_ms": round(sum(values) / len(values), 3),
+                "min_ms": round(values[0], 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+            }
+        )
+    if seconds:
+        summary["per_second"] = round(len(values) / seconds, 1)
+    return summary
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга.
+
+    :param sorted_values: Отсортированные значения.
+    :param q: Перцентиль от 0 до 100.
+    :return: Значение перцентиля.
+    """
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def run_metadata() -> dict[str, Any]:
+    """
+    Метаданные запуска: коммит, время и окружение.
+
+    :return: Словарь с метаданными.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "started_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "argv": sys.argv[1:],
+    }
+
+
+def emit(name: str, params: dict[str, Any], results: dict[str, Any], output: str | None) -> None:
+    """
+    Печать результата замера в stdout и, если указан путь, запись в файл.
+
+    :param name: Имя замера.
+    :param params: Параметры запуска.
+    :param results: Результаты.
+    :param output: Путь к JSON-файлу или None.
+    :return: None.
+    """
+    document = {"benchmark": name, **run_metadata(), "params": params, "results": results}
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
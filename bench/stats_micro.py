@@ -0,0 +1,115 @@
+"""
+Микро-замеры методов сервисов без HTTP-слоя.
+
+Каждый метод StatsService (по отдельности, а также summary в
+последовательном и параллельном режимах), выборка достижений пользователя
+и список каталога вызываются заданное количество раз, каждый вызов в своей
+сессии, как в обработчике запроса. Скрипт работает напрямую с БД из
+DATABASE_URL; для представительных цифр её стоит заполнить через
+bench.generate. Результат печатается в JSON с перцентилями задержек.
+
+Пример запуска:
+    uv run python -m bench.stats_micro --iterations 50 --output stats.json
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionFactory, engine
+from app.models.user_achievement import UserAchievement
+from app.services.achievements import AchievementService
+from app.services.stats import StatsService
+from app.services.users import UserService
+from bench.report import emit, latency_summary
+
+Case = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def build_cases(user_ids: list[int], page_size: int, seed: int) -> dict[str, Case]:
+    """
+    Набор замеряемых вызовов.
+
+    :param user_ids: Пользователи с достижениями для выборки по пользователю.
+    :param page_size: Размер страницы достижений пользователя.
+    :param seed: Зерно выбора пользователей.
+    :return: Словарь имя замера → вызов, принимающий сессию.
+    """
+    rng = random.Random(seed)  # noqa: S311
+
+    return {
+        "stats.user_with_max_achievements": lambda s: StatsService(s).user_with_max_achievements(),
+        "stats.user_with_max_points": lambda s: StatsService(s).user_with_max_points(),
+        "stats.max_min_points_diff": lambda s: StatsService(s).max_min_points_diff(),
+        "stats.users_with_7day_streak": lambda s: StatsService(s).users_with_7day_streak(),
+        "stats.summary.serial": lambda s: StatsService(s).summary(),
+        "stats.summary.parallel": lambda s: StatsService(s, AsyncSessionFactory).summary(),
+        "users.get_user_achievements.page": lambda s: UserService(s).get_user_achievements(
+            rng.choice(user_ids), limit=page_size
+        ),
+        "users.get_user_achievements.full": lambda s: UserService(s).get_user_achievements(
+            rng.choice(user_ids)
+        ),
+        "achievements.catalog_listing": lambda s: AchievementService(s).catalog_listing(),
+    }
+
+
+async def measure(case: Case, iterations: int) -> dict[str, Any]:
+    durations: list[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        async with AsyncSessionFactory() as session:
+            call_started = time.perf_counter()
+            await case(session)
+            durations.append((time.perf_counter() - call_started) * 1000)
+    return latency_summary(durations, time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with AsyncSessionFactory() as session:
+        user_ids = list(
+            (
+                await session.execute(
+                    select(UserAchievement.user_id)
+                    .group_by(UserAchievement.user_id)
+                    .order_by(func.count().desc())
+                    .limit(args.users)
+                )
+            ).scalars()
+        )
+    if not user_ids:
+        raise SystemExit("No users with achievements found, seed the database first")
+
+    cases = build_cases(user_ids, args.page_size, args.seed)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if args.only in name}
+
+    results: dict[str, Any] = {}
+    try:
+        for name, case in cases.items():
+            await measure(case, args.warmup)
+            results[name] = await measure(case, args.iterations)
+            print(f"{name}: p50 {results[name]['p50_ms']} ms", flush=True)
+    finally:
+        await engine.dispose()
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    emit("stats_micro", params, results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service-level micro-benchmarks.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--users", type=int, default=1000, help="Most active users to sample.")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Run only cases whose name contains this substring.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,159 @@
+"""
+Сравнение прежней и текущей выборки достижений пользователя.
+
+Прежняя реализация сначала загружала пользователя (чтобы узнать его язык),
+затем выполняла отдельный запрос достижений. Текущая реализация
+UserService.get_user_achievements делает это одним запросом. Скрипт работает
+напрямую с БД из DATABASE_URL, выбирает пользователей с достижениями,
+считает количество выполненных SQL-операторов (round-trip'ов) и время на
+один вызов для обоих вариантов и печатает результат в JSON.
+
+Пример запуска:
+    uv run python -m bench.user_achievements_fetch --users 200 --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionFactory, engine
+from app.models.achievement import Achievement
+from app.models.achievement_translation import AchievementTranslation
+from app.models.user import User
+from app.models.user_achievement import UserAchievement
+from app.services.users import UserService
+
+
+class StatementCounter:
+    """Счётчик SQL-операторов, отправленных движком в БД."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *_: object) -> None:
+        self.count += 1
+
+
+async def legacy_fetch(session: AsyncSession, user_id: int) -> int:
+    """
+    Прежний вариант: запрос пользователя и отдельный запрос достижений.
+
+    :param session: Асинхронная сессия SQLAlchemy.
+    :param user_id: Идентификатор пользователя.
+    :return: Количество полученных достижений.
+    """
+    user = (await session.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if user is None:
+        return 0
+
+    stmt = (
+        select(
+            UserAchievement.issued_at,
+            Achievement.id,
+            Achievement.code,
+            Achievement.points,
+            AchievementTranslation.name,
+            AchievementTranslation.description,
+        )
+        .join(Achievement, UserAchievement.achievement_id == Achievement.id)
+        .join(
+            AchievementTranslation,
+            (AchievementTranslation.achievement_id == Achievement.id)
+            & (AchievementTranslation.language == user.language),
+        )
+        .where(UserAchievement.user_id == user.id)
+        .order_by(UserAchievement.issued_at.desc())
+    )
+    return len((await session.execute(stmt)).all())
+
+
+async def current_fetch(session: AsyncSession, user_id: int) -> int:
+    """
+    Текущий вариант через UserService.get_user_achievements.
+
+    :param session: Асинхронная сессия SQLAlchemy.
+    :param user_id: Идентификатор пользователя.
+    :return: Количество полученных достижений.
+    """
+    page = await UserService(session).get_user_achievements(user_id)
+    return 0 if page is None else len(page[0])
+
+
+async def measure(
+    fetch: Callable[[AsyncSession, int], Awaitable[int]],
+    user_ids: list[int],
+    rounds: int,
+    counter: StatementCounter,
+) -> dict[str, float]:
+    """
+    Замер одного варианта выборки: каждый вызов выполняется в своей сессии,
+    как в обработчике запроса.
+
+    :param fetch: Функция выборки.
+    :param user_ids: Идентификаторы пользователей.
+    :param rounds: Количество проходов по списку пользователей.
+    :param counter: Счётчик SQL-операторов.
+    :return: Количество операторов на вызов и задержки в миллисекундах.
+    """
+    durations: list[float] = []
+    counter.count = 0
+
+    for _ in range(rounds):
+        for user_id in user_ids:
+            async with AsyncSessionFactory() as session:
+                started = time.perf_counter()
+                await fetch(session, user_id)
+                durations.append((time.perf_counter() - started) * 1000)
+
+    durations.sort()
+    return {
+        "calls": len(durations),
+        "statements_per_call": round(counter.count / len(durations), 2),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "p50_ms": round(durations[len(durations) // 2], 3),
+        "p95_ms": round(durations[int(len(durations) * 0.95)], 3),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with AsyncSessionFactory() as session:
+        user_ids = list(
+            (
+                await session.execute(
+                    select(UserAchievement.user_id)
+                    .group_by(UserAchievement.user_id)
+                    .order_by(func.count().desc())
+                    .limit(args.users)
+                )
+            ).scalars()
+        )
+    if not user_ids:
+        raise SystemExit("No users with achievements found, seed the database first")
+
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        # Прогрев пула соединений и кэша компиляции.
+        await measure(current_fetch, user_ids[:10], 1, counter)
+        await measure(legacy_fetch, user_ids[:10], 1, counter)
+
+        legacy = await measure(legacy_fetch, user_ids, args.rounds, counter)
+        current = await measure(current_fetch, user_ids, args.rounds, counter)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+        await engine.dispose()
+
+    print(json.dumps({"users": len(user_ids), "legacy": legacy, "current": current}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="User achievements fetch round-trips.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
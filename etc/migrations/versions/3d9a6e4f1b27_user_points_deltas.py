@@ -0,0 +1,44 @@
+"""user points deltas
+
+Revision ID: 3d9a6e4f1b27
+Revises: 8f3b5d2c7e90
+Create Date: 2026-10-18 01:12:40.218634
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3d9a6e4f1b27"
+down_revision: str | Sequence[str] | None = "8f3b5d2c7e90"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_points_deltas",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("stripe", sa.SmallInteger(), nullable=False),
+        sa.Column("points", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("achievements_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "achievement_bits",
+            postgresql.BIT(varying=True),
+            server_default=sa.text("''::bit varying"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day", "stripe"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_points_deltas")
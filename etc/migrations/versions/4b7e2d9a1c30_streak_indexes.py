@@ -0,0 +1,45 @@
+"""streak indexes
+
+Revision ID: 4b7e2d9a1c30
+Revises: c63225e3ea6b
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e2d9a1c30"
+down_revision: str | Sequence[str] | None = "c63225e3ea6b"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Составной индекс покрывает выборки (user_id, issued_at) при пересчёте
+    # user_daily_stats и заменяет одиночный индекс по user_id.
+    op.create_index(
+        "ix_user_achievements_user_id_issued_at",
+        "user_achievements",
+        ["user_id", "issued_at"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_user_achievements_user_id"), table_name="user_achievements")
+
+    # Уникальный индекс uq_user_day (user_id, day) является покрывающим для
+    # расчёта стриков; одиночный индекс по user_id избыточен.
+    op.drop_index(op.f("ix_user_daily_stats_user_id"), table_name="user_daily_stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_user_daily_stats_user_id"), "user_daily_stats", ["user_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_user_achievements_user_id"), "user_achievements", ["user_id"], unique=False
+    )
+    op.drop_index("ix_user_achievements_user_id_issued_at", table_name="user_achievements")
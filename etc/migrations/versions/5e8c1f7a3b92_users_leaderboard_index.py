@@ -0,0 +1,35 @@
+"""users leaderboard index
+
+Revision ID: 5e8c1f7a3b92
+Revises: 9d3f6a2b8e14
+Create Date: 2026-10-18 14:12:36.504117
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8c1f7a3b92"
+down_revision: str | Sequence[str] | None = "9d3f6a2b8e14"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Порядок индекса повторяет порядок лидерборда (total_points DESC, id),
+    # поэтому страница и лидер читаются проходом по индексу без сортировки.
+    op.create_index(
+        "ix_users_total_points_id",
+        "users",
+        [sa.text("total_points DESC"), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_total_points_id", table_name="users")
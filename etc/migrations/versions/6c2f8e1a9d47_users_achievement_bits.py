@@ -0,0 +1,58 @@
+"""users achievement bits
+
+Revision ID: 6c2f8e1a9d47
+Revises: e4a7c2b9d153
+Create Date: 2026-10-18 22:41:19.086214
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "6c2f8e1a9d47"
+down_revision: str | Sequence[str] | None = "e4a7c2b9d153"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "achievement_bits",
+            postgresql.BIT(varying=True),
+            server_default=sa.text("''::bit varying"),
+            nullable=False,
+        ),
+    )
+    # Маска каждой выдачи дополняется нулями до наибольшего выданного
+    # пользователю идентификатора, поэтому маски одного пользователя имеют
+    # одну длину и объединяются агрегатом bit_or.
+    op.execute(
+        """
+        UPDATE users
+        SET achievement_bits = masks.bits
+        FROM (
+            SELECT user_id, bit_or(set_bit(repeat('0', max_id + 1)::varbit, achievement_id, 1)) AS bits
+            FROM (
+                SELECT
+                    user_id,
+                    achievement_id,
+                    max(achievement_id) OVER (PARTITION BY user_id) AS max_id
+                FROM user_achievements
+            ) AS grants
+            GROUP BY user_id
+        ) AS masks
+        WHERE users.id = masks.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "achievement_bits")
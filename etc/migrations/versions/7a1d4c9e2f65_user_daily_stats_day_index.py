@@ -0,0 +1,34 @@
+"""user daily stats day index
+
+Revision ID: 7a1d4c9e2f65
+Revises: 5e8c1f7a3b92
+Create Date: 2026-10-18 16:40:12.208531
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7a1d4c9e2f65"
+down_revision: str | Sequence[str] | None = "5e8c1f7a3b92"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Суммы очков за скользящее окно читают диапазон дней целиком из индекса
+    # (index-only scan), не обращаясь к строкам за всю историю.
+    op.create_index(
+        "ix_user_daily_stats_day_user_id_points",
+        "user_daily_stats",
+        ["day", "user_id", "points"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_user_daily_stats_day_user_id_points", table_name="user_daily_stats")
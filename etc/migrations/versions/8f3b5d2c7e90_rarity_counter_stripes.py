@@ -0,0 +1,53 @@
+"""rarity counter stripes
+
+Revision ID: 8f3b5d2c7e90
+Revises: 6c2f8e1a9d47
+Create Date: 2026-10-18 23:37:52.604118
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8f3b5d2c7e90"
+down_revision: str | Sequence[str] | None = "6c2f8e1a9d47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "achievement_unlock_stripes",
+        sa.Column("achievement_id", sa.Integer(), nullable=False),
+        sa.Column("stripe", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["achievement_id"], ["achievements.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("achievement_id", "stripe"),
+    )
+    op.create_table(
+        "user_count_stripes",
+        sa.Column("stripe", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("stripe"),
+    )
+    # Начальные значения пишутся в полосу 0; дальше выдачи и создание
+    # пользователей распределяются по полосам.
+    op.execute(
+        """
+        INSERT INTO achievement_unlock_stripes (achievement_id, stripe, count)
+        SELECT achievement_id, 0, count(*)
+        FROM user_achievements
+        GROUP BY achievement_id
+        """
+    )
+    op.execute("INSERT INTO user_count_stripes (stripe, count) SELECT 0, count(*) FROM users")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_count_stripes")
+    op.drop_table("achievement_unlock_stripes")
@@ -0,0 +1,44 @@
+"""user achievements keyset index
+
+Revision ID: 9d3f6a2b8e14
+Revises: 4b7e2d9a1c30
+Create Date: 2026-10-18 09:41:07.218664
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3f6a2b8e14"
+down_revision: str | Sequence[str] | None = "4b7e2d9a1c30"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Порядок индекса повторяет порядок keyset-пагинации (issued_at DESC, id DESC),
+    # поэтому страница читается одним проходом по индексу без сортировки.
+    # Префикс (user_id, issued_at) по-прежнему обслуживает пересчёт
+    # user_daily_stats, так что прежний индекс больше не нужен.
+    op.create_index(
+        "ix_user_achievements_user_id_issued_at_id",
+        "user_achievements",
+        ["user_id", sa.text("issued_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.drop_index("ix_user_achievements_user_id_issued_at", table_name="user_achievements")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_user_achievements_user_id_issued_at",
+        "user_achievements",
+        ["user_id", "issued_at"],
+        unique=False,
+    )
+    op.drop_index("ix_user_achievements_user_id_issued_at_id", table_name="user_achievements")
@@ -0,0 +1,54 @@
+"""users achievements count
+
+Revision ID: b3e9f2d6c418
+Revises: 7a1d4c9e2f65
+Create Date: 2026-10-18 18:05:47.913260
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e9f2d6c418"
+down_revision: str | Sequence[str] | None = "7a1d4c9e2f65"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("achievements_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # Заполнение по журналу выдач одним проходом агрегации; пользователи
+    # без выдач сохраняют ноль из server_default.
+    op.execute(
+        """
+        UPDATE users
+        SET achievements_count = counts.achievements_count
+        FROM (
+            SELECT user_id, count(*) AS achievements_count
+            FROM user_achievements
+            GROUP BY user_id
+        ) AS counts
+        WHERE users.id = counts.user_id
+        """
+    )
+    # Порядок индекса повторяет порядок выбора лидера по количеству
+    # достижений (achievements_count DESC, id).
+    op.create_index(
+        "ix_users_achievements_count_id",
+        "users",
+        [sa.text("achievements_count DESC"), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_achievements_count_id", table_name="users")
+    op.drop_column("users", "achievements_count")
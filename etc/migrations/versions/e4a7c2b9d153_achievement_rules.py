@@ -0,0 +1,61 @@
+"""achievement rules
+
+Revision ID: e4a7c2b9d153
+Revises: b3e9f2d6c418
+Create Date: 2026-10-18 21:14:06.527341
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a7c2b9d153"
+down_revision: str | Sequence[str] | None = "b3e9f2d6c418"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "achievement_rules",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("achievement_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=64), nullable=False),
+        sa.Column(
+            "kind",
+            postgresql.ENUM("THRESHOLD", "COUNT", "STREAK", name="rule_kind_enum"),
+            nullable=False,
+        ),
+        sa.Column("target", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["achievement_id"], ["achievements.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_achievement_rules_achievement_id"),
+        "achievement_rules",
+        ["achievement_id"],
+        unique=False,
+    )
+    op.create_table(
+        "rule_progress",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("rule_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("last_day", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(["rule_id"], ["achievement_rules.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "rule_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rule_progress")
+    op.drop_index(op.f("ix_achievement_rules_achievement_id"), table_name="achievement_rules")
+    op.drop_table("achievement_rules")
+    postgresql.ENUM(name="rule_kind_enum").drop(op.get_bind())
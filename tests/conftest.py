@@ -7,6 +7,9 @@ from collections.abc import AsyncIterator, Generator
 import pytest
 from fastapi import status
 from httpx import AsyncClient, ConnectError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionFactory, engine
 
 
 @pytest.fixture(scope="function")
@@ -33,6 +36,19 @@ async def client() -> AsyncIterator[AsyncClient]:
         yield async_client
 
 
+@pytest.fixture(scope="function")
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия БД для тестов, работающих с сервисами напрямую. Каждый тест
+    выполняется в своём цикле событий, поэтому после теста пул соединений
+    закрывается, чтобы следующий тест не получил соединение чужого цикла.
+    """
+    async with AsyncSessionFactory() as session:
+        yield session
+
+    await engine.dispose()
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     """
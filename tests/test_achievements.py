@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import status
 from httpx import AsyncClient
 
@@ -76,3 +78,164 @@ async def test_grant_achievement_to_user(client: AsyncClient) -> None:
     assert grant_data["status"] == "ok"
     assert grant_data["user_id"] == user_id
     assert isinstance(grant_data["achievement_id"], int)
+
+
+async def test_concurrent_grants_do_not_lose_points(client: AsyncClient) -> None:
+    """
+    Проверяет, что одновременная выдача разных достижений одному пользователю
+    (в том числе повторные выдачи одного и того же) не теряет начисления
+    очков и не начисляет очки дважды.
+    """
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": "concurrent_user", "language": Language.EN.value},
+    )
+    assert user_resp.status_code == status.HTTP_201_CREATED
+    user_id: int = user_resp.json()["id"]
+
+    codes = [f"concurrent_{i}" for i in range(1, 11)]
+    for points, code in enumerate(codes, start=1):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    responses = await asyncio.gather(
+        *(client.post(f"/api/v1/achievements/grant/{user_id}/{code}") for code in codes * 3)
+    )
+    assert all(resp.status_code == status.HTTP_201_CREATED for resp in responses)
+
+    user_data = (await client.get(f"/api/v1/users/{user_id}")).json()
+    assert user_data["total_points"] == sum(range(1, 11))
+
+    achievements = (await client.get(f"/api/v1/users/{user_id}/achievements")).json()
+    assert len(achievements) == len(codes)
+
+
+async def test_grant_unknown_user_or_code(client: AsyncClient) -> None:
+    """
+    Проверяет, что выдача несуществующего достижения или выдача
+    несуществующему пользователю возвращает 404.
+    """
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": "grant_404_user", "language": Language.EN.value},
+    )
+    user_id: int = user_resp.json()["id"]
+
+    resp = await client.post(f"/api/v1/achievements/grant/{user_id}/no_such_code")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    resp = await client.post("/api/v1/achievements/grant/999999/grant_ach")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_grant_batch(client: AsyncClient) -> None:
+    """
+    Проверяет пакетную выдачу достижений в форматах JSON и NDJSON:
+    статусы по каждому элементу, начисление очков и идемпотентность.
+    """
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": "batch_user", "language": Language.EN.value},
+    )
+    user_id: int = user_resp.json()["id"]
+
+    for code, points in (("batch_a", 3), ("batch_b", 4)):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch",
+        json=[
+            {"user_id": user_id, "code": "batch_a"},
+            {"user_id": user_id, "code": "batch_a"},
+            {"user_id": user_id, "code": "no_such_code"},
+            {"user_id": 999999, "code": "batch_a"},
+        ],
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    data = resp.json()
+    assert [item["status"] for item in data["items"]] == [
+        "granted",
+        "already_granted",
+        "unknown_code",
+        "unknown_user",
+    ]
+    assert data["granted"] == 1
+
+    ndjson = f'{{"user_id": {user_id}, "code": "batch_a"}}\n{{"user_id": {user_id}, "code": "batch_b"}}\n'
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch",
+        content=ndjson.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in resp.json()["items"]] == ["already_granted", "granted"]
+
+    user_data = (await client.get(f"/api/v1/users/{user_id}")).json()
+    assert user_data["total_points"] == 7
+
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch",
+        json=[{"user_id": user_id}],
+    )
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+async def test_list_achievements_etag_and_gzip(client: AsyncClient) -> None:
+    """
+    Проверяет, что список достижений отдаётся сжатым со строгим ETag и
+    Cache-Control, повторный запрос с If-None-Match получает 304, а
+    создание достижения меняет ETag.
+    """
+    resp = await client.get("/api/v1/achievements", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "max-age" in resp.headers["Cache-Control"]
+    assert isinstance(resp.json(), list)
+    etag = resp.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    resp = await client.get(
+        "/api/v1/achievements",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    resp = await client.get("/api/v1/achievements", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["ETag"] != etag
+
+    create_resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": "etag_catalog",
+            "points": 1,
+            "translations": [{"language": Language.EN.value, "name": "E", "description": "E"}],
+        },
+    )
+    assert create_resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.get(
+        "/api/v1/achievements",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert "etag_catalog" in {item["code"] for item in resp.json()}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import uuid
+
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import Achievement
+from app.models.achievement_unlock_stripe import AchievementUnlockStripe
+from app.models.user import User
+from app.services.bulk_import import BulkImportService
+
+
+async def test_bulk_import_resolves_keys_and_recomputes_points(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """
+    Импорт достижений, пользователей и выдач пачками через временные таблицы:
+    выдачи ссылаются на пользователей по имени и по id, дубликаты и
+    неизвестные ссылки пропускаются, total_points и счётчики выдач
+    пересчитываются.
+    """
+    prefix = f"imp_{uuid.uuid4().hex[:8]}"
+    first, second = f"{prefix}_first", f"{prefix}_second"
+
+    importer = BulkImportService(db_session, batch_size=2)
+
+    achievements = await importer.import_achievements(
+        [
+            {"code": first, "points": "10", "name_en": "First", "name_ru": "Первое"},
+            {"code": second, "points": 5, "name_en": "Second"},
+            {"code": second, "points": 7, "name_en": "Second, updated"},
+        ]
+    )
+    assert achievements.read == 3
+
+    users = await importer.import_users(
+        [
+            {"username": f"{prefix}_a", "language": "RU", "created_at": ""},
+            {"username": f"{prefix}_b", "language": "en"},
+            {"username": f"{prefix}_a", "language": "en"},
+        ]
+    )
+    assert (users.read, users.written) == (3, 2)
+
+    user_b_id = await db_session.scalar(select(User.id).where(User.username == f"{prefix}_b"))
+    user_a_id = await db_session.scalar(select(User.id).where(User.username == f"{prefix}_a"))
+
+    grants = await importer.import_grants(
+        [
+            {"username": f"{prefix}_a", "code": first, "issued_at": "2025-03-01T12:00:00Z"},
+            {"username": f"{prefix}_a", "code": second},
+            {"user_id": str(user_b_id), "code": second},
+            {"username": f"{prefix}_a", "code": first},
+            {"username": f"{prefix}_nobody", "code": first},
+            {"user_id": user_b_id, "code": f"{prefix}_unknown"},
+        ]
+    )
+    assert (grants.read, grants.written) == (6, 3)
+
+    assert await importer.recompute_user_totals() >= 2
+    assert await importer.recompute_counters() >= 3
+    unlocks = (
+        select(func.sum(AchievementUnlockStripe.count))
+        .join(Achievement)
+        .where(Achievement.code == second)
+    )
+    assert await db_session.scalar(unlocks) == 2
+
+    resp = await client.get(f"/api/v1/users/{user_a_id}")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["language"] == "ru"
+    assert resp.json()["total_points"] == 17
+
+    resp = await client.get(f"/api/v1/users/{user_b_id}/achievements")
+    assert resp.status_code == status.HTTP_200_OK
+    assert [item["name"] for item in resp.json()] == ["Second, updated"]
+
+    resp = await client.get(f"/api/v1/users/{user_a_id}/achievements")
+    issued = {item["code"]: item["issued_at"] for item in resp.json()}
+    assert issued[first].startswith("2025-03-01T12:00:00")
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections.abc import Callable
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionFactory, engine
+from app.models.enums import Language
+from app.services.catalog import CatalogStore
+
+
+async def _create_achievement(client: AsyncClient, code: str) -> None:
+    resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": code,
+            "points": 1,
+            "translations": [{"language": Language.EN.value, "name": code, "description": ""}],
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+
+
+async def _wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.05)
+
+
+async def test_cold_catalog_is_loaded_once(db_session: AsyncSession) -> None:
+    """
+    Одновременные первые обращения к каталогу загружают его один раз.
+    """
+    store = CatalogStore()
+    async with AsyncSessionFactory() as other:
+        first, second = await asyncio.gather(store.get(db_session), store.get(other))
+    assert first is second
+    assert first.version == 1
+
+
+async def test_miss_reload_is_throttled(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Без LISTEN/NOTIFY обращение к неизвестному коду перезагружает каталог,
+    но не чаще CATALOG_MISS_RELOAD_INTERVAL.
+    """
+    store = CatalogStore()
+    await store.get(db_session)
+    code = f"miss_{uuid.uuid4().hex[:8]}"
+    await _create_achievement(client, code)
+
+    monkeypatch.setattr(settings, "catalog_miss_reload_interval", 3600.0)
+    assert code not in (await store.refresh_on_miss(db_session)).by_code
+
+    monkeypatch.setattr(settings, "catalog_miss_reload_interval", 0.0)
+    assert code in (await store.refresh_on_miss(db_session)).by_code
+
+
+async def _terminate_listener(store: CatalogStore, db_session: AsyncSession) -> None:
+    await db_session.execute(
+        text("SELECT pg_terminate_backend(:pid)"), {"pid": store._listener.get_server_pid()}
+    )
+    await db_session.commit()
+
+
+async def test_notify_from_other_connection_reloads_catalog(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Уведомление из другого соединения перезагружает каталог, а неизвестный
+    код при активном слушателе каталог не перезагружает.
+    """
+    monkeypatch.setattr(settings, "catalog_miss_reload_interval", 0.0)
+    store = CatalogStore()
+    await store.get(db_session)
+    await store.listen(engine, AsyncSessionFactory)
+    try:
+        assert store.listening
+        version = (await store.refresh_on_miss(db_session)).version
+
+        code = f"notify_{uuid.uuid4().hex[:8]}"
+        await _create_achievement(client, code)
+        await _wait_for(lambda: code in store._catalog.by_code)
+        assert store._catalog.version == version + 1
+    finally:
+        await store.close()
+    assert not store.listening
+
+
+async def test_lost_listener_falls_back_to_miss_reload(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Пока слушающее соединение потеряно, обращение к неизвестному коду
+    перезагружает каталог.
+    """
+    monkeypatch.setattr(settings, "catalog_listen_check_interval", 3600.0)
+    monkeypatch.setattr(settings, "catalog_miss_reload_interval", 0.0)
+    store = CatalogStore()
+    await store.get(db_session)
+    await store.listen(engine, AsyncSessionFactory)
+    try:
+        await _terminate_listener(store, db_session)
+        await _wait_for(lambda: not store.listening)
+
+        code = f"lost_{uuid.uuid4().hex[:8]}"
+        await _create_achievement(client, code)
+        assert code in (await store.refresh_on_miss(db_session)).by_code
+    finally:
+        await store.close()
+
+
+async def test_lost_listener_reconnects(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Фоновая проверка переподключает потерянного слушателя, и уведомления
+    снова перезагружают каталог.
+    """
+    monkeypatch.setattr(settings, "catalog_listen_check_interval", 0.05)
+    store = CatalogStore()
+    await store.get(db_session)
+    await store.listen(engine, AsyncSessionFactory)
+    try:
+        listener = store._listener
+        await _terminate_listener(store, db_session)
+        await _wait_for(lambda: store._listener is not listener and store.listening)
+
+        code = f"reconnect_{uuid.uuid4().hex[:8]}"
+        await _create_achievement(client, code)
+        await _wait_for(lambda: code in store._catalog.by_code)
+    finally:
+        await store.close()
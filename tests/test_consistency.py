@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import uuid
+
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.enums import Language
+from app.models.user import User
+from app.services.consistency import ConsistencyService
+
+
+async def test_user_totals_drift_is_found_and_repaired(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """
+    Выдача увеличивает achievements_count вместе с total_points, а проверка
+    согласованности находит и исправляет расхождение счётчиков с журналом выдач.
+    """
+    prefix = f"cons_{uuid.uuid4().hex[:8]}"
+    for code, points in ((f"{prefix}_a", 3), (f"{prefix}_b", 4)):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    user_id = resp.json()["id"]
+
+    resp = await client.post(f"/api/v1/achievements/grant/{user_id}/{prefix}_a")
+    assert resp.status_code == status.HTTP_201_CREATED
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch",
+        json=[{"user_id": user_id, "code": f"{prefix}_b"}],
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    totals = select(User.total_points, User.achievements_count).where(User.id == user_id)
+    assert (await db_session.execute(totals)).one() == (7, 2)
+
+    await db_session.execute(
+        update(User).where(User.id == user_id).values(total_points=1, achievements_count=9)
+    )
+    await db_session.commit()
+
+    service = ConsistencyService(db_session)
+    report = await service.check_user_totals(chunk_size=1000, max_samples=1_000_000)
+    drift = next(drift for drift in report.samples if drift.user_id == user_id)
+    assert (drift.total_points, drift.expected_points) == (1, 7)
+    assert (drift.achievements_count, drift.expected_count) == (9, 2)
+
+    report = await service.check_user_totals(chunk_size=1000, repair=True)
+    assert report.repaired >= 1
+    assert (await db_session.execute(totals)).one() == (7, 2)
+
+    report = await service.check_user_totals(chunk_size=1000)
+    assert report.drifted == 0
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date
+
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import Date, Integer, Select, cast, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement import Achievement
+from app.models.enums import Language
+from app.models.user_achievement import UserAchievement
+from app.models.user_daily_stat import UserDailyStat
+from app.services.daily_stats import DailyStatsService, daily_points_upsert
+
+
+async def _create_user_with_grants(client: AsyncClient, prefix: str) -> int:
+    for code, points in ((f"{prefix}_a", 3), (f"{prefix}_b", 4)):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    user_id = resp.json()["id"]
+
+    resp = await client.post(f"/api/v1/achievements/grant/{user_id}/{prefix}_a")
+    assert resp.status_code == status.HTTP_201_CREATED
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch", json=[{"user_id": user_id, "code": f"{prefix}_b"}]
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    return user_id
+
+
+def _daily_points(user_id: int) -> Select:
+    return select(UserDailyStat.day, UserDailyStat.points).where(UserDailyStat.user_id == user_id)
+
+
+async def test_grants_update_daily_stats(client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Одиночная и пакетная выдачи прибавляют очки к одной строке
+    user_daily_stats за день выдачи.
+    """
+    user_id = await _create_user_with_grants(client, f"daily_{uuid.uuid4().hex[:8]}")
+
+    rows = (await db_session.execute(_daily_points(user_id))).all()
+    issued_day = await db_session.scalar(
+        select(cast(func.max(UserAchievement.issued_at), Date)).where(
+            UserAchievement.user_id == user_id
+        )
+    )
+    assert rows == [(issued_day, 7)]
+
+
+async def test_daily_points_upsert_adds_to_existing_points(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """
+    Повторная запись за тот же день прибавляет очки к уже накопленным,
+    а не перезаписывает их.
+    """
+    resp = await client.post(
+        "/api/v1/users",
+        json={"username": f"upsert_{uuid.uuid4().hex[:8]}", "language": Language.EN.value},
+    )
+    user_id = resp.json()["id"]
+    day = date(2024, 1, 15)
+
+    source = select(literal(user_id, Integer), literal(day, Date), literal(5, Integer))
+    await db_session.execute(daily_points_upsert(source))
+    await db_session.execute(daily_points_upsert(source))
+    await db_session.commit()
+
+    assert (await db_session.execute(_daily_points(user_id))).all() == [(day, 10)]
+
+
+async def test_chunked_rebuild_matches_grant_log(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """
+    Пересчёт небольшими чанками исправляет испорченные строки и совпадает
+    с группировкой журнала выдач по пользователю и дню.
+    """
+    user_id = await _create_user_with_grants(client, f"rebuild_{uuid.uuid4().hex[:8]}")
+    await db_session.execute(
+        update(UserDailyStat).where(UserDailyStat.user_id == user_id).values(points=1000)
+    )
+    await db_session.commit()
+
+    rows = await DailyStatsService(db_session).rebuild(chunk_size=3)
+
+    day = cast(UserAchievement.issued_at, Date)
+    expected = (
+        select(UserAchievement.user_id, day, func.sum(Achievement.points))
+        .join(Achievement, UserAchievement.achievement_id == Achievement.id)
+        .group_by(UserAchievement.user_id, day)
+    )
+    actual = select(UserDailyStat.user_id, UserDailyStat.day, UserDailyStat.points)
+    expected_rows = set((await db_session.execute(expected)).all())
+    assert set((await db_session.execute(actual)).all()) == expected_rows
+    assert rows == len(expected_rows)
+    assert (await db_session.execute(_daily_points(user_id))).one().points == 7
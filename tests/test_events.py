@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timedelta
+
+from fastapi import status
+from httpx import AsyncClient
+
+from app.models.enums import Language, RuleKind
+from app.services.rules import advance_streak
+
+
+def test_advance_streak_extends_and_resets() -> None:
+    """
+    Следующий день удлиняет серию, пропуск начинает её заново, а старые
+    и повторные дни ничего не меняют.
+    """
+    day = date(2026, 1, 10)
+    assert advance_streak(0, None, [day]) == (1, day)
+    assert advance_streak(1, day, [day, day + timedelta(days=1)]) == (2, day + timedelta(days=1))
+    assert advance_streak(5, day, [day - timedelta(days=3)]) == (5, day)
+    assert advance_streak(5, day, [day + timedelta(days=2)]) == (1, day + timedelta(days=2))
+
+
+async def test_events_fire_threshold_count_and_streak_rules(client: AsyncClient) -> None:
+    """
+    События проверяются правилами своего типа: порог срабатывает на одном
+    событии, счётчик - по сумме значений между пачками, серия - на третий
+    день подряд. Выданное достижение не выдаётся повторно.
+    """
+    prefix = f"ev_{uuid.uuid4().hex[:8]}"
+    rules = {
+        "score": [{"event_type": f"{prefix}_score", "kind": RuleKind.THRESHOLD, "target": 100}],
+        "count": [{"event_type": f"{prefix}_win", "kind": RuleKind.COUNT, "target": 5}],
+        "streak": [{"event_type": f"{prefix}_login", "kind": RuleKind.STREAK, "target": 3}],
+    }
+    for name, points in (("score", 10), ("count", 20), ("streak", 30)):
+        code = f"{prefix}_{name}"
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+                "rules": rules[name],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.get(f"/api/v1/achievements/{prefix}_count/rules")
+    assert resp.status_code == status.HTTP_200_OK
+    assert [(r["event_type"], r["kind"], r["target"]) for r in resp.json()] == [
+        (f"{prefix}_win", "count", 5)
+    ]
+
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    user_id = resp.json()["id"]
+
+    def event(kind: str, value: int = 1, day: date | None = None) -> dict:
+        body = {"type": f"{prefix}_{kind}", "user_id": user_id, "value": value}
+        if day is not None:
+            body["occurred_at"] = datetime.combine(day, datetime.min.time()).isoformat()
+        return body
+
+    start = date(2026, 3, 1)
+    resp = await client.post(
+        "/api/v1/events",
+        json=[
+            event("score", 99),
+            event("win", 3),
+            event("login", day=start),
+            event("login", day=start + timedelta(days=1)),
+            {"type": f"{prefix}_unknown", "user_id": user_id},
+            {"type": f"{prefix}_score", "user_id": 999_999_999, "value": 500},
+        ],
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    body = resp.json()
+    assert (body["accepted"], body["matched"], body["unknown_user"]) == (6, 5, 1)
+    assert body["granted"] == []
+
+    resp = await client.post(
+        "/api/v1/events",
+        json=[
+            event("score", 100),
+            event("win", 2),
+            event("login", day=start + timedelta(days=2)),
+        ],
+    )
+    granted = {item["code"] for item in resp.json()["granted"]}
+    assert granted == {f"{prefix}_score", f"{prefix}_count", f"{prefix}_streak"}
+
+    resp = await client.post("/api/v1/events", json=[event("score", 500), event("win", 10)])
+    assert resp.json()["granted"] == []
+
+    resp = await client.get(f"/api/v1/users/{user_id}")
+    assert resp.json()["total_points"] == 60
+
+
+async def test_rules_can_be_added_to_existing_achievement(client: AsyncClient) -> None:
+    """Правило, добавленное к существующему достижению, сразу обрабатывает события."""
+    prefix = f"evr_{uuid.uuid4().hex[:8]}"
+    resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": prefix,
+            "points": 5,
+            "translations": [{"language": Language.EN.value, "name": prefix, "description": ""}],
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = await client.post(
+        f"/api/v1/achievements/{prefix}/rules",
+        json=[{"event_type": f"{prefix}_play", "kind": RuleKind.COUNT, "target": 2}],
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert len(resp.json()) == 1
+
+    resp = await client.post(
+        "/api/v1/achievements/missing_code/rules",
+        json=[{"event_type": "x", "kind": RuleKind.COUNT, "target": 1}],
+    )
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    user_id = resp.json()["id"]
+    resp = await client.post(
+        "/api/v1/events",
+        json=[{"type": f"{prefix}_play", "user_id": user_id} for _ in range(2)],
+    )
+    assert resp.json()["granted"] == [{"user_id": user_id, "code": prefix}]
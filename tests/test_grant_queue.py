@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import uuid
+from pathlib import Path
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionFactory
+from app.models.enums import Language
+from app.schemas.achievements import QueuedGrantStatus
+from app.services.grant_queue import GrantLog, GrantQueue, GrantQueueClosedError, PendingGrant
+
+
+def test_grant_log_replays_unacknowledged_grants(tmp_path: Path) -> None:
+    """
+    После повторного открытия журнал возвращает только неподтверждённые
+    выдачи, пропуская недописанную строку, а второй процесс получает
+    отдельный файл.
+    """
+    path = tmp_path / "grants.log"
+    grants = [PendingGrant(f"t{i}", user_id=i, code="code", achievement_id=1) for i in range(3)]
+
+    log = GrantLog.open(path)
+    log.append(grants)
+    log.ack(["t1"])
+    other = GrantLog.open(path)
+    assert other.path != path
+    other.close()
+    log.close()
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"token": "t9", "user')
+
+    reopened = GrantLog.open(path)
+    assert [grant.token for grant in reopened.pending] == ["t0", "t2"]
+    reopened.ack(["t0", "t2"])
+    reopened.close()
+
+    final = GrantLog.open(path)
+    assert final.pending == []
+    final.close()
+
+
+def test_grant_log_is_compacted_after_batch_ack(tmp_path: Path) -> None:
+    """
+    Подтверждение последней неподтверждённой пачки очищает файл журнала,
+    и следующие выдачи пишутся в пустой файл.
+    """
+    log = GrantLog.open(tmp_path / "grants.log")
+    first = [PendingGrant(f"a{i}", user_id=i, code="code", achievement_id=1) for i in range(3)]
+    log.append(first)
+    log.ack(["a0"])
+    size = log.path.stat().st_size
+    assert size > 0
+
+    log.ack(["a1", "a2"])
+    assert log.path.stat().st_size == 0
+
+    log.append([PendingGrant("b0", user_id=1, code="code", achievement_id=1)])
+    assert 0 < log.path.stat().st_size < size
+    log.close()
+
+    reopened = GrantLog.open(log.path)
+    assert [grant.token for grant in reopened.pending] == ["b0"]
+    reopened.close()
+
+
+async def test_grant_queue_writes_batches_and_tracks_tokens(
+    client: AsyncClient, db_session: AsyncSession, tmp_path: Path
+) -> None:
+    """
+    Выдачи из очереди записываются пачкой, состояния доступны по токенам,
+    а остановка дописывает очередь и очищает журнал.
+    """
+    prefix = f"gq_{uuid.uuid4().hex[:8]}"
+    code = f"{prefix}_ach"
+    resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": code,
+            "points": 15,
+            "translations": [{"language": Language.EN.value, "name": code, "description": code}],
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    user_id = resp.json()["id"]
+
+    queue = GrantQueue(
+        max_size=10,
+        batch_size=10,
+        flush_interval=0.05,
+        put_timeout=0.01,
+        max_tracked=10,
+        log_path=tmp_path / "grants.log",
+    )
+    with pytest.raises(GrantQueueClosedError):
+        await queue.submit(db_session, user_id, code)
+
+    await queue.start(AsyncSessionFactory)
+    first = await queue.submit(db_session, user_id, code)
+    second = await queue.submit(db_session, user_id, code)
+    unknown_user = await queue.submit(db_session, 999_999_999, code)
+    assert await queue.submit(db_session, user_id, f"{prefix}_missing") is None
+    assert first.status == QueuedGrantStatus.PENDING
+    await queue.stop(timeout=5)
+
+    assert queue.batches == 1
+    assert queue.status(first.token).status == QueuedGrantStatus.GRANTED
+    assert queue.status(second.token).status == QueuedGrantStatus.ALREADY_GRANTED
+    assert queue.status(unknown_user.token).status == QueuedGrantStatus.UNKNOWN_USER
+    assert (tmp_path / "grants.log").read_text() == ""
+
+    resp = await client.get(f"/api/v1/users/{user_id}")
+    assert resp.json()["total_points"] == 15
+
+    resp = await client.get(f"/api/v1/achievements/grant/tokens/{first.token}")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
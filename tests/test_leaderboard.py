@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import random
+import uuid
+from itertools import pairwise
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.enums import Language, TimeWindow
+from app.services.leaderboard import PointsFenwickTree
+from app.services.stats import StatsService
+
+
+def test_points_fenwick_tree_matches_brute_force() -> None:
+    """
+    Места по дереву Фенвика совпадают с прямым подсчётом, в том числе после
+    переносов пользователей и роста ёмкости дерева.
+    """
+    rng = random.Random(7)  # noqa: S311
+    points = [rng.randrange(50) for _ in range(300)]
+    tree = PointsFenwickTree.from_counts((value, points.count(value)) for value in set(points))
+
+    for _ in range(500):
+        index = rng.randrange(len(points))
+        new_points = points[index] + rng.choice((0, 5, 10, 3000))
+        tree.move(points[index], new_points)
+        points[index] = new_points
+
+    assert tree.total == len(points)
+    for value in {*points, 0, 10_000}:
+        assert tree.rank(value) == 1 + sum(1 for other in points if other > value)
+
+
+async def test_leaderboard_pages_and_user_rank(client: AsyncClient) -> None:
+    """
+    Лидерборд отдаётся страницами по курсору в порядке (очки по убыванию, id),
+    места совпадают с /users/{id}/rank и учитывают выдачи сразу.
+    """
+    prefix = f"lb_{uuid.uuid4().hex[:8]}"
+    code = f"{prefix}_ach"
+    resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": code,
+            "points": 40,
+            "translations": [{"language": Language.EN.value, "name": code, "description": code}],
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+
+    user_ids = []
+    for i in range(2):
+        resp = await client.post(
+            "/api/v1/users", json={"username": f"{prefix}_{i}", "language": Language.EN.value}
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+        user_ids.append(resp.json()["id"])
+    leader, other = user_ids
+
+    before = (await client.get(f"/api/v1/users/{leader}/rank")).json()
+    resp = await client.post(f"/api/v1/achievements/grant/{leader}/{code}")
+    assert resp.status_code == status.HTTP_201_CREATED
+
+    rank = (await client.get(f"/api/v1/users/{leader}/rank")).json()
+    other_rank = (await client.get(f"/api/v1/users/{other}/rank")).json()
+    assert rank["total_points"] == before["total_points"] + 40
+    assert rank["rank"] < other_rank["rank"]
+
+    entries = []
+    cursor = None
+    while True:
+        params = {"limit": 7} | ({"cursor": cursor} if cursor else {})
+        resp = await client.get("/api/v1/leaderboard", params=params)
+        assert resp.status_code == status.HTTP_200_OK
+        entries += resp.json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    keys = [(-entry["total_points"], entry["user_id"]) for entry in entries]
+    assert keys == sorted(keys)
+    assert len({entry["user_id"] for entry in entries}) == len(entries)
+    # Индекс рангов не видит записи, сделанные в обход API (test_bulk_import),
+    # до своей перезагрузки, поэтому места проверяются на монотонность.
+    for prev, entry in pairwise(entries):
+        if entry["total_points"] == prev["total_points"]:
+            assert entry["rank"] == prev["rank"]
+        else:
+            assert entry["rank"] >= prev["rank"]
+
+    by_id = {entry["user_id"]: entry for entry in entries}
+    assert by_id[leader]["rank"] == rank["rank"]
+
+    resp = await client.get("/api/v1/leaderboard", params={"cursor": "broken"})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    resp = await client.get("/api/v1/users/999999999/rank")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_window_and_language_leaderboards(client: AsyncClient) -> None:
+    """
+    Лидерборд и сводка за окно считаются по очкам за окно из user_daily_stats,
+    языковые лидерборды содержат только пользователей выбранного языка.
+    """
+    prefix = f"lbw_{uuid.uuid4().hex[:8]}"
+    codes = {f"{prefix}_big": 30, f"{prefix}_small": 10}
+    for code, points in codes.items():
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.RU.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    user_ids = []
+    for i in range(2):
+        resp = await client.post(
+            "/api/v1/users", json={"username": f"{prefix}_{i}", "language": Language.RU.value}
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+        user_ids.append(resp.json()["id"])
+    first, second = user_ids
+
+    for user_id, user_codes in ((first, [f"{prefix}_big"]), (second, list(codes))):
+        for code in user_codes:
+            resp = await client.post(f"/api/v1/achievements/grant/{user_id}/{code}")
+            assert resp.status_code == status.HTTP_201_CREATED
+
+    entries = []
+    cursor = None
+    while True:
+        params = {"window": "today", "language": Language.RU.value, "limit": 3}
+        resp = await client.get(
+            "/api/v1/leaderboard", params=params | ({"cursor": cursor} if cursor else {})
+        )
+        assert resp.status_code == status.HTTP_200_OK
+        entries += resp.json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert {entry["language"] for entry in entries} == {Language.RU.value}
+    keys = [(-entry["window_points"], entry["user_id"]) for entry in entries]
+    assert keys == sorted(keys)
+    for prev, entry in pairwise(entries):
+        if entry["window_points"] == prev["window_points"]:
+            assert entry["rank"] == prev["rank"]
+        else:
+            assert entry["rank"] > prev["rank"]
+
+    by_id = {entry["user_id"]: entry for entry in entries}
+    assert by_id[first]["window_points"] == 30
+    assert by_id[second]["window_points"] == 40
+    assert by_id[second]["rank"] < by_id[first]["rank"]
+
+    resp = await client.get(
+        "/api/v1/leaderboard", params={"language": Language.EN.value, "limit": 20}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert {entry["language"] for entry in resp.json()} <= {Language.EN.value}
+    assert all(entry["window_points"] is None for entry in resp.json())
+
+    resp = await client.get(
+        "/api/v1/stats/window", params={"window": "7d", "language": Language.RU.value}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    summary = resp.json()
+    assert summary["active_users"] >= 2
+    assert summary["total_points"] >= 70
+    assert summary["max_points"]["window_points"] >= 40
+
+    resp = await client.get("/api/v1/leaderboard", params={"window": "year"})
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+async def test_window_summary_requires_fresh_transaction(db_session: AsyncSession) -> None:
+    """
+    Сводка за окно выполняется в снимке REPEATABLE READ и отказывается
+    работать в сессии, где транзакция уже открыта с другим уровнем изоляции.
+    """
+    service = StatsService(db_session)
+    await service.summary()
+    with pytest.raises(RuntimeError):
+        await service.window_summary(TimeWindow.WEEK)
+    await db_session.rollback()
+
+    await service.window_summary(TimeWindow.WEEK)
+    isolation = await db_session.scalar(text("SHOW transaction_isolation"))
+    assert isolation == "repeatable read"
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.db import engine
+from app.core.instrumentation import QUERY_STARTED_AT
+from app.models.enums import Language
+
+
+async def test_metrics_exposes_pool_state(client: AsyncClient) -> None:
+    """
+    Проверяет, что /metrics отдаёт состояние пула соединений
+    в текстовом формате Prometheus.
+    """
+    await client.get("/api/v1/stats")
+
+    response = await client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+
+    values = {
+        name: float(value)
+        for name, value in (
+            line.split(" ", 1) for line in response.text.splitlines() if not line.startswith("#")
+        )
+    }
+    assert values["db_pool_size"] >= 1
+    assert values["db_pool_checkouts_total"] >= 1
+    assert values["db_pool_wait_seconds_total"] >= 0
+    assert "db_pool_checked_out" in values
+    assert "db_pool_overflow" in values
+
+
+async def test_metrics_request_histograms(client: AsyncClient) -> None:
+    """
+    Проверяет, что /metrics содержит гистограммы задержки запросов и
+    количества SQL-операторов по шаблону маршрута.
+    """
+    user_resp = await client.post(
+        "/api/v1/users", json={"username": "metrics_user", "language": Language.EN.value}
+    )
+    user_id: int = user_resp.json()["id"]
+    response = await client.get(f"/api/v1/users/{user_id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    # Запрос записывается в гистограммы после отправки тела ответа, поэтому
+    # /metrics может ненадолго опередить запись.
+    route = 'method="GET",route="/api/v1/users/{user_id}"'
+    count_line = f'http_request_duration_seconds_count{{{route},status="200"}}'
+    for _ in range(50):
+        body = (await client.get("/metrics")).text
+        if count_line in body:
+            break
+        await asyncio.sleep(0.02)
+    assert count_line in body
+    assert "# TYPE http_request_db_queries histogram" in body
+
+    queries_sum = next(
+        line
+        for line in body.splitlines()
+        if line.startswith(f"http_request_db_queries_sum{{{route}}}")
+    )
+    assert float(queries_sum.rsplit(" ", 1)[1]) >= 1
+
+
+async def test_failed_statement_does_not_leave_start_time() -> None:
+    """
+    Проверяет, что упавший SQL-оператор не оставляет время начала на
+    соединении, а следующий оператор учитывается как обычно.
+    """
+    async with engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT 1 / 0"))
+        assert QUERY_STARTED_AT not in conn.info
+        await conn.rollback()
+
+        await conn.execute(text("SELECT 1"))
+        assert QUERY_STARTED_AT not in conn.info
+    await engine.dispose()
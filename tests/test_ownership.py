@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import uuid
+
+from fastapi import status
+from httpx import AsyncClient
+
+from app.models.enums import Language
+from app.services.ownership import Bitmap, achievement_mask, iter_bits
+
+
+def test_bitmap_and_mask_helpers() -> None:
+    """
+    Битовое множество растёт по мере добавления, перебор битов идёт по
+    возрастанию с нужной позиции, маска ставит '1' на позиции идентификаторов.
+    """
+    bitmap = Bitmap()
+    bitmap.update([3, 64, 1_000_003])
+    assert 64 in bitmap and 65 not in bitmap and 10**9 not in bitmap
+    assert list(iter_bits(bitmap.as_int())) == [3, 64, 1_000_003]
+    assert list(iter_bits(bitmap.as_int(), start=65)) == [1_000_003]
+
+    bitmap.add(5)
+    assert list(iter_bits(bitmap.as_int(), start=4)) == [5, 64, 1_000_003]
+
+    assert achievement_mask([]) == ""
+    assert achievement_mask([4, 1]) == "01001"
+
+
+async def test_has_and_query_by_achievement_sets(client: AsyncClient) -> None:
+    """
+    Проверка наличия достижений отвечает по битовой строке пользователя, а
+    запрос по выражению находит пользователей «есть A и B, но нет C».
+    """
+    prefix = f"own_{uuid.uuid4().hex[:8]}"
+    codes = {name: f"{prefix}_{name}" for name in ("a", "b", "c")}
+    for code in codes.values():
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": 1,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    user_ids = []
+    for i in range(4):
+        resp = await client.post(
+            "/api/v1/users", json={"username": f"{prefix}_{i}", "language": Language.EN.value}
+        )
+        user_ids.append(resp.json()["id"])
+
+    owned = {0: "ab", 1: "abc", 2: "a", 3: "b"}
+    for i, names in owned.items():
+        resp = await client.post(f"/api/v1/achievements/grant/{user_ids[i]}/{codes[names[0]]}")
+        assert resp.status_code == status.HTTP_201_CREATED
+        resp = await client.post(
+            "/api/v1/achievements/grant:batch",
+            json=[{"user_id": user_ids[i], "code": codes[name]} for name in names[1:]],
+        )
+        assert resp.status_code == status.HTTP_200_OK
+
+    resp = await client.get(
+        f"/api/v1/users/{user_ids[0]}/achievements/has",
+        params={"codes": [f"{codes['a']},{codes['c']}", codes["b"]]},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == {
+        "user_id": user_ids[0],
+        "achievements": {codes["a"]: True, codes["c"]: False, codes["b"]: True},
+    }
+
+    resp = await client.get(
+        f"/api/v1/users/{user_ids[0]}/achievements/has", params={"codes": f"{prefix}_missing"}
+    )
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+    resp = await client.get(
+        "/api/v1/users/999999999/achievements/has", params={"codes": codes["a"]}
+    )
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    expr = {"all": [{"has": codes["a"]}, {"has": codes["b"]}, {"not": {"has": codes["c"]}}]}
+    resp = await client.post("/api/v1/achievements/query", json={"expr": expr})
+    assert resp.status_code == status.HTTP_200_OK
+    body = resp.json()
+    assert (body["count"], body["user_ids"], body["next_after"]) == (1, [user_ids[0]], None)
+    assert 0 < body["percentage"] <= 100
+
+    expr = {"any": [{"has": codes["c"]}, {"has": codes["b"]}]}
+    resp = await client.post("/api/v1/achievements/query", json={"expr": expr, "limit": 2})
+    body = resp.json()
+    assert body["count"] == 3
+    assert body["user_ids"] == [user_ids[0], user_ids[1]]
+    assert body["next_after"] == user_ids[1]
+    resp = await client.post(
+        "/api/v1/achievements/query",
+        json={"expr": expr, "limit": 2, "after": body["next_after"]},
+    )
+    assert resp.json()["user_ids"] == [user_ids[3]]
+    assert resp.json()["next_after"] is None
+
+    resp = await client.post(
+        "/api/v1/achievements/query",
+        json={"expr": {"has": codes["a"], "not": {"has": codes["b"]}}},
+    )
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.enums import Language
+from app.models.user import User
+from app.models.user_daily_stat import UserDailyStat
+from app.models.user_points_delta import UserPointsDelta
+from app.schemas.achievements import GrantBatchItem
+from app.services.achievements import AchievementService
+from app.services.catalog import achievement_catalog
+from app.services.consistency import ConsistencyService
+from app.services.ownership import OwnershipService
+from app.services.points_folder import points_folder
+from app.services.users import UserService
+
+
+async def test_striped_grants_are_read_transparently_and_folded(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    В режиме полосатых счётчиков выдачи копятся в user_points_deltas, не
+    трогая строку users, чтение пользователя и проверка наличия достижений
+    учитывают неперенесённые полосы, а перенос переводит их в users и
+    user_daily_stats.
+    """
+    prefix = f"pts_{uuid.uuid4().hex[:8]}"
+    for code, points in ((f"{prefix}_a", 3), (f"{prefix}_b", 4)):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+    resp = await client.post(
+        "/api/v1/users", json={"username": prefix, "language": Language.EN.value}
+    )
+    user_id = resp.json()["id"]
+
+    await achievement_catalog.reload(db_session)
+    monkeypatch.setattr(settings, "user_points_stripes", 4)
+    service = AchievementService(db_session)
+    result = await service.grant_achievement_to_user(user_id, f"{prefix}_a")
+    assert result is not None and result.granted
+    assert result.total_points == 3
+    await service.grant_achievements_batch(
+        [GrantBatchItem(user_id=user_id, code=f"{prefix}_b")] * 2
+    )
+
+    totals = select(User.total_points, User.achievements_count).where(User.id == user_id)
+    assert (await db_session.execute(totals)).one() == (0, 0)
+    pending = select(func.sum(UserPointsDelta.points)).where(UserPointsDelta.user_id == user_id)
+    assert await db_session.scalar(pending) == 7
+
+    user = await UserService(db_session).get_user(user_id)
+    assert (user.total_points, user.achievements_count) == (7, 2)
+    ownership = await OwnershipService(db_session).has_achievements(
+        user_id, [f"{prefix}_a", f"{prefix}_b"]
+    )
+    assert ownership.achievements == {f"{prefix}_a": True, f"{prefix}_b": True}
+
+    report = await ConsistencyService(db_session).check_user_totals(
+        chunk_size=1000, max_samples=1_000_000
+    )
+    assert all(drift.user_id != user_id for drift in report.samples)
+
+    assert await points_folder.fold(db_session) >= 1
+    db_session.expire_all()
+    assert (await db_session.execute(totals)).one() == (7, 2)
+    assert await db_session.scalar(pending) is None
+    daily = select(func.sum(UserDailyStat.points)).where(UserDailyStat.user_id == user_id)
+    assert await db_session.scalar(daily) == 7
+    ownership = await OwnershipService(db_session).has_achievements(user_id, [f"{prefix}_b"])
+    assert ownership.achievements == {f"{prefix}_b": True}
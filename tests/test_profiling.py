@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+from app.core.profiling import (
+    AWAITING_FRAME,
+    Profile,
+    ProfileStore,
+    StackSampler,
+    sign_profile_token,
+    verify_profile_token,
+)
+
+
+def test_profile_token_is_bound_to_path_and_secret() -> None:
+    """
+    Проверяет, что токен профилирования принимается только для своего пути,
+    со своим секретом и в пределах срока действия.
+    """
+    token = sign_profile_token("secret", "/api/v1/stats")
+
+    assert verify_profile_token("secret", "/api/v1/stats", token)
+    assert not verify_profile_token("secret", "/api/v1/users/1", token)
+    assert not verify_profile_token("other", "/api/v1/stats", token)
+    assert not verify_profile_token(None, "/api/v1/stats", token)
+
+    expired = sign_profile_token("secret", "/api/v1/stats", int(time.time()) - 3600)
+    assert not verify_profile_token("secret", "/api/v1/stats", expired)
+
+
+def test_profile_store_keeps_latest_profiles(tmp_path: Path) -> None:
+    """
+    Проверяет, что кольцевой буфер хранит только последние профили.
+    """
+    store = ProfileStore(tmp_path, max_profiles=2)
+    for index in range(3):
+        store.save(
+            Profile(
+                id=f"{index + 1}-0000000{index}",
+                method="GET",
+                path="/api/v1/stats",
+                status=200,
+                started_at=0.0,
+                duration_ms=1.0,
+                interval_ms=5.0,
+                samples=1,
+                stacks={"main;work": 1},
+            )
+        )
+
+    assert [profile.id for profile in store.recent()] == ["3-00000002", "2-00000001"]
+    assert store.get("1-00000000") is None
+    assert store.get("../../etc/passwd") is None
+    assert store.get("3-00000002").collapsed() == "main;work 1\n"
+
+
+async def test_stack_sampler_records_running_and_awaiting_stacks() -> None:
+    """
+    Проверяет, что сэмплер снимает стеки задачи и во время вычислений,
+    и во время ожидания на await.
+    """
+
+    def busy() -> None:
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    async def handler() -> None:
+        busy()
+        await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(handler())
+    sampler = StackSampler(task, interval=0.002)
+    sampler.start()
+    await task
+    sampler.stop()
+
+    stacks = list(sampler.stacks)
+    assert sampler.samples > 0
+    assert any("busy" in stack and not stack.endswith(AWAITING_FRAME) for stack in stacks)
+    assert any(stack.endswith(AWAITING_FRAME) for stack in stacks)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import uuid
+from types import MappingProxyType
+
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.achievement_unlock_stripe import AchievementUnlockStripe
+from app.models.enums import Language
+from app.services.catalog import AchievementCatalog, CatalogEntry
+from app.services.consistency import ConsistencyService
+from app.services.rarity import RaritySnapshot, counter_stripe
+
+
+def test_catalog_listing_is_rebuilt_only_for_new_rarity_version() -> None:
+    """
+    Список достижений содержит счётчики из снимка редкости и сериализуется
+    заново только при смене версии снимка.
+    """
+    catalog = AchievementCatalog.build(
+        1, [CatalogEntry(id=7, code="rare", points=1, translations=MappingProxyType({}))]
+    )
+    rarity = RaritySnapshot(version=1, total_users=8, unlocks=MappingProxyType({7: 2}))
+
+    listing = catalog.listing(rarity)
+    assert catalog.listing(rarity) is listing
+    item = json.loads(listing.variants["identity"].content)[0]
+    assert (item["unlock_count"], item["unlock_percentage"]) == (2, 25.0)
+
+    rarity = RaritySnapshot(version=2, total_users=8, unlocks=MappingProxyType({7: 3}))
+    assert catalog.listing(rarity) is not listing
+    item = json.loads(catalog.listing(rarity).variants["identity"].content)[0]
+    assert item["unlock_count"] == 3
+
+
+async def test_unlock_stats_are_counted_and_reconciled(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """
+    Одиночная и пакетная выдачи увеличивают счётчик выдач достижения, а
+    сверка находит и исправляет расхождение полос счётчика с журналом выдач.
+    """
+    code = f"rare_{uuid.uuid4().hex[:8]}"
+    resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": code,
+            "points": 1,
+            "translations": [{"language": Language.EN.value, "name": code, "description": ""}],
+        },
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    achievement_id = resp.json()["id"]
+    assert resp.json()["unlock_count"] == 0
+
+    user_ids = []
+    for i in range(3):
+        resp = await client.post(
+            "/api/v1/users", json={"username": f"{code}_{i}", "language": Language.EN.value}
+        )
+        user_ids.append(resp.json()["id"])
+
+    for _ in range(2):
+        resp = await client.post(f"/api/v1/achievements/grant/{user_ids[0]}/{code}")
+        assert resp.status_code == status.HTTP_201_CREATED
+    resp = await client.post(
+        "/api/v1/achievements/grant:batch",
+        json=[{"user_id": user_id, "code": code} for user_id in (user_ids[1], user_ids[1])],
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    resp = await client.get(f"/api/v1/achievements/{code}/stats")
+    assert resp.status_code == status.HTTP_200_OK
+    stats = resp.json()
+    assert (stats["achievement_id"], stats["code"], stats["unlock_count"]) == (
+        achievement_id,
+        code,
+        2,
+    )
+    assert stats["total_users"] >= 3
+    assert stats["unlock_percentage"] == round(200 / stats["total_users"], 2)
+
+    resp = await client.get("/api/v1/achievements/missing_code/stats")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    await db_session.execute(
+        update(AchievementUnlockStripe)
+        .where(
+            AchievementUnlockStripe.achievement_id == achievement_id,
+            AchievementUnlockStripe.stripe == counter_stripe(user_ids[0]),
+        )
+        .values(count=AchievementUnlockStripe.count + 5)
+    )
+    await db_session.commit()
+
+    service = ConsistencyService(db_session)
+    drifts = [d for d in await service.reconcile_counters() if d.achievement_id == achievement_id]
+    assert [(d.current, d.expected) for d in drifts] == [(7, 2)]
+
+    await service.reconcile_counters(repair=True)
+    assert await service.reconcile_counters() == []
+    resp = await client.get(f"/api/v1/achievements/{code}/stats")
+    assert resp.json()["unlock_count"] == 2
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import uuid
+from datetime import date, timedelta
+
 from fastapi import status
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.db import AsyncSessionFactory
 from app.models.enums import Language
+from app.models.user_daily_stat import UserDailyStat
+from app.services.stats import StatsService
 
 
 async def test_stats_summary(client: AsyncClient) -> None:
@@ -75,3 +82,191 @@ async def test_stats_summary(client: AsyncClient) -> None:
     assert stats["max_points"] is not None
     assert "user_id" in stats["max_points"]
     assert "total_points" in stats["max_points"]
+
+    server_timing = resp.headers["Server-Timing"]
+    for name in ("max_achievements", "max_points", "points_diff", "streaks", "total"):
+        assert f"{name};dur=" in server_timing
+
+
+async def test_stats_points_diff_pairs(client: AsyncClient) -> None:
+    """
+    Проверяет согласованность пар пользователей с максимальной и минимальной
+    ненулевой разностью очков: разность положительна, первый пользователь
+    в паре имеет меньше очков, максимальная пара упирается в лидера по очкам.
+    """
+    users = []
+    for username in ("diff_low", "diff_mid", "diff_high"):
+        resp = await client.post(
+            "/api/v1/users",
+            json={"username": username, "language": Language.EN.value},
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+        users.append(resp.json())
+
+    for code, points in (("diff_a", 1000), ("diff_b", 1)):
+        resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": points,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    await client.post(f"/api/v1/achievements/grant/{users[2]['id']}/diff_a")
+    await client.post(f"/api/v1/achievements/grant/{users[2]['id']}/diff_b")
+    await client.post(f"/api/v1/achievements/grant/{users[1]['id']}/diff_a")
+
+    resp = await client.get("/api/v1/stats")
+    assert resp.status_code == status.HTTP_200_OK
+    stats = resp.json()
+
+    max_diff = stats["max_points_diff"]
+    min_diff = stats["min_points_diff"]
+    assert max_diff is not None
+    assert min_diff is not None
+
+    for pair in (max_diff, min_diff):
+        assert pair["diff"] > 0
+        assert pair["diff"] == pair["user2_points"] - pair["user1_points"]
+
+    assert max_diff["user2_points"] == stats["max_points"]["total_points"]
+    assert max_diff["user1_points"] == 0
+    assert min_diff["diff"] <= max_diff["diff"]
+    assert min_diff["diff"] == 1
+
+
+async def test_streak_users_min_days(client: AsyncClient) -> None:
+    """
+    Проверяет эндпоинт /stats/streaks: пользователь, получивший достижение
+    сегодня, имеет стрик не короче одного дня, а min_days валидируется.
+    """
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": "streak_one_day", "language": Language.EN.value},
+    )
+    assert user_resp.status_code == status.HTTP_201_CREATED
+    user_id: int = user_resp.json()["id"]
+
+    ach_resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": "streak_day",
+            "points": 5,
+            "translations": [
+                {"language": Language.EN.value, "name": "Day", "description": "One day."}
+            ],
+        },
+    )
+    assert ach_resp.status_code == status.HTTP_201_CREATED
+    await client.post(f"/api/v1/achievements/grant/{user_id}/streak_day")
+
+    resp = await client.get("/api/v1/stats/streaks", params={"min_days": 1})
+    assert resp.status_code == status.HTTP_200_OK
+    streaks = {item["user_id"]: item for item in resp.json()}
+    assert user_id in streaks
+    assert streaks[user_id]["longest_streak"] >= 1
+    assert all(item["longest_streak"] >= 1 for item in streaks.values())
+
+    resp = await client.get("/api/v1/stats/streaks", params={"min_days": 0})
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+async def test_longest_streak_skips_gaps(client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяет, что длина стрика считается по подряд идущим дням: при
+    активности в дни d-4, d-3, d-2 и d самый длинный стрик равен трём.
+    """
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": f"streak_gap_{uuid.uuid4().hex[:8]}", "language": Language.EN.value},
+    )
+    assert user_resp.status_code == status.HTTP_201_CREATED
+    user_id: int = user_resp.json()["id"]
+
+    today = date.today()
+    db_session.add_all(
+        UserDailyStat(user_id=user_id, day=today - timedelta(days=offset), points=5)
+        for offset in (4, 3, 2, 0)
+    )
+    await db_session.commit()
+
+    resp = await client.get("/api/v1/stats/streaks", params={"min_days": 3})
+    assert resp.status_code == status.HTTP_200_OK
+    streaks = {item["user_id"]: item["longest_streak"] for item in resp.json()}
+    assert streaks[user_id] == 3
+
+    resp = await client.get("/api/v1/stats/streaks", params={"min_days": 4})
+    assert user_id not in {item["user_id"] for item in resp.json()}
+
+
+async def test_stats_etag_and_invalidation(client: AsyncClient) -> None:
+    """
+    Проверяет, что сводка /stats отдаётся с ETag, повторный запрос с
+    If-None-Match получает 304, а выдача достижения, меняющая лидера по очкам,
+    инвалидирует сводку.
+    """
+    resp = await client.get("/api/v1/stats")
+    assert resp.status_code == status.HTTP_200_OK
+    etag = resp.headers["ETag"]
+
+    resp = await client.get("/api/v1/stats", headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp.content == b""
+
+    user_resp = await client.post(
+        "/api/v1/users",
+        json={"username": "etag_user", "language": Language.RU.value},
+    )
+    assert user_resp.status_code == status.HTTP_201_CREATED
+
+    ach_resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": "etag_ach",
+            "points": 100_000,
+            "translations": [
+                {"language": Language.RU.value, "name": "ETag", "description": "ETag."}
+            ],
+        },
+    )
+    assert ach_resp.status_code == status.HTTP_201_CREATED
+    await client.post(f"/api/v1/achievements/grant/{user_resp.json()['id']}/etag_ach")
+
+    resp = await client.get("/api/v1/stats", headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["ETag"] != etag
+
+
+async def test_stats_pinned_to_primary_bypasses_cache(client: AsyncClient) -> None:
+    """
+    Проверяет, что повторный запрос сводки попадает в кэш, а запрос с
+    привязкой к основной базе вычисляет сводку заново.
+    """
+    await client.get("/api/v1/stats")
+    resp = await client.get("/api/v1/stats")
+    assert resp.headers["Server-Timing"] == 'cache;desc="hit"'
+
+    resp = await client.get("/api/v1/stats", headers={"X-Read-Primary": "1"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert "total;dur=" in resp.headers["Server-Timing"]
+
+
+async def test_parallel_summary_matches_serial(db_session: AsyncSession) -> None:
+    """
+    Проверяет, что параллельная сводка на соединениях с общим снимком
+    pg_export_snapshot() совпадает с последовательной.
+    """
+    serial, _ = await StatsService(db_session).summary()
+    await db_session.rollback()
+
+    async with AsyncSessionFactory() as session:
+        parallel, timings = await StatsService(
+            session, session_factory=AsyncSessionFactory
+        ).summary()
+
+    assert parallel == serial
+    assert set(timings) == {"max_achievements", "max_points", "points_diff", "streaks", "total"}
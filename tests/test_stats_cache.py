@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.schemas.stats import StatsSummary
+from app.services.stats_cache import RedisCacheBackend, StatsCache
+from app.services.window_cache import WindowCache
+
+
+class FakeSession:
+    """
+    Замена сессии БД: отмечает закрытие, чтобы проверить, что вычисление
+    не использует уже закрытую сессию.
+    """
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        self.closed = True
+
+
+class FakeSessionFactory:
+    """Фабрика FakeSession, запоминающая выданные сессии."""
+
+    def __init__(self) -> None:
+        self.sessions: list[FakeSession] = []
+
+    def __call__(self) -> FakeSession:
+        session = FakeSession()
+        self.sessions.append(session)
+        return session
+
+
+class FakeRedis:
+    """
+    Локальная замена Redis-клиента: реализует get/set/incr поверх словаря.
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, px: int | None = None) -> None:
+        self.data[key] = value
+
+    async def incr(self, key: str) -> int:
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+async def test_stats_cache_single_flight_and_invalidation() -> None:
+    """
+    Проверяет, что одновременные промахи кэша приводят к одному вычислению,
+    повторный запрос попадает в кэш, а инвалидация, общая для всех
+    экземпляров кэша над одним Redis, приводит к пересчёту.
+    """
+    redis = FakeRedis()
+    cache = StatsCache(RedisCacheBackend(redis), ttl=60)
+    other_worker_cache = StatsCache(RedisCacheBackend(redis), ttl=60)
+    factory = FakeSessionFactory()
+    calls = 0
+
+    async def compute(session: FakeSession) -> tuple[StatsSummary, dict[str, float]]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return StatsSummary(), {"total": 1.0}
+
+    results = await asyncio.gather(*(cache.get_or_compute(factory, compute) for _ in range(10)))
+    assert calls == 1
+    assert len({cached.etag for cached, _ in results}) == 1
+    assert not any(hit for _, hit in results)
+
+    cached, hit = await other_worker_cache.get_or_compute(factory, compute)
+    assert hit
+    assert cached.timings == {"total": 1.0}
+    assert calls == 1
+
+    await other_worker_cache.invalidate()
+    _, hit = await cache.get_or_compute(factory, compute)
+    assert not hit
+    assert calls == 2
+
+
+async def test_stats_cache_survives_cancelled_first_caller() -> None:
+    """
+    Проверяет, что общее вычисление идёт в собственной сессии: отмена
+    запроса, запустившего вычисление, не мешает остальным ожидающим, а
+    сессия закрывается после вычисления.
+    """
+    cache = StatsCache(RedisCacheBackend(FakeRedis()), ttl=60)
+    factory = FakeSessionFactory()
+    started = asyncio.Event()
+
+    async def compute(session: FakeSession) -> tuple[StatsSummary, dict[str, float]]:
+        started.set()
+        await asyncio.sleep(0.05)
+        assert not session.closed
+        return StatsSummary(), {"total": 1.0}
+
+    first = asyncio.create_task(cache.get_or_compute(factory, compute))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_compute(factory, compute))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    cached, hit = await waiter
+    assert cached.timings == {"total": 1.0}
+    assert not hit
+    assert len(factory.sessions) == 1
+    assert factory.sessions[0].closed
+
+
+async def test_window_cache_survives_cancelled_first_caller() -> None:
+    """
+    Проверяет, что кэш результатов за окно объединяет одновременные промахи
+    в одно вычисление в собственной сессии, которое переживает отмену
+    запустившего его запроса.
+    """
+    cache = WindowCache(ttl=60)
+    factory = FakeSessionFactory()
+    started = asyncio.Event()
+
+    async def compute(session: FakeSession) -> int:
+        started.set()
+        await asyncio.sleep(0.05)
+        assert not session.closed
+        return 42
+
+    first = asyncio.create_task(cache.get_or_compute("key", factory, compute))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_compute("key", factory, compute))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await waiter == 42
+    assert await cache.get_or_compute("key", factory, compute) == 42
+    assert len(factory.sessions) == 1
+    assert factory.sessions[0].closed
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
-from fastapi import status
-from httpx import AsyncClient
+import json
+from time import time
 
+from fastapi import FastAPI, HTTPException, status
+from httpx import ASGITransport, AsyncClient
+
+from app.api.read_routing import PinPrimaryAfterWritesMiddleware
 from app.models.enums import Language
 
 
@@ -44,3 +48,157 @@ async def test_get_user_not_found(client: AsyncClient) -> None:
     response = await client.get("/api/v1/users/999999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json()["detail"] == "User not found"
+
+
+async def test_user_achievements_pagination_and_stream(client: AsyncClient) -> None:
+    """
+    Проверяет keyset-пагинацию списка достижений пользователя через
+    X-Next-Cursor и потоковую выдачу в формате NDJSON. Достижения выдаются
+    одним пакетом и имеют одинаковое issued_at, поэтому порядок страниц
+    держится на втором ключе курсора.
+    """
+    user_resp = await client.post(
+        "/api/v1/users", json={"username": "paged_user", "language": Language.EN.value}
+    )
+    user_id: int = user_resp.json()["id"]
+
+    codes = [f"paged_ach_{i}" for i in range(5)]
+    for code in codes:
+        ach_resp = await client.post(
+            "/api/v1/achievements",
+            json={
+                "code": code,
+                "points": 1,
+                "translations": [
+                    {"language": Language.EN.value, "name": code, "description": code}
+                ],
+            },
+        )
+        assert ach_resp.status_code == status.HTTP_201_CREATED
+
+    batch = [{"user_id": user_id, "code": code} for code in codes]
+    batch_resp = await client.post("/api/v1/achievements/grant:batch", json=batch)
+    assert batch_resp.json()["granted"] == len(codes)
+
+    full = (await client.get(f"/api/v1/users/{user_id}/achievements")).json()
+    assert len(full) == len(codes)
+
+    paged: list[dict] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(f"/api/v1/users/{user_id}/achievements", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page) <= 2
+        paged.extend(page)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert paged == full
+
+    response = await client.get(
+        f"/api/v1/users/{user_id}/achievements", headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed == full
+
+    response = await client.get(
+        f"/api/v1/users/{user_id}/achievements", params={"limit": 2, "cursor": "garbage"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_user_achievements_translation_fallback(client: AsyncClient) -> None:
+    """
+    Проверяет, что достижение без перевода на языке пользователя не теряется,
+    а отдаётся с переводом на языке по умолчанию, и что для пользователя без
+    достижений возвращается пустой список.
+    """
+    user_resp = await client.post(
+        "/api/v1/users", json={"username": "fallback_user", "language": Language.RU.value}
+    )
+    user_id: int = user_resp.json()["id"]
+
+    response = await client.get(f"/api/v1/users/{user_id}/achievements")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+    ach_resp = await client.post(
+        "/api/v1/achievements",
+        json={
+            "code": "fallback_ach",
+            "points": 3,
+            "translations": [
+                {"language": Language.EN.value, "name": "English only", "description": "EN"}
+            ],
+        },
+    )
+    assert ach_resp.status_code == status.HTTP_201_CREATED
+
+    grant_resp = await client.post(f"/api/v1/achievements/grant/{user_id}/fallback_ach")
+    assert grant_resp.status_code == status.HTTP_201_CREATED
+
+    response = await client.get(f"/api/v1/users/{user_id}/achievements")
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["code"] == "fallback_ach"
+    assert data[0]["name"] == "English only"
+    assert data[0]["points"] == 3
+
+    response = await client.get(
+        "/api/v1/users/999999/achievements", headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_read_your_writes_pin(client: AsyncClient) -> None:
+    """
+    Проверяет, что без реплики пишущий запрос не выставляет cookie привязки
+    к основной базе, а читающие запросы с заголовком X-Read-Primary видят
+    только что созданные данные.
+    """
+    response = await client.post(
+        "/api/v1/users", json={"username": "pinned_user", "language": Language.EN.value}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert "read_primary_until" not in response.cookies
+    user_id: int = response.json()["id"]
+
+    response = await client.get(f"/api/v1/users/{user_id}", headers={"X-Read-Primary": "1"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == "pinned_user"
+
+
+async def test_pin_primary_middleware_sets_cookie_after_writes() -> None:
+    """
+    Проверяет, что middleware read-your-writes выставляет cookie только
+    после успешных пишущих запросов.
+    """
+    app = FastAPI()
+    app.add_middleware(PinPrimaryAfterWritesMiddleware)
+
+    @app.post("/ok")
+    async def ok() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.post("/fail")
+    async def fail() -> None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT)
+
+    @app.get("/ok")
+    async def read() -> dict[str, str]:
+        return {"status": "ok"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as local:
+        response = await local.post("/ok")
+        assert float(response.cookies["read_primary_until"]) > time()
+        assert "HttpOnly" in response.headers["set-cookie"]
+        assert "read_primary_until" not in (await local.post("/fail")).cookies
+        local.cookies.clear()
+        assert "read_primary_until" not in (await local.get("/ok")).cookies